@@ -1,59 +1,967 @@
-"""Management utility to load data from a CSV file."""
+"""Management utility to load data from CSV, Parquet and Arrow files."""
 
+import argparse
+import glob
+import multiprocessing
 import os
+import re
+import time
+import typing as _t
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 import pandas as pd
+from django.db import IntegrityError, connections, transaction
 from django.db.models import Model
 from django.core.management.base import BaseCommand, CommandError
+from data_cleaners import planner
+from data_cleaners.base import clean_chunks, clean_data, required_columns
+from data_loaders import dtypes, manifest, pipeline, readers, tuning
+from data_loaders.async_writer import AsyncWriter
+from data_loaders.bulk import BulkLoad
+from data_loaders.methods import LOAD_METHODS
+from data_loaders.models import LoadCheckpoint
+from data_loaders.snapshot import SnapshotSwap
+from data_loaders.utils import DEFAULT_BATCH_SIZE
+
+# The number of bytes in each unit accepted by `memory_size_option`.
+MEMORY_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
 
 
 class LoadDataCommand(BaseCommand):
 
     model: Model
 
+    # The column of the files which the data is partitioned by when loading
+    # incrementally, such as a date, so that only the partitions which have
+    # changed are loaded. Where this is None, only whole files are skipped.
+    partition_column: _t.Optional[str] = None
+
     def add_arguments(self, parser):
         parser.add_argument(
             "-f",
             "--file",
             type=str,
-            help="The path to the CSV file containing the data to load.",
+            help=(
+                "The path to the file containing the data to load. CSV, "
+                "Parquet and Arrow IPC (including Feather) files are "
+                "supported. This can also be a glob pattern or a directory, "
+                "in which case every matching file is loaded."
+            ),
+        )
+        parser.add_argument(
+            "-p",
+            "--parse-workers",
+            type=int,
+            default=1,
+            help=(
+                "The number of threads used to parse each CSV file. The file "
+                "is split into ranges of lines which are parsed in parallel. "
+                "With --chunk-size, each chunk is one range and so contains "
+                "roughly, rather than exactly, that many rows."
+            ),
+        )
+        parser.add_argument(
+            "-w",
+            "--workers",
+            type=int,
+            default=1,
+            help=(
+                "The number of processes used to load multiple files in "
+                "parallel. Each process has its own database connection."
+            ),
+        )
+        parser.add_argument(
+            "-m",
+            "--method",
+            type=str,
+            choices=LOAD_METHODS,
+            default="auto",
+            help=(
+                "How the data is sent to the database. `insert` sends the "
+                "data in batches of insert queries. `copy` streams the data "
+                "into a staging table and merges it in a single query, which "
+                "is faster for large files. `auto`, the default, picks "
+                "whichever is faster for the amount of data."
+            ),
+        )
+        parser.add_argument(
+            "-b",
+            "--batch-size",
+            type=batch_size_option,
+            default=DEFAULT_BATCH_SIZE,
+            help=(
+                "The maximum number of rows sent to the database in a single "
+                f"query. Defaults to {DEFAULT_BATCH_SIZE}. Pass "
+                f"`{tuning.AUTO_BATCH_SIZE}` to tune the size of each batch "
+                "towards the most rows loaded per second."
+            ),
+        )
+        parser.add_argument(
+            "-a",
+            "--async-streams",
+            type=int,
+            default=None,
+            help=(
+                "Write the data with the asyncpg driver, keeping this many "
+                "COPY streams in flight on their own connections, so that a "
+                "single process can keep the database busy. Rows are split "
+                "between the streams by their key. --method and "
+                "--batch-size do not apply and --quarantine is not "
+                "supported."
+            ),
+        )
+        parser.add_argument(
+            "--dedup-memory-budget",
+            type=memory_size_option,
+            default=None,
+            help=(
+                "Remove duplicates across every chunk of a file before any "
+                "of it is written, holding only a digest of each row in "
+                "memory, up to this many bytes (such as 256MB), beyond which "
+                "the digests are partitioned to disk. The rows are written "
+                "to a temporary file while the chunks are read. By default, "
+                "duplicates across chunks are resolved by the upsert."
+            ),
+        )
+        parser.add_argument(
+            "--bulk-initial",
+            action="store_true",
+            help=(
+                "Stage all of the data in an UNLOGGED table, then merge it "
+                "into the table in one go with its secondary indexes "
+                "dropped, rebuild the indexes and analyse the table. This is "
+                "much faster for the first full load of a table, which is "
+                "locked while the data is merged. It cannot be combined "
+                "with --workers, --incremental, --resume, --quarantine or "
+                "--async-streams."
+            ),
+        )
+        parser.add_argument(
+            "--snapshot",
+            action="store_true",
+            help=(
+                "Treat the file(s) as a complete snapshot of the table and "
+                "replace the table with it, rather than upserting each row. "
+                "The snapshot is loaded into a shadow table which is swapped "
+                "in atomically, so rows missing from the snapshot are "
+                "removed. The swap is refused where other tables refer to "
+                "the rows which would be removed. It cannot be combined with "
+                "--workers, --incremental, --resume, --quarantine, "
+                "--async-streams or --bulk-initial."
+            ),
+        )
+        parser.add_argument(
+            "-q",
+            "--quarantine",
+            action="store_true",
+            help=(
+                "Set aside the rows which the database rejects, such as "
+                "values which do not fit in their column, and load the rest "
+                "of the data, rather than failing the load."
+            ),
+        )
+        parser.add_argument(
+            "-i",
+            "--incremental",
+            action="store_true",
+            help=(
+                "Skip files which have already been loaded with the same "
+                "content, and where the data is partitioned, such as by "
+                "date, only load the partitions which have changed."
+            ),
+        )
+        parser.add_argument(
+            "-r",
+            "--resume",
+            action="store_true",
+            help=(
+                "Continue from the last chunk which was committed by a "
+                "previous load of the same, unchanged file(s), rather than "
+                "starting again. Use with --chunk-size so that progress is "
+                "committed as the file is loaded."
+            ),
+        )
+        parser.add_argument(
+            "--explain",
+            action="store_true",
+            help=(
+                "Show the order the data is cleaned in, as chosen by the "
+                "planner for the first chunk of the first file, without "
+                "loading any data."
+            ),
+        )
+        parser.add_argument(
+            "-c",
+            "--chunk-size",
+            type=int,
+            default=None,
+            help=(
+                "Read, clean and load the file in chunks of this many rows "
+                "so that memory usage does not grow with the file size. By "
+                "default the whole file is loaded in one go."
+            ),
+        )
+        parser.add_argument(
+            "--pipeline",
+            action="store_true",
+            help=(
+                "With --chunk-size, read the next chunk on another thread "
+                "while the previous chunk is cleaned and written, and report "
+                "how busy each stage was. Cleaning and writing stay on the "
+                "command's own database connection."
+            ),
         )
 
     @staticmethod
-    def get_file(parsed_args: dict) -> str:
+    def get_files(parsed_args: dict) -> _t.List[str]:
         """If the user has not provided a file as an argument, then prompt
-        them for the file path. Check the files exists before returning the
-        filepath. If it does not exist, raise an error.
+        them for the file path. The path can be a file, a glob pattern or a
+        directory. Globs and directories are expanded to the files which they
+        contain, where directories only include files with the extensions in
+        `readers.FILE_EXTENSIONS`. If no files are found, raise an error.
 
         Args:
             parsed_args: The arguments parsed from the command line.
 
         Returns:
-            The path to the CSV file.
+            The sorted paths to the files.
         """
         _file = parsed_args["file"]
 
         if _file is None:
-            _file = input("Enter the path to the CSV file: ")
+            _file = input("Enter the path to the file(s): ")
 
-        if not os.path.exists(_file):
+        if os.path.isdir(_file):
+            filepaths = [
+                filepath
+                for filepath in glob.glob(os.path.join(_file, "*"))
+                if filepath.endswith(readers.FILE_EXTENSIONS)
+                and os.path.isfile(filepath)
+            ]
+        elif glob.has_magic(_file):
+            filepaths = [
+                filepath
+                for filepath in glob.glob(_file)
+                if os.path.isfile(filepath)
+            ]
+        elif os.path.exists(_file):
+            filepaths = [_file]
+        else:
             raise CommandError(f"File ({_file}) does not exist.")
 
-        return _file
+        if not filepaths:
+            raise CommandError(f"No files found matching ({_file}).")
+
+        return sorted(filepaths)
 
     @staticmethod
-    def read_csv(filepath: str) -> pd.DataFrame:
+    def read_csv(
+        filepath: str, parse_workers: int = 1, **options
+    ) -> pd.DataFrame:
         """Read the CSV file and return the data as a pandas dataframe.
 
         Args:
             filepath: The path to the CSV file.
+            parse_workers: The number of threads to parse the file with.
+            options: Keyword arguments for `pd.read_csv`.
 
         Returns:
             The data as a pandas dataframe.
         """
-        return pd.read_csv(filepath)
+        if parse_workers > 1:
+            return next(
+                readers.iter_csv_parallel(filepath, parse_workers, **options)
+            )
+        return pd.read_csv(filepath, **options)
+
+    @staticmethod
+    def read_csv_chunks(
+        filepath: str, chunk_size: int, parse_workers: int = 1, **options
+    ) -> _t.Iterator[pd.DataFrame]:
+        """Read the CSV file lazily, yielding the data in chunks so that only
+        one chunk is held in memory at a time, or one chunk per thread when
+        the file is parsed on multiple threads.
+
+        Args:
+            filepath: The path to the CSV file.
+            chunk_size: The maximum number of rows in each chunk. When the
+                file is parsed on multiple threads, this is approximate.
+            parse_workers: The number of threads to parse the file with.
+            options: Keyword arguments for `pd.read_csv`.
+
+        Yields:
+            The data as pandas dataframes of at most `chunk_size` rows.
+        """
+        if parse_workers > 1:
+            yield from readers.iter_csv_parallel(
+                filepath, parse_workers, chunk_size, **options
+            )
+            return
+
+        with pd.read_csv(filepath, chunksize=chunk_size, **options) as reader:
+            yield from reader
+
+    def read_chunks(
+        self,
+        filepath: str,
+        chunk_size: _t.Optional[int] = None,
+        parse_workers: int = 1,
+    ) -> _t.Iterator[pd.DataFrame]:
+        """Read the file, yielding the data in chunks or the whole file as a
+        single chunk if no chunk size is given. The format of the file is
+        detected from its contents. Parquet and Arrow files are read with
+        pyarrow, which uses its own threads, so `parse_workers` only applies
+        to CSV files.
+
+        Args:
+            filepath: The path to the file.
+            chunk_size: The maximum number of rows in each chunk, or None to
+                read the whole file in one go.
+            parse_workers: The number of threads to parse CSV files with.
+
+        Yields:
+            The data as pandas dataframes.
+        """
+        # Only the columns which are needed to clean and load the data are
+        # read, so any other column is never held in memory.
+        columns = self.get_columns()
+        file_format = readers.detect_format(filepath)
+        if file_format in readers.ARROW_READERS:
+            yield from readers.ARROW_READERS[file_format](
+                filepath, chunk_size, columns
+            )
+            return
+
+        # Columns whose dtype a value could fail to fit, such as integers,
+        # are converted once each chunk has been read.
+        model_dtypes = self.get_dtypes()
+        options = {
+            "usecols": columns.__contains__,
+            "dtype": dtypes.read_dtypes(model_dtypes),
+        }
+        if chunk_size is None:
+            chunks = [self.read_csv(filepath, parse_workers, **options)]
+        else:
+            chunks = self.read_csv_chunks(
+                filepath, chunk_size, parse_workers, **options
+            )
+        for chunk in chunks:
+            yield dtypes.convert_dtypes(chunk, model_dtypes)
+
+    def get_columns(self) -> _t.Set[str]:
+        """Get the columns of the files which are needed by the model's
+        cleaning strategies and its table.
+
+        Returns:
+            The names of the columns to read.
+        """
+        return required_columns(self.model, self.model.cleaning_strategies)
+
+    def get_dtypes(self) -> _t.Dict[str, str]:
+        """Get the pandas dtypes to read the columns of CSV files as, so that
+        the data is held in compact types derived from the model's fields
+        rather than the types pandas would infer.
+
+        Returns:
+            The pandas dtype for each of the file's columns which belongs to
+            the model.
+        """
+        data_cleaner = getattr(self.model, "DataCleaner", None)
+        column_map = getattr(data_cleaner, "rename_headers_header_map", {})
+        return dtypes.model_dtypes(self.model, column_map)
+
+    @staticmethod
+    def get_positive_option(
+        parsed_args: dict, option: str, default: _t.Any = None
+    ) -> _t.Any:
+        """Get a numeric option from the parsed arguments, checking that it
+        is a positive number if it has been provided.
+
+        Args:
+            parsed_args: The arguments parsed from the command line.
+            option: The name of the option.
+            default: The value to use if the option has not been provided.
+
+        Returns:
+            The value of the option.
+        """
+        value = parsed_args.get(option, default)
+        if value is not None and value < 1:
+            name = option.replace("_", " ").capitalize()
+            raise CommandError(f"{name} ({value}) must be a positive number.")
+        return value
+
+    def get_read_options(self, parsed_args: dict) -> dict:
+        """Get the keyword arguments to pass to `read_chunks`. Commands which
+        accept extra options for reading files should extend this method.
+
+        Args:
+            parsed_args: The arguments parsed from the command line.
+
+        Returns:
+            The keyword arguments for `read_chunks`.
+        """
+        return {
+            "chunk_size": self.get_positive_option(parsed_args, "chunk_size"),
+            "parse_workers": self.get_positive_option(
+                parsed_args, "parse_workers", 1
+            ),
+        }
+
+    def get_load_options(self, parsed_args: dict) -> dict:
+        """Get the keyword arguments to pass to the model's
+        `load_from_dataframe` method. Commands which accept extra options for
+        the model should extend this method.
+
+        Args:
+            parsed_args: The arguments parsed from the command line.
+
+        Returns:
+            The keyword arguments for `load_from_dataframe`.
+        """
+        batch_size = parsed_args.get("batch_size", DEFAULT_BATCH_SIZE)
+        if batch_size != tuning.AUTO_BATCH_SIZE:
+            batch_size = self.get_positive_option(
+                parsed_args, "batch_size", DEFAULT_BATCH_SIZE
+            )
+        # Each chunk that is read is only used to load the data, so it is
+        # cleaned without being copied first.
+        return {
+            "method": parsed_args.get("method", "auto"),
+            "batch_size": batch_size,
+            "copy": False,
+            "quarantine": parsed_args.get("quarantine", False),
+        }
+
+    def get_clean_options(self, parsed_args: dict) -> _t.Optional[dict]:
+        """Get the keyword arguments for the `stream` methods of the model's
+        cleaning strategies, where the chunks of each file are cleaned
+        together rather than one at a time. See `load_chunks`.
+
+        Args:
+            parsed_args: The arguments parsed from the command line.
+
+        Returns:
+            The keyword arguments, or None to clean each chunk on its own.
+        """
+        memory_budget = parsed_args.get("dedup_memory_budget")
+        if memory_budget is None:
+            return None
+        return {"memory_budget": memory_budget}
+
+    def clean_chunk(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """Clean a chunk of data in the same way as the model's
+        `load_from_dataframe` method, so that it can be cleaned separately
+        from being loaded. The chunk may be modified.
+
+        Args:
+            chunk: The chunk of data.
+
+        Returns:
+            The cleaned chunk.
+        """
+        chunk = clean_data(
+            chunk,
+            self.model,
+            self.model.cleaning_strategies,
+            copy=False,
+            fuse=True,
+            plan=True,
+        )
+        # A column with values which did not fit its dtype when it was read
+        # is converted once the rows with those values have been removed.
+        return dtypes.convert_dtypes(chunk, dtypes.model_dtypes(self.model))
+
+    def clean_stream(
+        self, chunks: _t.Iterable[pd.DataFrame], clean_options: dict
+    ) -> _t.Iterator[pd.DataFrame]:
+        """Clean chunks of data together as a stream, in the same way as
+        `clean_chunk`, except that strategies which need to see every chunk,
+        such as removing duplicates, clean the chunks together. See
+        `data_cleaners.base.clean_chunks`. The chunks may be modified.
+
+        Args:
+            chunks: The chunks of data, in the order they were read.
+            clean_options: Keyword arguments for the `stream` methods of the
+                model's cleaning strategies.
+
+        Yields:
+            The cleaned chunks.
+        """
+        model_dtypes = dtypes.model_dtypes(self.model)
+        for chunk in clean_chunks(
+            chunks,
+            self.model,
+            self.model.cleaning_strategies,
+            copy=False,
+            fuse=True,
+            plan=True,
+            **clean_options,
+        ):
+            yield dtypes.convert_dtypes(chunk, model_dtypes)
+
+    def load_chunks(
+        self,
+        chunks: _t.Iterable[pd.DataFrame],
+        load_options: dict,
+        checkpoint: _t.Optional[LoadCheckpoint] = None,
+        select: _t.Optional[_t.Callable[[pd.DataFrame], pd.DataFrame]] = None,
+        pipelined: bool = False,
+        streams: _t.Optional[int] = None,
+        bulk: _t.Optional[BulkLoad] = None,
+        clean_options: _t.Optional[dict] = None,
+    ) -> Counter:
+        """Clean and load chunks of data into the database. Each chunk is
+        committed on its own, together with the progress through the file.
+        Where the chunks are written by several streams, the progress is
+        committed once every chunk up to it has been written.
+
+        Args:
+            chunks: The chunks of data, in the order they were read.
+            load_options: The keyword arguments for `load_from_dataframe`.
+            checkpoint: The checkpoint to record the progress through the
+                file in. Rows which the checkpoint records as loaded are
+                skipped.
+            select: A function which selects the rows of each chunk to load.
+                By default, every row is loaded.
+            pipelined: Whether to read the next chunk on another thread
+                while the previous chunk is being cleaned and written. The
+                chunks are cleaned and written on the calling thread, as
+                cleaning looks up the foreign keys written by the caller's
+                transaction. See `data_loaders.pipeline`.
+            streams: The number of streams to write the chunks with. See
+                `data_loaders.async_writer`. By default, each chunk is
+                written with the model's `load_from_dataframe` method.
+            bulk: The bulk load to stage the chunks in, rather than writing
+                them to the table. See `data_loaders.bulk`.
+            clean_options: Where given, the chunks are cleaned together as a
+                stream rather than one at a time, passing these keyword
+                arguments to the cleaning strategies. See `clean_stream`. As
+                a cleaned chunk no longer matches the rows which were read,
+                the progress through the file is only recorded once every
+                chunk has been loaded.
+
+        Returns:
+            The number of rows loaded (`rows`) and of those, the number which
+            were inserted (`inserted`), updated (`updated`) and left
+            unchanged (`unchanged`), the number of chunks which were written
+            (`writes`), the number of rows which were rejected by the
+            database and quarantined (`quarantined`), the number of
+            rows skipped as they were loaded by a previous run
+            (`resumed_rows`), the memory used by the data that was read
+            (`memory`) and the estimated memory the data would have used
+            with inferred types (`inferred_memory`). When pipelined, this
+            also includes the seconds the pipeline ran for
+            (`pipeline_seconds`) and that each stage spent working
+            (`read_seconds`, `clean_seconds` and `write_seconds`). When
+            staged for a bulk load, only the number of rows staged
+            (`staged_rows`) is counted rather than the rows loaded.
+        """
+        stats = Counter()
+        rows_read = checkpoint.rows if checkpoint is not None else 0
+        if rows_read:
+            chunks = readers.skip_rows(chunks, rows_read)
+            stats["resumed_rows"] = rows_read
+
+        def measure(chunk: pd.DataFrame) -> Counter:
+            return Counter(
+                memory=int(chunk.memory_usage(deep=True).sum()),
+                inferred_memory=dtypes.inferred_memory_usage(chunk),
+            )
+
+        def prepare(
+            chunk: pd.DataFrame,
+        ) -> _t.Tuple[int, Counter, pd.DataFrame]:
+            read_stats = measure(chunk)
+            rows = len(chunk)
+            if select is not None:
+                chunk = select(chunk)
+            if len(chunk):
+                chunk = self.clean_chunk(chunk)
+            return rows, read_stats, chunk
+
+        if pipelined:
+            reader = pipeline.Pipeline(chunks, [])
+            chunks = reader.items()
+
+        source = (prepare(chunk) for chunk in chunks)
+        if clean_options is not None:
+            streamed_stats = Counter()
+
+            def selected(
+                chunks: _t.Iterable[pd.DataFrame],
+            ) -> _t.Iterator[pd.DataFrame]:
+                for chunk in chunks:
+                    streamed_stats.update(measure(chunk))
+                    yield chunk if select is None else select(chunk)
+
+            source = (
+                (0, Counter(), chunk)
+                for chunk in self.clean_stream(selected(chunks), clean_options)
+            )
+
+        writer = AsyncWriter(self.model, streams) if streams else None
+        # The chunks which are being written by the streams, in order, with
+        # the number of rows read up to the end of each.
+        in_flight = deque()
+
+        def commit_written(wait: bool = False) -> None:
+            while in_flight and (wait or in_flight[0][1].done()):
+                rows, future = in_flight.popleft()
+                result = future.result()
+                stats.update(result._asdict())
+                stats["rows"] += result.rows
+                if checkpoint is not None:
+                    checkpoint.advance(rows)
+
+        def write(prepared: _t.Tuple[int, Counter, pd.DataFrame]) -> None:
+            nonlocal rows_read
+            rows, read_stats, chunk = prepared
+            rows_read += rows
+            stats.update(read_stats)
+            if bulk is not None:
+                stats["staged_rows"] += bulk.stage(chunk)
+                return
+            if len(chunk):
+                stats["writes"] += 1
+            if writer is not None:
+                in_flight.append((rows_read, writer.submit(chunk)))
+                commit_written()
+                return
+            with transaction.atomic():
+                if len(chunk):
+                    result = self.model.load_from_dataframe(
+                        chunk, clean=False, **load_options
+                    )
+                    stats.update(result._asdict())
+                    stats["rows"] += result.rows
+                if checkpoint is not None:
+                    checkpoint.advance(rows_read)
+
+        # Unless the chunks are cleaned together, each chunk is cleaned and
+        # upserted independently. Duplicates within a chunk are removed by
+        # the model's cleaning strategies whilst duplicates across chunks are
+        # resolved by the upsert itself, as a later chunk overwrites the rows
+        # of an earlier one. The end result is the same as keeping the last
+        # duplicate of the whole file, which is also why a load can be
+        # resumed from any chunk.
+        if writer is not None:
+            writer.start()
+        busy = Counter()
+        started = time.perf_counter()
+        try:
+            while True:
+                cleaning = time.perf_counter()
+                item = next(source, None)
+                writing = time.perf_counter()
+                busy["clean"] += writing - cleaning
+                if item is None:
+                    break
+                write(item)
+                busy["write"] += time.perf_counter() - writing
+            commit_written(wait=True)
+        finally:
+            if pipelined:
+                # Stops the reading thread where the load failed.
+                chunks.close()
+            if writer is not None:
+                writer.close()
+        if pipelined:
+            stats["pipeline_seconds"] += time.perf_counter() - started
+            stats["read_seconds"] += reader.busy["read"]
+            # Cleaning includes the time spent waiting for the next chunk to
+            # be read, which is left out.
+            stats["clean_seconds"] += busy["clean"] - reader.waiting
+            stats["write_seconds"] += busy["write"]
+        if clean_options is not None:
+            stats.update(streamed_stats)
+
+        if checkpoint is not None:
+            checkpoint.complete()
+        return stats
+
+    def load_file(
+        self,
+        filepath: str,
+        read_options: dict,
+        load_options: dict,
+        incremental: bool = False,
+        resume: bool = False,
+        streams: _t.Optional[int] = None,
+        bulk: _t.Optional[BulkLoad] = None,
+        clean_options: _t.Optional[dict] = None,
+        pipelined: bool = False,
+    ) -> Counter:
+        """Load the data from a single file into the database.
+
+        Args:
+            filepath: The path to the file.
+            read_options: The keyword arguments for `read_chunks`.
+            load_options: The keyword arguments for `load_from_dataframe`.
+            incremental: Whether to skip the file or its partitions where
+                they have already been loaded with the same content.
+            resume: Whether to continue from where a previous load of the
+                file stopped, if the file has not changed since.
+            streams: The number of streams to write the data with. See
+                `load_chunks`.
+            bulk: The bulk load to stage the data in. No checkpoint is
+                recorded, as the data is not loaded until the bulk load is
+                finished. See `load_chunks`.
+            clean_options: Where given, the chunks are cleaned together. See
+                `load_chunks`.
+            pipelined: Whether to read the next chunk while the previous one
+                is cleaned and written. See `load_chunks`.
+
+        Returns:
+            The statistics of the load. See `load_chunks`. When loading
+            incrementally, this also includes the number of files
+            (`skipped_files`) and partitions (`skipped_partitions`) which
+            were skipped.
+        """
+        if bulk is not None:
+            return self.load_chunks(
+                self.read_chunks(filepath, **read_options),
+                load_options,
+                pipelined=pipelined,
+                bulk=bulk,
+                clean_options=clean_options,
+            )
+
+        checkpoint = LoadCheckpoint.start(self.model, filepath, resume)
+        if checkpoint.completed:
+            return Counter(resumed_rows=checkpoint.rows)
+
+        if not incremental:
+            return self.load_chunks(
+                self.read_chunks(filepath, **read_options),
+                load_options,
+                checkpoint,
+                pipelined=pipelined,
+                streams=streams,
+                clean_options=clean_options,
+            )
+
+        checksum = manifest.file_checksum(filepath)
+        if manifest.is_file_loaded(self.model, checksum):
+            checkpoint.complete()
+            return Counter(skipped_files=1)
+
+        if self.partition_column is None:
+            stats = self.load_chunks(
+                self.read_chunks(filepath, **read_options),
+                load_options,
+                checkpoint,
+                pipelined=pipelined,
+                streams=streams,
+                clean_options=clean_options,
+            )
+        else:
+            stats = self.load_changed_partitions(
+                filepath,
+                read_options,
+                load_options,
+                checkpoint,
+                streams,
+                clean_options,
+                pipelined,
+            )
+        manifest.record_file(
+            self.model, filepath, checksum, os.path.getsize(filepath)
+        )
+        return stats
+
+    def load_changed_partitions(
+        self,
+        filepath: str,
+        read_options: dict,
+        load_options: dict,
+        checkpoint: _t.Optional[LoadCheckpoint] = None,
+        streams: _t.Optional[int] = None,
+        clean_options: _t.Optional[dict] = None,
+        pipelined: bool = False,
+    ) -> Counter:
+        """Load only the partitions of a file whose content has changed since
+        they were last loaded. The file is read once to find the partitions
+        which have changed and, if there are any, again to load them, unless
+        the whole file is read in one go, in which case it is kept in memory
+        between the two.
+
+        Args:
+            filepath: The path to the file.
+            read_options: The keyword arguments for `read_chunks`.
+            load_options: The keyword arguments for `load_from_dataframe`.
+            checkpoint: The checkpoint to record the progress through the
+                file in. See `load_chunks`.
+            streams: The number of streams to write the data with. See
+                `load_chunks`.
+            clean_options: Where given, the chunks are cleaned together. See
+                `load_chunks`.
+            pipelined: Whether to read the next chunk while the previous one
+                is cleaned and written. See `load_chunks`.
+
+        Returns:
+            The statistics of the load. See `load_file`.
+        """
+        column = self.partition_column
+        chunks = self.read_chunks(filepath, **read_options)
+        if read_options.get("chunk_size") is None:
+            chunks = list(chunks)
+
+        checksums = manifest.partition_checksums(chunks, column)
+        changed = manifest.changed_partitions(
+            self.model, filepath, column, checksums
+        )
+        stats = Counter(skipped_partitions=len(checksums) - len(changed))
+        if not changed:
+            if checkpoint is not None:
+                checkpoint.complete()
+            return stats
+
+        if not isinstance(chunks, list):
+            chunks = self.read_chunks(filepath, **read_options)
+        stats += self.load_chunks(
+            chunks,
+            load_options,
+            checkpoint,
+            pipelined=pipelined,
+            streams=streams,
+            clean_options=clean_options,
+            select=lambda chunk: chunk[
+                chunk[column].astype(str).isin(changed)
+            ],
+        )
+        manifest.record_partitions(self.model, filepath, column, changed)
+        return stats
+
+    def load_files_in_parallel(
+        self,
+        filepaths: _t.List[str],
+        workers: int,
+        read_options: dict,
+        load_options: dict,
+        incremental: bool = False,
+        resume: bool = False,
+        streams: _t.Optional[int] = None,
+        clean_options: _t.Optional[dict] = None,
+        pipelined: bool = False,
+    ) -> Counter:
+        """Load the data from multiple files, spreading the files across a
+        pool of worker processes.
+
+        Args:
+            filepaths: The paths to the files.
+            workers: The maximum number of worker processes.
+            read_options: The keyword arguments for `read_chunks`.
+            load_options: The keyword arguments for `load_from_dataframe`.
+            incremental: Whether to skip the files or their partitions where
+                they have already been loaded with the same content.
+            resume: Whether to continue from where previous loads of the
+                files stopped.
+            streams: The number of streams each process writes its data
+                with. See `load_chunks`.
+            clean_options: Where given, the chunks of each file are cleaned
+                together. See `load_chunks`.
+            pipelined: Whether to read the next chunk of each file while the
+                previous one is cleaned and written. See `load_chunks`.
+
+        Returns:
+            The statistics of the load, summed across all of the files. See
+            `load_file`.
+        """
+        # Close the database connections so that the worker processes do not
+        # share them. Each worker opens its own connection when it is needed.
+        connections.close_all()
+
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(filepaths)),
+            mp_context=multiprocessing.get_context("fork"),
+        ) as executor:
+            return sum(
+                executor.map(
+                    _load_file,
+                    repeat(type(self)),
+                    filepaths,
+                    repeat(read_options),
+                    repeat(load_options),
+                    repeat(incremental),
+                    repeat(resume),
+                    repeat(streams),
+                    repeat(clean_options),
+                    repeat(pipelined),
+                ),
+                Counter(),
+            )
+
+    def bulk_load(
+        self,
+        filepaths: _t.List[str],
+        read_options: dict,
+        load_options: dict,
+        snapshot: bool = False,
+        clean_options: _t.Optional[dict] = None,
+        pipelined: bool = False,
+    ) -> Counter:
+        """Stage the data from the files and merge it into the table in one
+        go. See `data_loaders.bulk`.
+
+        Args:
+            filepaths: The paths to the files, in the order they are loaded.
+            read_options: The keyword arguments for `read_chunks`.
+            load_options: The keyword arguments for `load_from_dataframe`.
+            snapshot: Whether to replace the table with the data rather than
+                merging it. See `data_loaders.snapshot`.
+            clean_options: Where given, the chunks of each file are cleaned
+                together. See `load_chunks`.
+            pipelined: Whether to read the next chunk of each file while the
+                previous one is cleaned and staged. See `load_chunks`.
+
+        Returns:
+            The statistics of the load. See `load_chunks`. This also
+            includes the seconds spent merging the data (`merge_seconds`),
+            rebuilding the indexes (`index_seconds`) and analysing the table
+            (`analyze_seconds`), and the number of indexes which were
+            rebuilt (`rebuilt_indexes`). For a snapshot, this also includes
+            the seconds spent checking the snapshot with writes to the table
+            blocked (`check_seconds`), the seconds the table was locked
+            against readers for the swap (`swap_seconds`) and spent
+            checking the foreign keys which refer to the table
+            (`validate_seconds`), and the number of rows which were not in
+            the snapshot and so were removed (`removed`).
+        """
+        loader = SnapshotSwap(self.model) if snapshot else BulkLoad(self.model)
+        try:
+            stats = sum(
+                (
+                    self.load_file(
+                        filepath,
+                        read_options,
+                        load_options,
+                        bulk=loader,
+                        clean_options=clean_options,
+                        pipelined=pipelined,
+                    )
+                    for filepath in filepaths
+                ),
+                Counter(),
+            )
+            result = loader.finish()
+        finally:
+            loader.discard()
+
+        stats.update(result._asdict())
+        stats["rows"] += result.rows
+        if snapshot:
+            stats["rebuilt_indexes"] += len(loader.table_indexes)
+            stats["removed"] += loader.removed
+        else:
+            stats["rebuilt_indexes"] += len(loader.indexes)
+        for step, seconds in loader.timings.items():
+            stats[f"{step}_seconds"] += seconds
+        return stats
 
     def load_data(self, parsed_args: dict) -> None:
-        """Load the data from the CSV file into the database.
+        """Load the data from the file(s) into the database.
 
         Args:
             parsed_args: The arguments parsed from the command line.
@@ -61,10 +969,308 @@ class LoadDataCommand(BaseCommand):
         Returns:
             None
         """
-        filepath = self.get_file(parsed_args)
-        df = self.read_csv(filepath)
-        self.model.load_from_dataframe(df)
+        filepaths = self.get_files(parsed_args)
+        workers = self.get_positive_option(parsed_args, "workers", 1)
+        read_options = self.get_read_options(parsed_args)
+        load_options = self.get_load_options(parsed_args)
+        clean_options = self.get_clean_options(parsed_args)
+        incremental = parsed_args.get("incremental", False)
+        resume = parsed_args.get("resume", False)
+        pipelined = parsed_args.get("pipeline", False)
+        if pipelined and read_options.get("chunk_size") is None:
+            raise CommandError(
+                "--pipeline can only be used with --chunk-size."
+            )
+        streams = self.get_positive_option(parsed_args, "async_streams")
+        if streams and load_options["quarantine"]:
+            raise CommandError(
+                "--quarantine cannot be used with --async-streams."
+            )
+        bulk_initial = parsed_args.get("bulk_initial", False)
+        snapshot = parsed_args.get("snapshot", False)
+        if (bulk_initial or snapshot) and (
+            workers > 1
+            or incremental
+            or resume
+            or streams
+            or load_options["quarantine"]
+        ):
+            option = "--snapshot" if snapshot else "--bulk-initial"
+            raise CommandError(
+                f"{option} cannot be used with --workers, --incremental, "
+                "--resume, --quarantine or --async-streams."
+            )
+        if bulk_initial and snapshot:
+            raise CommandError(
+                "--bulk-initial cannot be used with --snapshot."
+            )
+
+        if parsed_args.get("explain"):
+            self.explain(filepaths[0], read_options)
+            return
+
+        start = time.perf_counter()
+
+        if snapshot:
+            try:
+                stats = self.bulk_load(
+                    filepaths,
+                    read_options,
+                    load_options,
+                    snapshot=True,
+                    clean_options=clean_options,
+                    pipelined=pipelined,
+                )
+            except (IntegrityError, ValueError) as error:
+                raise CommandError(str(error)) from error
+        elif bulk_initial:
+            stats = self.bulk_load(
+                filepaths,
+                read_options,
+                load_options,
+                clean_options=clean_options,
+                pipelined=pipelined,
+            )
+        elif workers > 1 and len(filepaths) > 1:
+            stats = self.load_files_in_parallel(
+                filepaths,
+                workers,
+                read_options,
+                load_options,
+                incremental,
+                resume,
+                streams,
+                clean_options,
+                pipelined,
+            )
+        else:
+            stats = sum(
+                (
+                    self.load_file(
+                        filepath,
+                        read_options,
+                        load_options,
+                        incremental,
+                        resume,
+                        streams,
+                        clean_options=clean_options,
+                        pipelined=pipelined,
+                    )
+                    for filepath in filepaths
+                ),
+                Counter(),
+            )
+
+        elapsed = time.perf_counter() - start
+        rows = stats["rows"]
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Loaded {rows:,} rows from {len(filepaths)} file(s) in "
+                f"{elapsed:.2f}s ({rows / elapsed:,.0f} rows/s)."
+            )
+        )
+        counts = (
+            f"Inserted {stats['inserted']:,}, updated {stats['updated']:,} "
+            f"and left {stats['unchanged']:,} unchanged."
+        )
+        if stats["writes"] > 1:
+            # Each chunk is upserted on its own, so a row which is in more
+            # than one chunk is counted once for each of them.
+            counts += (
+                f" These are counted for each of the {stats['writes']:,} "
+                "writes, so a row written more than once is counted each "
+                "time."
+            )
+        self.stdout.write(counts)
+        if stats["quarantined"]:
+            self.stdout.write(
+                f"Quarantined {stats['quarantined']:,} rows which were "
+                "rejected by the database."
+            )
+        if stats["resumed_rows"]:
+            self.stdout.write(
+                f"Resumed after {stats['resumed_rows']:,} rows which were "
+                "loaded by a previous run."
+            )
+        if incremental:
+            self.stdout.write(
+                f"Skipped {stats['skipped_files']:,} unchanged file(s) and "
+                f"{stats['skipped_partitions']:,} unchanged partition(s)."
+            )
+        self.write_memory_report(stats)
+        self.write_utilisation_report(stats)
+        self.write_bulk_report(stats)
+        if load_options["batch_size"] == tuning.AUTO_BATCH_SIZE:
+            self.write_batch_size()
+
+    def write_batch_size(self) -> None:
+        """Report the batch size which was tuned for the model in this
+        process, so that it can be passed to `--batch-size` in later loads.
+        Where the files were loaded by worker processes, the size is only
+        logged by each worker. See `tuning.log_batch_size`.
+        """
+        sizer = tuning.batch_sizers.get(self.model)
+        if sizer is None or sizer.throughput is None:
+            return
+        self.stdout.write(
+            f"Tuned the batch size to {sizer.size:,} rows "
+            f"({sizer.throughput:,.0f} rows/s per batch). Pass "
+            f"--batch-size {sizer.size} to use it again."
+        )
+
+    def write_bulk_report(self, stats: Counter) -> None:
+        """Report how long each step of a bulk load took, where the data was
+        bulk loaded or swapped in as a snapshot.
+
+        Args:
+            stats: The statistics of the load. See `bulk_load`.
+        """
+        if not stats["staged_rows"]:
+            return
+        self.stdout.write(
+            f"Staged {stats['staged_rows']:,} rows, merged them in "
+            f"{stats['merge_seconds']:.2f}s, rebuilt "
+            f"{stats['rebuilt_indexes']} index(es) in "
+            f"{stats['index_seconds']:.2f}s and analysed the table in "
+            f"{stats['analyze_seconds']:.2f}s."
+        )
+        if "swap_seconds" in stats:
+            self.stdout.write(
+                "Checked the snapshot with writes to the table blocked for "
+                f"{stats['check_seconds']:.2f}s, then swapped it in with the "
+                f"table locked for {stats['swap_seconds']:.2f}s, removing "
+                f"{stats['removed']:,} row(s) which were not in it."
+            )
+
+    def write_utilisation_report(self, stats: Counter) -> None:
+        """Report the fraction of the time that each stage of the pipeline
+        spent working, where the chunks were loaded in a pipeline. The stage
+        which is busiest limits the throughput of the load.
+
+        Args:
+            stats: The statistics of the load. See `load_chunks`.
+        """
+        elapsed = stats["pipeline_seconds"]
+        if not elapsed:
+            return
+        stages = ", ".join(
+            f"{stage} {stats[f'{stage}_seconds'] / elapsed:.0%}"
+            for stage in ("read", "clean", "write")
+        )
+        self.stdout.write(f"Pipeline utilisation: {stages}.")
+
+    def write_memory_report(self, stats: Counter) -> None:
+        """Report the memory used by the data that was read, compared to the
+        memory it would have used with the types pandas infers.
+
+        Args:
+            stats: The statistics of the load. See `load_file`.
+        """
+        memory, inferred_memory = stats["memory"], stats["inferred_memory"]
+        if not inferred_memory:
+            return
+        saved = inferred_memory - memory
+        self.stdout.write(
+            f"Read {dtypes.format_bytes(memory)} of data into memory, "
+            f"saving an estimated {dtypes.format_bytes(saved)} "
+            f"({saved / inferred_memory:.0%}) compared to inferred types."
+        )
+
+    def explain(self, filepath: str, read_options: dict) -> None:
+        """Write the plan for cleaning the first chunk of a file, without
+        loading any data.
+
+        Args:
+            filepath: The path to the file.
+            read_options: The keyword arguments for `read_chunks`.
+        """
+        chunk = next(self.read_chunks(filepath, **read_options))
+        self.stdout.write(
+            planner.explain(
+                self.model,
+                self.model.cleaning_strategies,
+                len(chunk),
+                chunk.columns,
+            )
+        )
 
     def handle(self, *args, **options):
         """Main handler for running the command from the command line."""
         self.load_data(options)
+
+
+def _load_file(
+    command_class: _t.Type[LoadDataCommand],
+    filepath: str,
+    read_options: dict,
+    load_options: dict,
+    incremental: bool = False,
+    resume: bool = False,
+    streams: _t.Optional[int] = None,
+    clean_options: _t.Optional[dict] = None,
+    pipelined: bool = False,
+) -> Counter:
+    """Load a single file in a worker process.
+
+    Args:
+        command_class: The class of the command loading the data.
+        filepath: The path to the file.
+        read_options: The keyword arguments for `read_chunks`.
+        load_options: The keyword arguments for `load_from_dataframe`.
+        incremental: Whether to skip the file or its partitions where they
+            have already been loaded with the same content.
+        resume: Whether to continue from where a previous load of the file
+            stopped.
+        streams: The number of streams to write the data with.
+        clean_options: Where given, the chunks are cleaned together.
+        pipelined: Whether to read the next chunk while the previous one is
+            cleaned and written.
+
+    Returns:
+        The statistics of the load. See `LoadDataCommand.load_file`.
+    """
+    return command_class().load_file(
+        filepath,
+        read_options,
+        load_options,
+        incremental,
+        resume,
+        streams,
+        clean_options=clean_options,
+        pipelined=pipelined,
+    )
+
+
+def memory_size_option(value: str) -> int:
+    """Parse an option which is a number of bytes, optionally with a unit
+    such as `MB`.
+
+    Args:
+        value: The value given on the command line.
+
+    Returns:
+        The number of bytes.
+    """
+    match = re.fullmatch(r"(\d+)\s*([KMG]?B?)", value.strip().upper())
+    if match is None:
+        raise argparse.ArgumentTypeError(
+            f"Invalid size ({value}). Expected a number of bytes, such as "
+            "1000000 or 256MB."
+        )
+    number, unit = match.groups()
+    return int(number) * MEMORY_UNITS[unit.rstrip("B")]
+
+
+def batch_size_option(value: str) -> _t.Union[int, str]:
+    """Parse the `--batch-size` option, which is either a number of rows or
+    `auto`.
+
+    Args:
+        value: The value given on the command line.
+
+    Returns:
+        The number of rows, or `auto`.
+    """
+    if value == tuning.AUTO_BATCH_SIZE:
+        return value
+    return int(value)
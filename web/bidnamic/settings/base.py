@@ -41,6 +41,7 @@ INSTALLED_APPS = [
     "rest_framework",
     "campaigns",
     "search",
+    "data_loaders",
 ]
 
 MIDDLEWARE = [
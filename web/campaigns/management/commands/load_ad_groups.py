@@ -1,4 +1,4 @@
-"""Management utility to load ad groups from a CSV file."""
+"""Management utility to load ad groups from a data file."""
 
 from bidnamic.load_data import LoadDataCommand
 from campaigns.models import AdGroup
@@ -6,5 +6,5 @@ from campaigns.models import AdGroup
 
 class Command(LoadDataCommand):
 
-    help = "Loads ad groups from a CSV file."
+    help = "Loads ad groups from a CSV, Parquet or Arrow file."
     model = AdGroup
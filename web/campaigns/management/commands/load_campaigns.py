@@ -1,4 +1,4 @@
-"""Management utility to load campaigns from a CSV file."""
+"""Management utility to load campaigns from a data file."""
 
 from bidnamic.load_data import LoadDataCommand
 from campaigns.models import Campaign
@@ -6,5 +6,5 @@ from campaigns.models import Campaign
 
 class Command(LoadDataCommand):
 
-    help = "Loads campaigns from a CSV file."
+    help = "Loads campaigns from a CSV, Parquet or Arrow file."
     model = Campaign
@@ -1,11 +1,13 @@
 """Integration for commands to load data into the database."""
 
 import os
+from io import StringIO
 from django.test import TransactionTestCase
 from django.conf import settings
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from campaigns import models as campaign_models
-from .utils import get_campaign
+from .utils import get_ad_group, get_campaign
 
 
 class TestLoadData(TransactionTestCase):
@@ -25,6 +27,7 @@ class TestLoadData(TransactionTestCase):
             os.path.join(
                 self.testcases_dir, "load_data_campaigns_testcases.csv"
             ),
+            stdout=StringIO(),
         )
         self.assertEqual(campaign_models.Campaign.objects.count(), 2)
 
@@ -41,6 +44,40 @@ class TestLoadData(TransactionTestCase):
             os.path.join(
                 self.testcases_dir, "load_data_ad_groups_testcases.csv"
             ),
+            stdout=StringIO(),
         )
 
         self.assertEqual(campaign_models.AdGroup.objects.count(), 2)
+
+    def test_load_campaigns_snapshot(self):
+        """Test that the `load_campaigns` command replaces the table with a
+        snapshot, removing the campaigns which are not in it, and refuses a
+        snapshot which is missing campaigns that ad groups refer to.
+        """
+        filepath = os.path.join(
+            self.testcases_dir, "load_data_campaigns_testcases.csv"
+        )
+        get_campaign(100)
+
+        stdout = StringIO()
+        call_command(
+            "load_campaigns", "-f", filepath, "--snapshot", stdout=stdout
+        )
+        self.assertEqual(
+            sorted(
+                campaign_models.Campaign.objects.values_list("id", flat=True)
+            ),
+            [200, 400],
+        )
+        self.assertIn("removing 1 row(s)", stdout.getvalue())
+
+        get_ad_group(10, campaign=get_campaign(10))
+        with self.assertRaisesRegex(CommandError, "campaigns_adgroup"):
+            call_command(
+                "load_campaigns",
+                "-f",
+                filepath,
+                "--snapshot",
+                stdout=StringIO(),
+            )
+        self.assertEqual(campaign_models.Campaign.objects.count(), 3)
@@ -50,6 +50,42 @@ class TestCampaign(TransactionTestCase):
         self.assertEqual(campaign_100.structure_value, "a")
         self.assertEqual(campaign_100.status, "ENABLED")
 
+    def test_load_from_dataframe_in_batches(self):
+        """Test that records are loaded correctly where the batch size is
+        smaller than the dataframe, so that they are sent in several batches.
+        """
+        campaign_models.Campaign.objects.create(
+            id=50,
+            structure_value="b",
+            status="c",
+        )
+
+        df = pd.DataFrame(
+            {
+                "campaign_id": [50, 100, 150, 50],
+                "structure_value": ["a", "a", "a", "a"],
+                "status": ["ENABLED", "ENABLED", "ENABLED", "DISABLED"],
+            }
+        )
+
+        result = campaign_models.Campaign.load_from_dataframe(
+            df, method="insert", batch_size=1
+        )
+
+        self.assertEqual((result.inserted, result.updated), (2, 1))
+        self.assertEqual(
+            list(
+                campaign_models.Campaign.objects.order_by("id").values_list(
+                    "id", "structure_value", "status"
+                )
+            ),
+            [
+                (50, "a", "DISABLED"),
+                (100, "a", "ENABLED"),
+                (150, "a", "ENABLED"),
+            ],
+        )
+
 
 class TestAdGroup(TransactionTestCase):
     """Unittests for the `AdGroup` model."""
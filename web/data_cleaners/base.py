@@ -3,15 +3,39 @@ that is used to define new cleaning strategies. It also contains the main
 function that is used to run the cleaning strategy.
 """
 
+import logging
 import typing as _t
 import pandas as pd
 from django.db.models import Model
 from abc import ABC, abstractmethod
+from . import planner
+
+logger = logging.getLogger(__name__)
 
 
 class CleaningStrategy(ABC):
     """This class defines the strategy for cleaning data."""
 
+    # Strategies which only remove rows and/or columns can set this to True
+    # and implement `keep_mask` and/or `removed_columns`, allowing them to be
+    # fused with neighbouring strategies into a single pass over the data.
+    fusable = False
+
+    # Whether each row is kept or changed based only on its own values,
+    # rather than on the other rows as well.
+    row_wise = False
+
+    # Strategies which describe the columns they read and write, and whether
+    # they remove rows, can set this to True to allow the planner to reorder
+    # them. See `planner.plan_strategies`.
+    plannable = False
+    removes_rows = False
+
+    # Estimates used by the planner of the relative cost of applying the
+    # strategy to a row and of the fraction of rows it keeps.
+    cost = 1.0
+    selectivity = 1.0
+
     def __init__(self, dataframe: pd.DataFrame, model: Model):
         """Initialize the cleaning strategy.
 
@@ -45,6 +69,119 @@ class CleaningStrategy(ABC):
         if not can_use:
             raise NotImplementedError(error_message)
 
+    @classmethod
+    def required_columns(
+        cls, model: Model, columns: _t.Set[str]
+    ) -> _t.Set[str]:
+        """Get the columns which the data must contain before this strategy
+        is applied, given the columns which are needed after it is applied.
+        Strategies which read, create or rename columns should override this.
+
+        Args:
+            model: A django model.
+            columns: The columns needed after the strategy is applied.
+
+        Returns:
+            The columns needed before the strategy is applied.
+        """
+        return set(columns)
+
+    @classmethod
+    def reads(cls, model: Model) -> _t.Set[str]:
+        """Get the columns which the strategy reads. Only used by plannable
+        strategies.
+
+        Args:
+            model: A django model.
+
+        Returns:
+            The names of the columns.
+        """
+        return cls.mask_columns(model)
+
+    @classmethod
+    def writes(cls, model: Model) -> _t.Set[str]:
+        """Get the columns which the strategy creates, changes, renames or
+        removes. Only used by plannable strategies.
+
+        Args:
+            model: A django model.
+
+        Returns:
+            The names of the columns.
+        """
+        return set()
+
+    @classmethod
+    def output_columns(cls, model: Model, columns: _t.Set[str]) -> _t.Set[str]:
+        """Get the columns which the data contains after the strategy is
+        applied, given the columns it contains before. This is the opposite
+        of `required_columns`. Only used by plannable strategies.
+
+        Args:
+            model: A django model.
+            columns: The columns before the strategy is applied.
+
+        Returns:
+            The columns after the strategy is applied.
+        """
+        return set(columns)
+
+    @classmethod
+    def mask_columns(cls, model: Model) -> _t.Set[str]:
+        """Get the columns which decide whether a row is kept by
+        `keep_mask`. Only used by fusable strategies.
+
+        Args:
+            model: A django model.
+
+        Returns:
+            The names of the columns.
+        """
+        return set()
+
+    def keep_mask(self) -> _t.Optional[pd.Series]:
+        """Get a boolean mask of the rows which the strategy would keep,
+        without removing any rows. Only used by fusable strategies.
+
+        Returns:
+            The mask, or None if the strategy does not remove any rows.
+        """
+        return None
+
+    def removed_columns(self) -> _t.List[str]:
+        """Get the columns which the strategy would remove, without removing
+        them. Only used by fusable strategies.
+
+        Returns:
+            The names of the columns.
+        """
+        return []
+
+    @classmethod
+    def stream(
+        cls, model: Model, chunks: _t.Iterator[pd.DataFrame], **options
+    ) -> _t.Iterator[pd.DataFrame]:
+        """Apply the strategy to data which arrives in chunks, yielding the
+        cleaned chunks. By default, each chunk is cleaned on its own as soon
+        as it arrives. Strategies which need to know about the other chunks,
+        such as removing duplicates, should override this and keep whatever
+        state they need between chunks.
+
+        Args:
+            model: A django model.
+            chunks: The chunks of data to clean.
+            options: Options for strategies which override this, which
+                should ignore any option they do not use.
+
+        Yields:
+            The cleaned chunks.
+        """
+        for chunk in chunks:
+            strat = cls(chunk, model)
+            strat.clean()
+            yield strat.dataframe
+
     @abstractmethod
     def clean(self) -> pd.DataFrame:
         """This method cleans the data and returns a cleaned dataframe
@@ -59,25 +196,180 @@ class CleaningStrategy(ABC):
         pass
 
 
-def clean_data(
+def apply_fused(
     dataframe: pd.DataFrame,
     model: Model,
     strategies: _t.List[CleaningStrategy],
 ) -> pd.DataFrame:
-    """This function cleans the data using the given strategies.
+    """Apply a group of fused strategies. The rows to keep from each
+    strategy are combined into a single mask, which is applied along with
+    the columns to remove in one pass over the data.
 
     Args:
         dataframe: A pandas dataframe.
         model: A django model.
-        strategies: A list of cleaning strategies.
+        strategies: A group of strategies which can be fused.
 
     Returns:
         The cleaned dataframe.
     """
-
-    df = dataframe.copy()
+    mask = None
+    removed_columns = set()
     for strategy in strategies:
-        strat = strategy(df, model)
+        strat = strategy(dataframe, model)
+        strat.validate_model()
+        keep_mask = strat.keep_mask()
+        if keep_mask is not None:
+            mask = keep_mask if mask is None else mask & keep_mask
+        removed_columns.update(strat.removed_columns())
+
+    columns = [
+        column for column in dataframe.columns if column not in removed_columns
+    ]
+    if mask is None:
+        return dataframe[columns]
+    return dataframe.loc[mask.to_numpy(), columns]
+
+
+def clean_data(
+    dataframe: _t.Union[pd.DataFrame, _t.Iterator[pd.DataFrame]],
+    model: Model,
+    strategies: _t.List[CleaningStrategy],
+    copy: bool = True,
+    fuse: bool = False,
+    plan: bool = False,
+) -> pd.DataFrame:
+    """This function cleans the data using the given strategies. Where the
+    data is given as an iterator of chunks rather than a dataframe, the
+    chunks are cleaned as a generator pipeline. See `clean_chunks`.
+
+    Args:
+        dataframe: A pandas dataframe, or an iterator of chunks of one.
+        model: A django model.
+        strategies: A list of cleaning strategies.
+        copy: Whether to copy the dataframe before cleaning it. Where the
+            caller no longer needs the dataframe, this can be set to False to
+            avoid the copy, in which case the dataframe may be modified.
+        fuse: Whether to fuse consecutive strategies which only remove rows
+            and columns into a single pass over the data. This gives the same
+            result as applying them one after another.
+        plan: Whether to let the planner reorder the strategies into the
+            order which is estimated to be cheapest. Only strategies which
+            give the same result in either order are swapped.
+
+    Returns:
+        The cleaned dataframe, or an iterator of cleaned chunks.
+    """
+    if not isinstance(dataframe, pd.DataFrame):
+        return clean_chunks(
+            dataframe, model, strategies, copy=copy, fuse=fuse, plan=plan
+        )
+
+    df = dataframe.copy() if copy else dataframe
+    if plan:
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                planner.explain(model, strategies, len(df), df.columns)
+            )
+        strategies = planner.plan_strategies(
+            model, strategies, len(df), df.columns
+        )
+    groups = (
+        planner.fuse_strategies(model, strategies)
+        if fuse
+        else [[strategy] for strategy in strategies]
+    )
+    for group in groups:
+        if len(group) > 1:
+            df = apply_fused(df, model, group)
+            continue
+        strat = group[0](df, model)
         strat.clean()
         df = strat.dataframe
     return df
+
+
+def clean_chunks(
+    chunks: _t.Iterable[pd.DataFrame],
+    model: Model,
+    strategies: _t.List[CleaningStrategy],
+    copy: bool = True,
+    fuse: bool = False,
+    plan: bool = False,
+    **options,
+) -> _t.Iterator[pd.DataFrame]:
+    """Clean data which arrives in chunks, without holding all of it in
+    memory at once. Each strategy which needs to see the other chunks, by
+    overriding `CleaningStrategy.stream`, is a stage of a generator pipeline
+    which takes the chunks from the previous stage. The strategies between
+    them are applied to each chunk together with `clean_data`, so that they
+    can be fused and planned in the same way. A chunk passes through every
+    stage before the next chunk is read, unless a strategy needs to see
+    later chunks first. The result is the same as cleaning all of the chunks
+    as a single dataframe.
+
+    Args:
+        chunks: The chunks of data to clean.
+        model: A django model.
+        strategies: A list of cleaning strategies.
+        copy: Whether to copy each chunk before cleaning it. See
+            `clean_data`.
+        fuse: Whether to fuse the strategies applied to each chunk. See
+            `clean_data`.
+        plan: Whether to let the planner reorder the strategies applied to
+            each chunk. See `clean_data`.
+        options: Keyword arguments for the `stream` methods of the
+            strategies which override it.
+
+    Returns:
+        An iterator of the cleaned chunks.
+    """
+    chunks = iter(chunks)
+    if copy:
+        chunks = (chunk.copy() for chunk in chunks)
+    per_chunk = []
+    for strategy in strategies:
+        if strategy.stream.__func__ is CleaningStrategy.stream.__func__:
+            per_chunk.append(strategy)
+            continue
+        if per_chunk:
+            chunks = _clean_each(chunks, model, per_chunk, fuse, plan)
+            per_chunk = []
+        chunks = strategy.stream(model, chunks, **options)
+    if per_chunk:
+        chunks = _clean_each(chunks, model, per_chunk, fuse, plan)
+    return chunks
+
+
+def _clean_each(
+    chunks: _t.Iterator[pd.DataFrame],
+    model: Model,
+    strategies: _t.List[CleaningStrategy],
+    fuse: bool,
+    plan: bool,
+) -> _t.Iterator[pd.DataFrame]:
+    """Clean each chunk on its own with `clean_data`, for `clean_chunks`."""
+    for chunk in chunks:
+        yield clean_data(
+            chunk, model, strategies, copy=False, fuse=fuse, plan=plan
+        )
+
+
+def required_columns(
+    model: Model, strategies: _t.List[CleaningStrategy]
+) -> _t.Set[str]:
+    """Get the columns of the source data which are needed to clean it with
+    the given strategies and load it into the model's table. Any other column
+    is dropped or ignored, so it does not need to be read at all.
+
+    Args:
+        model: A django model.
+        strategies: A list of cleaning strategies.
+
+    Returns:
+        The names of the columns in the source data which are needed.
+    """
+    columns = {field.column for field in model._meta.concrete_fields}
+    for strategy in reversed(strategies):
+        columns = strategy.required_columns(model, columns)
+    return columns
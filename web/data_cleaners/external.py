@@ -0,0 +1,235 @@
+"""This module contains functions for removing duplicate rows from data which
+is too large to hold in memory, keeping the last of each set of duplicates.
+
+Rather than hashing the values of the columns which identify a row, which for
+long strings takes up a lot of memory, each row is reduced to a fixed-width
+128-bit digest of those values along with its position in the data. The rows
+themselves are written to disk as they arrive. Whilst the digests fit within
+the memory budget they are held in memory, otherwise they are partitioned to
+disk by their leading bits so that each partition can be resolved on its
+own. The rows which are kept are then read back in their original order, so
+the result is the same as removing the duplicates in memory.
+
+Chunks of the same data can be read with different dtypes, such as integers
+in one chunk and floats in another which has missing values, or categories in
+one chunk and strings in another. The values are converted to strings before
+they are hashed, so that equal values have the same digest in every chunk.
+
+The chance of two different rows having the same digest is around n^2 / 2^129
+for n distinct rows, which for a billion rows is less than one in 10^20.
+"""
+
+import os
+import pickle
+import tempfile
+import typing as _t
+import numpy as np
+import pandas as pd
+
+# The keys used to hash the values of each row twice, giving two independent
+# 64-bit halves of its digest.
+HASH_KEYS = ("0123456789123456", "bidnamic-dedup-1")
+
+# The digest of a row and its position in the data.
+RECORD_DTYPE = np.dtype([("high", "<u8"), ("low", "<u8"), ("position", "<i8")])
+
+# The number of leading bits of a digest used to choose its partition, giving
+# 256 partitions which are each resolved in memory on their own.
+PARTITION_BITS = 8
+
+
+def canonical(series: pd.Series) -> pd.Series:
+    """Convert the values of a column to strings which are the same for
+    equal values whatever the dtype of the column. Floats which are whole
+    numbers are written as integers, so that `1.0` matches `1`, and
+    categories are written as their values.
+
+    Args:
+        series: A column of a pandas dataframe.
+
+    Returns:
+        The values as pandas strings, with missing values as `<NA>`.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = pd.Series(np.asarray(series), index=series.index)
+    strings = series.astype("string")
+    if pd.api.types.is_float_dtype(series.dtype):
+        whole = ((series % 1 == 0) & (series.abs() < 2 ** 63)).fillna(False)
+        strings[whole] = series[whole].astype("Int64").astype("string")
+    return strings
+
+
+def row_digests(
+    dataframe: pd.DataFrame, columns: _t.List[str], start: int = 0
+) -> np.ndarray:
+    """Reduce each row to a 128-bit digest of the values in the given columns
+    and its position in the data. The values are hashed in their canonical
+    form. See `canonical`.
+
+    Args:
+        dataframe: A pandas dataframe.
+        columns: The columns which identify a row.
+        start: The position of the dataframe's first row in the data.
+
+    Returns:
+        A structured array of the digest and position of each row.
+    """
+    subset = pd.DataFrame(
+        {column: canonical(dataframe[column]) for column in columns}
+    )
+    records = np.empty(len(dataframe), dtype=RECORD_DTYPE)
+    for name, hash_key in zip(("high", "low"), HASH_KEYS):
+        records[name] = pd.util.hash_pandas_object(
+            subset, index=False, hash_key=hash_key
+        ).to_numpy()
+    records["position"] = np.arange(start, start + len(dataframe))
+    return records
+
+
+def last_positions(records: np.ndarray) -> np.ndarray:
+    """Find the positions of the last row with each digest.
+
+    Args:
+        records: A structured array of digests and positions.
+
+    Returns:
+        The positions of the rows to keep.
+    """
+    if not len(records):
+        return np.empty(0, dtype=np.int64)
+    order = np.lexsort((records["position"], records["low"], records["high"]))
+    ordered = records[order]
+    last = np.ones(len(ordered), dtype=bool)
+    last[:-1] = (ordered["high"][1:] != ordered["high"][:-1]) | (
+        ordered["low"][1:] != ordered["low"][:-1]
+    )
+    return ordered["position"][last]
+
+
+def spill(records: _t.List[np.ndarray], directory: str) -> None:
+    """Append the records to the partition files which their digests belong
+    to.
+
+    Args:
+        records: The structured arrays of digests and positions to write.
+        directory: The directory holding the partition files.
+    """
+    if not records:
+        return
+    records = np.concatenate(records)
+    partitions = records["high"] >> np.uint64(64 - PARTITION_BITS)
+    order = np.argsort(partitions, kind="stable")
+    records, partitions = records[order], partitions[order]
+    bounds = np.flatnonzero(np.diff(partitions)) + 1
+    for part in np.split(records, bounds):
+        path = partition_path(directory, int(part["high"][0]))
+        with open(path, "ab") as partition_file:
+            part.tofile(partition_file)
+
+
+def partition_path(directory: str, high: int) -> str:
+    """Get the path of the partition file which a digest belongs to.
+
+    Args:
+        directory: The directory holding the partition files.
+        high: The first half of the digest.
+
+    Returns:
+        The path of the partition file.
+    """
+    return os.path.join(
+        directory, f"partition-{high >> (64 - PARTITION_BITS):03d}.bin"
+    )
+
+
+def rechunk(
+    dataframes: _t.Iterable[pd.DataFrame], chunk_size: int
+) -> _t.Iterator[pd.DataFrame]:
+    """Combine and split dataframes into chunks of the given size. Only the
+    last chunk may be smaller.
+
+    Args:
+        dataframes: The dataframes, in order.
+        chunk_size: The number of rows in each chunk.
+
+    Yields:
+        The chunks.
+    """
+    pending, rows = [], 0
+    for dataframe in dataframes:
+        if not len(dataframe):
+            continue
+        pending.append(dataframe)
+        rows += len(dataframe)
+        while rows >= chunk_size:
+            combined = pending[0] if len(pending) == 1 else pd.concat(pending)
+            yield combined.iloc[:chunk_size].copy()
+            rest = combined.iloc[chunk_size:]
+            pending, rows = ([rest] if len(rest) else []), len(rest)
+    if pending:
+        yield pd.concat(pending).copy()
+
+
+def keep_last(
+    chunks: _t.Iterable[pd.DataFrame],
+    columns: _t.List[str],
+    memory_budget: int,
+    directory: _t.Optional[str] = None,
+) -> _t.Iterator[pd.DataFrame]:
+    """Remove duplicate rows across all of the chunks, keeping the last of
+    each set of duplicates, without holding the rows in memory. The rows are
+    yielded once the chunks run out, in their original order and in chunks of
+    the same size as the first chunk.
+
+    Args:
+        chunks: The chunks of data, in order.
+        columns: The columns which identify a row.
+        memory_budget: The number of bytes of digests to hold in memory
+            before partitioning them to disk.
+        directory: The directory to write temporary files to. Defaults to
+            the system's temporary directory.
+
+    Yields:
+        The chunks of the rows which are kept.
+    """
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        rows_path = os.path.join(tmp, "rows.pickle")
+        buffered, buffered_bytes, spilled = [], 0, False
+        rows = chunk_size = chunk_count = 0
+        with open(rows_path, "wb") as rows_file:
+            for chunk in chunks:
+                chunk_size = chunk_size or len(chunk)
+                chunk_count += 1
+                pickle.dump(chunk, rows_file, pickle.HIGHEST_PROTOCOL)
+                records = row_digests(chunk, columns, start=rows)
+                rows += len(chunk)
+                buffered.append(records)
+                buffered_bytes += records.nbytes
+                if buffered_bytes > memory_budget:
+                    spill(buffered, tmp)
+                    buffered, buffered_bytes, spilled = [], 0, True
+
+        keep = np.zeros(rows, dtype=bool)
+        if spilled:
+            spill(buffered, tmp)
+            del buffered
+            for name in sorted(os.listdir(tmp)):
+                if name.startswith("partition-"):
+                    path = os.path.join(tmp, name)
+                    records = np.fromfile(path, dtype=RECORD_DTYPE)
+                    keep[last_positions(records)] = True
+                    os.remove(path)
+        elif buffered:
+            keep[last_positions(np.concatenate(buffered))] = True
+            del buffered
+
+        def kept_rows():
+            start = 0
+            with open(rows_path, "rb") as rows_file:
+                for _ in range(chunk_count):
+                    chunk = pickle.load(rows_file)
+                    mask = keep[start : start + len(chunk)]  # noqa: E203
+                    start += len(chunk)
+                    yield chunk[mask]
+
+        yield from rechunk(kept_rows(), max(chunk_size, 1))
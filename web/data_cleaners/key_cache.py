@@ -0,0 +1,157 @@
+"""This module contains a process-level cache of the keys which are known to
+exist in a table, so that foreign keys which have already been found to be
+valid are not looked up again, including by later loads in the same process.
+
+The keys for each table are held as a sorted numpy array, which takes up far
+less memory than a set of python objects and is searched in a single
+vectorised pass. The cache is exact, so it never causes a row to be kept
+which should have been removed, provided that the table is only changed
+through this process. Loading data into a table only adds keys, so the keys
+of the rows which are written are merged into the cache rather than
+forgetting the table's keys. The keys are forgotten when rows are deleted
+through django, when a snapshot is swapped in for the table and when the
+database is flushed or migrated.
+"""
+
+import typing as _t
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from django.db.models import Model
+from django.db.models.signals import post_delete, post_migrate
+
+
+class KeyCache:
+    """A cache of the keys which are known to exist in each table, keyed by
+    the model and the field which the keys belong to.
+
+    Deleting rows must forget the keys, so a `post_delete` receiver is
+    connected for each model while its keys are cached. A receiver stops
+    django from deleting the model's rows in bulk without loading them, so
+    it is only connected for the models whose keys are cached, and is
+    disconnected once they are forgotten.
+    """
+
+    def __init__(self):
+        """Initialize an empty cache."""
+        self.keys: _t.Dict[_t.Tuple[Model, str], np.ndarray] = {}
+
+    def contains(self, model: Model, field: str, keys: list) -> np.ndarray:
+        """Check which of the keys are known to exist.
+
+        Args:
+            model: The model which the keys belong to.
+            field: The field which the keys belong to.
+            keys: The keys to check.
+
+        Returns:
+            A boolean array which is True where the key is known to exist.
+        """
+        cached = self.keys.get((model, field))
+        if cached is None or not len(cached) or not keys:
+            return np.zeros(len(keys), dtype=bool)
+        keys = np.asarray(keys)
+        positions = np.searchsorted(cached, keys)
+        positions = np.minimum(positions, len(cached) - 1)
+        return cached[positions] == keys
+
+    def add(self, model: Model, field: str, keys: _t.Iterable) -> None:
+        """Remember that the keys exist. Where this is called within a
+        transaction, the keys are only remembered once the transaction is
+        committed, as they may have been created by it.
+
+        Args:
+            model: The model which the keys belong to.
+            field: The field which the keys belong to.
+            keys: The keys which exist.
+        """
+        keys = list(keys)
+        if keys:
+            transaction.on_commit(lambda: self.merge(model, field, keys))
+
+    def add_rows(self, model: Model, dataframe: pd.DataFrame) -> None:
+        """Remember the keys of rows which have been written to the model's
+        table, for each field of the model whose keys are cached. Fields
+        which are not cached are left alone, so that the keys of a model
+        which is not referred to by a foreign key are never cached. As with
+        `add`, the keys are only remembered once the transaction is
+        committed.
+
+        Args:
+            model: The model whose table the rows were written to.
+            dataframe: The rows which were written.
+        """
+        for field in self.fields(model):
+            column = model._meta.get_field(field).column
+            if column in dataframe:
+                self.add(
+                    model, field, dataframe[column].drop_duplicates().tolist()
+                )
+
+    def fields(self, model: Model) -> _t.List[str]:
+        """Get the fields of a model whose keys are cached.
+
+        Args:
+            model: A django model.
+
+        Returns:
+            The names of the fields.
+        """
+        return [field for cached, field in self.keys if cached is model]
+
+    def merge(self, model: Model, field: str, keys: list) -> None:
+        """Merge the keys into the sorted array of keys for the model.
+
+        Args:
+            model: The model which the keys belong to.
+            field: The field which the keys belong to.
+            keys: The keys which exist.
+        """
+        cached = self.keys.get((model, field))
+        if cached is None:
+            post_delete.connect(
+                self.on_delete,
+                sender=model,
+                weak=False,
+                dispatch_uid=self.dispatch_uid(model),
+            )
+            self.keys[(model, field)] = np.unique(np.asarray(keys))
+        else:
+            self.keys[(model, field)] = np.union1d(cached, keys)
+
+    def invalidate(self, model: Model) -> None:
+        """Forget the keys of a model, such as after its table has changed.
+
+        Args:
+            model: The model which the keys belong to.
+        """
+        for field in self.fields(model):
+            del self.keys[(model, field)]
+        post_delete.disconnect(
+            sender=model, dispatch_uid=self.dispatch_uid(model)
+        )
+
+    def clear(self) -> None:
+        """Forget the keys of every model."""
+        for model in {model for model, _ in self.keys}:
+            self.invalidate(model)
+
+    def dispatch_uid(self, model: Model) -> tuple:
+        """Get the identifier of the `post_delete` receiver of a model."""
+        return ("key_cache", id(self), model)
+
+    def on_delete(self, sender: Model, **kwargs) -> None:
+        """Forget the keys of a model when any of its rows are deleted."""
+        self.invalidate(sender)
+
+
+# The cache used by the cleaning strategies and loaders.
+valid_keys = KeyCache()
+
+
+def _clear_keys(**kwargs) -> None:
+    """Forget every key when the database is flushed or migrated."""
+    valid_keys.clear()
+
+
+post_migrate.connect(_clear_keys, dispatch_uid="key_cache_clear")
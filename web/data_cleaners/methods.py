@@ -1,13 +1,29 @@
 """This module contains shared methods for cleaning data."""
 
+import logging
 import typing as _t
+import numpy as np
 import pandas as pd
+from django.db import connection, models
+from django.db.models import Model
+from data_loaders.utils import array_types, column_values
+from . import external, key_cache
 from .base import CleaningStrategy
 
+logger = logging.getLogger(__name__)
+
 
 class RemoveDuplicates(CleaningStrategy):
     """Deletes duplicate data from the dataframe keeping on the last row."""
 
+    fusable = True
+    plannable = True
+    removes_rows = True
+    # Hashing the subset of each row is relatively expensive, whilst there
+    # are usually few duplicates.
+    cost = 3.0
+    selectivity = 0.99
+
     def can_use_cleaner(self) -> _t.Tuple[bool, _t.Union[str, None]]:
         """Checks if the model can use the cleaner.
 
@@ -33,6 +49,124 @@ class RemoveDuplicates(CleaningStrategy):
             )
         return True, None
 
+    @classmethod
+    def required_columns(
+        cls, model: Model, columns: _t.Set[str]
+    ) -> _t.Set[str]:
+        """The columns which duplicates are identified by are needed."""
+        data_cleaner = getattr(model, "DataCleaner", None)
+        return set(columns) | set(
+            getattr(data_cleaner, "remove_duplicates_subset_fields", [])
+        )
+
+    @classmethod
+    def mask_columns(cls, model: Model) -> _t.Set[str]:
+        """Rows are compared by the duplicate subset fields."""
+        data_cleaner = getattr(model, "DataCleaner", None)
+        return set(
+            getattr(data_cleaner, "remove_duplicates_subset_fields", [])
+        )
+
+    def keep_mask(self) -> pd.Series:
+        """Keeps the last of each set of duplicate rows."""
+        return ~self.dataframe.duplicated(
+            subset=self.model.DataCleaner.remove_duplicates_subset_fields,
+            keep="last",
+        )
+
+    @classmethod
+    def stream(
+        cls,
+        model: Model,
+        chunks: _t.Iterator[pd.DataFrame],
+        memory_budget: _t.Optional[int] = None,
+        **options,
+    ) -> _t.Iterator[pd.DataFrame]:
+        """Removes duplicates across all of the chunks. Whether a row is the
+        last of its duplicates is only known once every chunk has been seen,
+        so the last seen row for each key is kept between chunks and the
+        rows are yielded once the chunks run out, in chunks of the same size
+        as the first chunk. Superseded rows are discarded as the chunks
+        arrive, so only about one row per key is held in memory.
+
+        Where a memory budget is given, or the model sets
+        `DataCleaner.remove_duplicates_memory_budget`, the rows are instead
+        written to disk and only a fixed-width digest of each row is held in
+        memory, up to the budget in bytes, beyond which the digests are
+        partitioned to disk too. The result is the same. See
+        `external.keep_last`.
+
+        Args:
+            model: A django model.
+            chunks: The chunks of data to clean.
+            memory_budget: The number of bytes of digests to hold in memory.
+                Defaults to the model's
+                `DataCleaner.remove_duplicates_memory_budget`, if it is set.
+            options: Not used.
+
+        Yields:
+            The cleaned chunks.
+        """
+        if memory_budget is None:
+            memory_budget = getattr(
+                getattr(model, "DataCleaner", None),
+                "remove_duplicates_memory_budget",
+                None,
+            )
+        if memory_budget is not None:
+            cls(pd.DataFrame(), model).validate_model()
+            yield from external.keep_last(
+                chunks,
+                model.DataCleaner.remove_duplicates_subset_fields,
+                memory_budget,
+            )
+            return
+
+        last_seen = []
+        rows = compacted_rows = chunk_size = 0
+        for chunk in chunks:
+            strat = cls(chunk, model)
+            strat.clean()
+            chunk_size = chunk_size or len(chunk)
+            last_seen.append(strat.dataframe)
+            rows += len(strat.dataframe)
+
+            # Compacting each time the rows held double keeps the total cost
+            # of compacting proportional to the number of rows.
+            if rows > 2 * max(compacted_rows, chunk_size):
+                last_seen = [cls.keep_last(model, last_seen)]
+                rows = compacted_rows = len(last_seen[0])
+
+        if not last_seen:
+            return
+        dataframe = cls.keep_last(model, last_seen)
+        chunk_size = max(chunk_size, 1)
+        for start in range(0, len(dataframe), chunk_size):
+            # Each chunk is copied so that later strategies can modify it.
+            yield dataframe.iloc[
+                start : start + chunk_size  # noqa: E203
+            ].copy()
+
+    @classmethod
+    def keep_last(
+        cls, model: Model, dataframes: _t.List[pd.DataFrame]
+    ) -> pd.DataFrame:
+        """Combines chunks of data, keeping the last of each set of duplicate
+        rows.
+
+        Args:
+            model: A django model.
+            dataframes: The chunks of data, in order.
+
+        Returns:
+            The combined data.
+        """
+        if len(dataframes) == 1:
+            return dataframes[0]
+        strat = cls(pd.concat(dataframes), model)
+        strat.clean()
+        return strat.dataframe
+
     def clean(self) -> pd.DataFrame:
         """Executes the cleaning task."""
         self.validate_model()
@@ -46,6 +180,11 @@ class RemoveDuplicates(CleaningStrategy):
 class RenameHeaders(CleaningStrategy):
     """Renames the headers of the dataframe."""
 
+    row_wise = True
+    plannable = True
+    # Renaming only changes the headers, not the rows.
+    cost = 0.0
+
     def can_use_cleaner(self) -> _t.Tuple[bool, _t.Union[str, None]]:
         """Checks if the model can use the cleaner.
 
@@ -69,6 +208,32 @@ class RenameHeaders(CleaningStrategy):
             )
         return True, None
 
+    @classmethod
+    def required_columns(
+        cls, model: Model, columns: _t.Set[str]
+    ) -> _t.Set[str]:
+        """The columns which are needed after being renamed are needed under
+        their original names.
+        """
+        data_cleaner = getattr(model, "DataCleaner", None)
+        header_map = getattr(data_cleaner, "rename_headers_header_map", {})
+        original_names = {new: old for old, new in header_map.items()}
+        return {original_names.get(column, column) for column in columns}
+
+    @classmethod
+    def writes(cls, model: Model) -> _t.Set[str]:
+        """Both the original and the new names of the headers."""
+        data_cleaner = getattr(model, "DataCleaner", None)
+        header_map = getattr(data_cleaner, "rename_headers_header_map", {})
+        return set(header_map) | set(header_map.values())
+
+    @classmethod
+    def output_columns(cls, model: Model, columns: _t.Set[str]) -> _t.Set[str]:
+        """The headers are renamed."""
+        data_cleaner = getattr(model, "DataCleaner", None)
+        header_map = getattr(data_cleaner, "rename_headers_header_map", {})
+        return {header_map.get(column, column) for column in columns}
+
     def clean(self) -> pd.DataFrame:
         """Executes the cleaning task."""
         self.validate_model()
@@ -84,6 +249,64 @@ class FilterValidForeignKeys(CleaningStrategy):
     key is associated with.
     """
 
+    fusable = True
+    row_wise = True
+    plannable = True
+    removes_rows = True
+    selectivity = 0.95
+
+    @staticmethod
+    def fetch_valid_keys(model: Model, field: str, keys: list) -> set:
+        """Fetch which of the given keys exist in a model's table. The keys
+        are sent as a single array so that the cost of the query depends on
+        the number of keys rather than on the size of the table.
+
+        Args:
+            model: The model which the foreign key refers to.
+            field: The field which the foreign key refers to.
+            keys: The keys to look up.
+
+        Returns:
+            The keys which exist.
+        """
+        if not keys:
+            return set()
+        column = model._meta.get_field(field).column
+        query = "SELECT {column} FROM {table} WHERE {column} = ANY(%s::{type})"
+        with connection.cursor() as cursor:
+            cursor.execute(
+                query.format(
+                    column=connection.ops.quote_name(column),
+                    table=connection.ops.quote_name(model._meta.db_table),
+                    type=array_types(model, [column])[0],
+                ),
+                [keys],
+            )
+            return {row[0] for row in cursor.fetchall()}
+
+    @classmethod
+    def valid_keys(cls, model: Model, field: str, keys: list) -> set:
+        """Get which of the given keys are valid. Keys which are not in the
+        process-level cache of valid keys are looked up, and those which are
+        found are added to it. See `key_cache.KeyCache`.
+
+        Args:
+            model: The model which the foreign key refers to.
+            field: The field which the foreign key refers to.
+            keys: The distinct keys to check.
+
+        Returns:
+            The keys which are valid.
+        """
+        known = key_cache.valid_keys.contains(model, field, keys)
+        found = cls.fetch_valid_keys(
+            model,
+            field,
+            [key for key, is_known in zip(keys, known) if not is_known],
+        )
+        key_cache.valid_keys.add(model, field, found)
+        return found | {key for key, is_known in zip(keys, known) if is_known}
+
     def can_use_cleaner(self) -> _t.Tuple[bool, _t.Union[str, None]]:
         """Checks if the model can use the cleaner.
 
@@ -106,35 +329,164 @@ class FilterValidForeignKeys(CleaningStrategy):
             )
         return True, None
 
+    @classmethod
+    def required_columns(
+        cls, model: Model, columns: _t.Set[str]
+    ) -> _t.Set[str]:
+        """The foreign key columns which are checked are needed."""
+        data_cleaner = getattr(model, "DataCleaner", None)
+        return set(columns) | set(getattr(data_cleaner, "fk_map", {}))
+
+    @classmethod
+    def mask_columns(cls, model: Model) -> _t.Set[str]:
+        """Rows are kept based on their foreign keys."""
+        data_cleaner = getattr(model, "DataCleaner", None)
+        return set(getattr(data_cleaner, "fk_map", {}))
+
+    def keep_mask(self) -> pd.Series:
+        """Keeps the rows where every foreign key is valid. Only the distinct
+        keys in the dataframe are looked up.
+        """
+        mask = pd.Series(True, index=self.dataframe.index)
+        for column, fk in self.model.DataCleaner.fk_map.items():
+            keys = column_values(pd.Series(self.dataframe[column].unique()))
+            valid_keys = self.valid_keys(
+                fk["model"],
+                fk["field"],
+                [key for key in keys if key is not None],
+            )
+            mask &= self.dataframe[column].isin(valid_keys)
+        return mask
+
     def clean(self):
         """Executes the cleaning task."""
         self.validate_model()
+        # Remove rows that contain invalid foreign keys
+        mask = self.keep_mask()
+        self.dataframe.drop(
+            self.dataframe[~mask].index,
+            inplace=True,
+        )
+
+
+class FilterInvalidValues(CleaningStrategy):
+    """Removes the rows which the database would reject because a value does
+    not fit the constraints of its field, so that they are removed before
+    any data is sent to the database rather than failing the load. The
+    checks are derived from the model's fields and applied to whole columns
+    at a time:
+
+    * Fields which are not nullable must not be missing.
+    * Integer fields, including foreign keys, must be within the range of
+      their column, so positive integer fields must not be negative.
+    * Decimal fields must fit in their number of digits once rounded to
+      their number of decimal places, as the database rounds any further
+      places rather than rejecting them.
+    * Char fields must be no longer than their maximum length.
+
+    Only the columns of the dataframe which belong to the model are checked.
+    The number of rows removed for each column is logged as a warning.
+    """
+
+    fusable = True
+    row_wise = True
+    plannable = True
+    removes_rows = True
+    selectivity = 0.99
+
+    @classmethod
+    def mask_columns(cls, model: Model) -> _t.Set[str]:
+        """Rows are kept based on the columns of the model's fields."""
+        return {field.column for field in model._meta.concrete_fields}
 
-        columns = list(self.model.DataCleaner.fk_map.keys())
+    @staticmethod
+    def invalid_values(field: models.Field, series: pd.Series) -> pd.Series:
+        """Find the values of a column which do not fit the constraints of
+        its field.
 
-        for column in columns:
-            model = self.model.DataCleaner.fk_map[column]["model"]
-            field = self.model.DataCleaner.fk_map[column]["field"]
+        Args:
+            field: The model field which the column belongs to.
+            series: The column.
 
-            # Get a set of all the primary keys from the model
-            pk_set = set(model.objects.values_list(field, flat=True))
+        Returns:
+            A boolean series which is True where the value is invalid.
+        """
+        present = series.notna().to_numpy()
+        invalid = np.zeros(len(series), dtype=bool) if field.null else ~present
+        if isinstance(field, models.ForeignKey):
+            field = field.target_field
 
-            # Get a set of all the foreign keys from the dataframe
-            fk_set = set(self.dataframe[column].unique())
+        if isinstance(field, models.CharField) and field.max_length:
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                # Only the length of each distinct value is measured.
+                lengths = series.cat.categories.str.len().to_numpy()
+                codes = series.cat.codes.to_numpy()
+                invalid |= (codes >= 0) & (lengths[codes] > field.max_length)
+            else:
+                too_long = series.str.len() > field.max_length
+                invalid |= too_long.fillna(False).to_numpy(dtype=bool)
 
-            # Check if the foreign keys are valid
-            invalid_fk_set = fk_set - pk_set
-            # Remove rows that contain invalid foreign keys
-            self.dataframe.drop(
-                self.dataframe[
-                    self.dataframe[column].isin(invalid_fk_set)
-                ].index,
-                inplace=True,
+        elif isinstance(field, (models.IntegerField, models.AutoField)):
+            low, high = connection.ops.integer_field_range(
+                field.get_internal_type()
             )
+            values = pd.to_numeric(series, errors="coerce")
+            valid = (values >= low) & (values <= high)
+            if pd.api.types.is_float_dtype(values.dtype):
+                valid &= values % 1 == 0
+            invalid |= present & ~valid.fillna(False).to_numpy(dtype=bool)
+
+        elif isinstance(field, models.DecimalField):
+            values = pd.to_numeric(series, errors="coerce").to_numpy(
+                dtype="float64", na_value=np.nan
+            )
+            limit = 10 ** (field.max_digits - field.decimal_places)
+            invalid |= present & ~(
+                np.abs(np.round(values, field.decimal_places)) < limit
+            )
+
+        return pd.Series(invalid, index=series.index)
+
+    def keep_mask(self) -> pd.Series:
+        """Keeps the rows where every value fits the constraints of its
+        field.
+        """
+        mask = pd.Series(True, index=self.dataframe.index)
+        for field in self.model._meta.concrete_fields:
+            if field.column not in self.dataframe.columns:
+                continue
+            invalid = self.invalid_values(field, self.dataframe[field.column])
+            count = int(invalid.sum())
+            if count:
+                logger.warning(
+                    "Removed %s row(s) of %s where `%s` is missing or does "
+                    "not fit in its column.",
+                    count,
+                    self.model.__name__,
+                    field.column,
+                )
+                mask &= ~invalid.to_numpy()
+        return mask
+
+    def clean(self):
+        """Executes the cleaning task."""
+        self.validate_model()
+        mask = self.keep_mask()
+        self.dataframe.drop(
+            self.dataframe[~mask].index,
+            inplace=True,
+        )
 
 
 class RemoveColumns(CleaningStrategy):
-    """Removes columns from a dataframe."""
+    """Removes columns from a dataframe. Columns which are not in the
+    dataframe, such as those which were never read, are ignored.
+    """
+
+    fusable = True
+    row_wise = True
+    plannable = True
+    cost = 0.0
 
     def can_use_cleaner(self) -> _t.Tuple[bool, _t.Union[str, None]]:
         """Checks if the model can use the cleaner.
@@ -157,9 +509,27 @@ class RemoveColumns(CleaningStrategy):
             )
         return True, None
 
+    @classmethod
+    def writes(cls, model: Model) -> _t.Set[str]:
+        """The columns which are removed."""
+        data_cleaner = getattr(model, "DataCleaner", None)
+        return set(getattr(data_cleaner, "remove_columns", []))
+
+    @classmethod
+    def output_columns(cls, model: Model, columns: _t.Set[str]) -> _t.Set[str]:
+        """The columns which are removed are no longer present."""
+        return set(columns) - cls.writes(model)
+
+    def removed_columns(self) -> _t.List[str]:
+        """The columns listed in `DataCleaner.remove_columns`."""
+        return self.model.DataCleaner.remove_columns
+
     def clean(self) -> pd.DataFrame:
         """Executes the cleaning task."""
         self.validate_model()
         self.dataframe.drop(
-            self.model.DataCleaner.remove_columns, axis=1, inplace=True
+            self.model.DataCleaner.remove_columns,
+            axis=1,
+            inplace=True,
+            errors="ignore",
         )
@@ -0,0 +1,289 @@
+"""This module contains a planner which chooses the order in which cleaning
+strategies are applied. Strategies are only reordered where doing so gives
+the same result, and the order which is estimated to be the cheapest is
+chosen. For example, cheap filters are applied before removing duplicates so
+that there are fewer rows to compare, and columns are removed first so that
+there are fewer values to copy whenever rows are removed.
+"""
+
+import typing as _t
+import pandas as pd
+from django.db.models import Model
+
+if _t.TYPE_CHECKING:  # pragma: no cover
+    from .base import CleaningStrategy
+
+# The estimated cost of copying a single value relative to the cost of
+# applying a strategy to a row. Values are copied whenever rows or columns are
+# removed.
+COPY_COST = 0.1
+
+# Strategies are only reordered where there are at most this many, as every
+# possible order is considered.
+MAX_PLANNED_STRATEGIES = 8
+
+
+class PlanStep(_t.NamedTuple):
+    """The estimated cost of applying a strategy as part of a plan."""
+
+    strategy: "CleaningStrategy"
+    rows: float
+    columns: int
+    cost: float
+
+
+def can_fuse(
+    model: Model, strategy: "CleaningStrategy", other: "CleaningStrategy"
+) -> bool:
+    """Check whether two fusable strategies give the same result whichever
+    order they are applied in, so that their masks can be computed on the
+    same data and combined.
+
+    Strategies which keep rows based only on their own values can always be
+    reordered. Otherwise, such a strategy can be reordered with a strategy
+    that compares rows, such as removing duplicates, if its mask only depends
+    on columns which the other strategy compares rows by. Rows which are
+    compared with each other then have the same values in those columns, so
+    they are either all kept or all removed.
+
+    Args:
+        model: A django model.
+        strategy: A fusable cleaning strategy.
+        other: Another fusable cleaning strategy.
+
+    Returns:
+        True if the strategies can be fused.
+    """
+    if not strategy.mask_columns(model) or not other.mask_columns(model):
+        return True
+    if strategy.row_wise and other.row_wise:
+        return True
+    if strategy.row_wise:
+        return strategy.mask_columns(model) <= other.mask_columns(model)
+    if other.row_wise:
+        return other.mask_columns(model) <= strategy.mask_columns(model)
+    return False
+
+
+def fuse_strategies(
+    model: Model, strategies: _t.List["CleaningStrategy"]
+) -> _t.List[_t.List["CleaningStrategy"]]:
+    """Group consecutive fusable strategies which can all be fused with each
+    other. Every other strategy is in a group of its own.
+
+    Args:
+        model: A django model.
+        strategies: A list of cleaning strategies.
+
+    Returns:
+        The groups of strategies, in order.
+    """
+    groups = []
+    for strategy in strategies:
+        previous = groups[-1] if groups else []
+        if (
+            strategy.fusable
+            and previous
+            and previous[0].fusable
+            and all(can_fuse(model, strategy, other) for other in previous)
+        ):
+            previous.append(strategy)
+        else:
+            groups.append([strategy])
+    return groups
+
+
+def commutes(
+    model: Model, strategy: "CleaningStrategy", other: "CleaningStrategy"
+) -> bool:
+    """Check whether two strategies give the same result whichever order
+    they are applied in.
+
+    Neither strategy may write a column which the other reads or writes.
+    Where both remove rows, they must be able to be fused. Where only one
+    removes rows, the other must treat each row on its own.
+
+    Args:
+        model: A django model.
+        strategy: A cleaning strategy.
+        other: Another cleaning strategy.
+
+    Returns:
+        True if the strategies can be swapped.
+    """
+    if not (strategy.plannable and other.plannable):
+        return False
+    if strategy.writes(model) & (other.reads(model) | other.writes(model)):
+        return False
+    if other.writes(model) & strategy.reads(model):
+        return False
+    if strategy.removes_rows and other.removes_rows:
+        return can_fuse(model, strategy, other)
+    if strategy.removes_rows:
+        return other.row_wise
+    if other.removes_rows:
+        return strategy.row_wise
+    return True
+
+
+def estimate_cost(
+    model: Model,
+    strategies: _t.List["CleaningStrategy"],
+    rows: int,
+    columns: _t.Iterable[str],
+) -> _t.List[PlanStep]:
+    """Estimate the cost of applying each strategy in the given order. The
+    cost of a strategy is its cost per row for each row it is applied to,
+    plus the cost of copying the values which are left whenever it removes
+    rows or columns.
+
+    Args:
+        model: A django model.
+        strategies: A list of cleaning strategies, in order.
+        rows: The number of rows in the data.
+        columns: The columns of the data.
+
+    Returns:
+        The estimated cost of each step.
+    """
+    steps = []
+    rows, columns = float(rows), set(columns)
+    for strategy in strategies:
+        output_columns = strategy.output_columns(model, columns)
+        rows_out = (
+            rows * strategy.selectivity if strategy.removes_rows else rows
+        )
+        cost = rows * strategy.cost
+        if strategy.removes_rows or len(output_columns) < len(columns):
+            cost += rows_out * len(output_columns) * COPY_COST
+        steps.append(PlanStep(strategy, rows, len(columns), cost))
+        rows, columns = rows_out, output_columns
+    return steps
+
+
+def valid_orders(
+    model: Model, strategies: _t.List["CleaningStrategy"]
+) -> _t.Iterator[_t.List["CleaningStrategy"]]:
+    """Generate every order of the strategies which gives the same result as
+    the given order. A strategy is always applied after any earlier strategy
+    which it cannot be swapped with. The given order is generated first.
+
+    Args:
+        model: A django model.
+        strategies: A list of cleaning strategies, in order.
+
+    Yields:
+        The orders of the strategies.
+    """
+    count = len(strategies)
+    before = [
+        {
+            i
+            for i in range(j)
+            if not commutes(model, strategies[i], strategies[j])
+        }
+        for j in range(count)
+    ]
+
+    def extend(order: _t.List[int], remaining: _t.List[int]):
+        if not remaining:
+            yield [strategies[i] for i in order]
+            return
+        placed = set(order)
+        for i in remaining:
+            if before[i] <= placed:
+                yield from extend(
+                    order + [i], [j for j in remaining if j != i]
+                )
+
+    yield from extend([], list(range(count)))
+
+
+def plan_strategies(
+    model: Model,
+    strategies: _t.List["CleaningStrategy"],
+    rows: int,
+    columns: _t.Iterable[str],
+) -> _t.List["CleaningStrategy"]:
+    """Choose the cheapest order to apply the strategies in which gives the
+    same result as the given order. Where orders are estimated to cost the
+    same, the one closest to the given order is chosen.
+
+    Args:
+        model: A django model.
+        strategies: A list of cleaning strategies, in order.
+        rows: The number of rows in the data.
+        columns: The columns of the data.
+
+    Returns:
+        The strategies in the order to apply them.
+    """
+    if len(strategies) > MAX_PLANNED_STRATEGIES:
+        return list(strategies)
+
+    columns = list(columns)
+    best, best_cost = list(strategies), None
+    for order in valid_orders(model, strategies):
+        cost = sum(
+            step.cost for step in estimate_cost(model, order, rows, columns)
+        )
+        if best_cost is None or cost < best_cost - 1e-9:
+            best, best_cost = order, cost
+    return best
+
+
+def explain(
+    model: Model,
+    strategies: _t.List["CleaningStrategy"],
+    rows: int,
+    columns: _t.Iterable[str],
+) -> str:
+    """Describe the plan for applying the strategies, including the order
+    they are applied in, their estimated costs and which of them are fused
+    into a single pass over the data.
+
+    Args:
+        model: A django model.
+        strategies: A list of cleaning strategies, in the given order.
+        rows: The number of rows in the data.
+        columns: The columns of the data.
+
+    Returns:
+        The description of the plan.
+    """
+    columns = list(columns)
+    planned = plan_strategies(model, strategies, rows, columns)
+    steps = estimate_cost(model, planned, rows, columns)
+    given_cost = sum(
+        step.cost for step in estimate_cost(model, strategies, rows, columns)
+    )
+    passes = [
+        number
+        for number, group in enumerate(
+            fuse_strategies(model, planned), start=1
+        )
+        for _ in group
+    ]
+
+    table = pd.DataFrame(
+        {
+            "Strategy": [step.strategy.__name__ for step in steps],
+            "Rows in": [f"{step.rows:,.0f}" for step in steps],
+            "Columns in": [step.columns for step in steps],
+            "Kept": [
+                f"{step.strategy.selectivity:.0%}"
+                if step.strategy.removes_rows
+                else "100%"
+                for step in steps
+            ],
+            "Cost": [f"{step.cost:,.0f}" for step in steps],
+            "Pass": passes,
+        },
+        index=pd.RangeIndex(1, len(steps) + 1, name="Step"),
+    )
+    return (
+        f"Cleaning plan for {model.__name__} ({rows:,} rows, "
+        f"{len(columns)} columns). Estimated cost "
+        f"{sum(step.cost for step in steps):,.0f} compared to "
+        f"{given_cost:,.0f} in the given order.\n{table.to_string()}"
+    )
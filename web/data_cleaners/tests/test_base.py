@@ -1,9 +1,12 @@
 """Unitests for the `base` module."""
 
 from types import SimpleNamespace
+from unittest import mock
 import pandas as pd
-from django.test import SimpleTestCase
-from .. import base
+from django.test import SimpleTestCase, TestCase
+from campaigns.models import AdGroup, Campaign
+from search.models import SearchTerm
+from .. import base, key_cache, methods, planner
 
 
 # Test Strategies.
@@ -25,6 +28,14 @@ class FirstTwoRowsStrategy(base.CleaningStrategy):
         self.dataframe = self.dataframe.iloc[:2]
 
 
+class DropFirstRowStrategy(base.CleaningStrategy):
+    """A strategy that drops the first row of the dataframe in place."""
+
+    def clean(self) -> pd.DataFrame:
+        """Drops the first row of the dataframe in place."""
+        self.dataframe.drop(self.dataframe.index[0], inplace=True)
+
+
 # Unittests
 
 
@@ -128,3 +139,236 @@ class TestCleanData(SimpleTestCase):
         dataframe_copy = dataframe.copy()
         base.clean_data(dataframe, None, [ReverseStrategy])
         self.assertTrue(dataframe.equals(dataframe_copy))
+
+    def test_no_copy(self):
+        """Test that the dataframe is cleaned without being copied when
+        `copy` is False.
+        """
+        dataframe = pd.DataFrame({"col1": [1, 2, 3]})
+        results = base.clean_data(
+            dataframe, None, [DropFirstRowStrategy], copy=False
+        )
+        self.assertIs(results, dataframe)
+        self.assertEqual(dataframe["col1"].tolist(), [2, 3])
+
+
+class TestFuseStrategies(SimpleTestCase):
+    """Unittests for the `fuse_strategies` function."""
+
+    def test_search_term(self):
+        """Test that the strategies which remove rows and columns are fused
+        where the foreign keys are part of the duplicate subset.
+        """
+        self.assertEqual(
+            planner.fuse_strategies(
+                SearchTerm, SearchTerm.cleaning_strategies
+            ),
+            [
+                SearchTerm.cleaning_strategies[:3],
+                SearchTerm.cleaning_strategies[3:4],
+                SearchTerm.cleaning_strategies[4:],
+            ],
+        )
+
+    def test_foreign_keys_not_in_subset(self):
+        """Test that foreign keys are not filtered in the same pass as
+        removing duplicates where the foreign keys are not part of the
+        duplicate subset, as the order they are applied in matters.
+        """
+        model = SimpleNamespace(
+            DataCleaner=SimpleNamespace(
+                remove_duplicates_subset_fields=["id"],
+                fk_map={"campaign_id": {"model": Campaign, "field": "id"}},
+            )
+        )
+        strategies = [
+            methods.RemoveDuplicates,
+            methods.FilterValidForeignKeys,
+        ]
+        self.assertEqual(
+            planner.fuse_strategies(model, strategies),
+            [[methods.RemoveDuplicates], [methods.FilterValidForeignKeys]],
+        )
+
+
+class TestCleanDataFused(TestCase):
+    """Unittests for the `clean_data` function when fusing strategies."""
+
+    def test_same_as_unfused(self):
+        """Test that fusing the strategies gives the same result as applying
+        them one after another.
+        """
+        campaign = Campaign.objects.create(
+            id=1, structure_value="a", status="ENABLED"
+        )
+        AdGroup.objects.create(
+            id=1, campaign=campaign, alias="a", status="ENABLED"
+        )
+        dataframe = pd.DataFrame(
+            {
+                "date": ["2022-01-01"] * 5,
+                "ad_group_id": [1, 2, 1, 2, 1],
+                "campaign_id": [1, 1, 1, 1, 1],
+                "search_term": ["a", "a", "a", "b", "b"],
+                "cost": [1, 2, 3, 4, 0],
+                "conversion_value": [1, 2, 3, 4, 5],
+            }
+        )
+
+        expected_results = base.clean_data(
+            dataframe, SearchTerm, SearchTerm.cleaning_strategies
+        )
+        results = base.clean_data(
+            dataframe, SearchTerm, SearchTerm.cleaning_strategies, fuse=True
+        )
+        self.assertTrue(
+            results.equals(expected_results),
+            f"\nActual:\n{results}\nExpected:\n{expected_results}",
+        )
+        self.assertEqual(results["cost"].tolist(), [3, 0])
+
+
+class TestRequiredColumns(SimpleTestCase):
+    """Unittests for the `required_columns` function."""
+
+    def test_search_term(self):
+        """Test that columns which are only removed are not required, whilst
+        columns which are read by the strategies or loaded into the table
+        are.
+        """
+        self.assertEqual(
+            base.required_columns(SearchTerm, SearchTerm.cleaning_strategies),
+            {
+                "id",
+                "date",
+                "ad_group_id",
+                "clicks",
+                "cost",
+                "conversion_value",
+                "conversions",
+                "search_term",
+            },
+        )
+
+    def test_renamed_columns(self):
+        """Test that columns which are renamed are required under their
+        original names.
+        """
+        self.assertEqual(
+            base.required_columns(Campaign, Campaign.cleaning_strategies),
+            {"campaign_id", "structure_value", "status"},
+        )
+
+
+class TestCleanChunks(TestCase):
+    """Unittests for cleaning data in chunks."""
+
+    def setUp(self):
+        campaign = Campaign.objects.create(
+            id=1, structure_value="a", status="ENABLED"
+        )
+        AdGroup.objects.create(
+            id=1, campaign=campaign, alias="a", status="ENABLED"
+        )
+        self.dataframe = pd.DataFrame(
+            {
+                "date": ["2022-01-01"] * 7,
+                "ad_group_id": [1, 1, 2, 1, 1, 1, 1],
+                "campaign_id": [1] * 7,
+                "search_term": ["a", "b", "a", "c", "a", "b", "d"],
+                "cost": [1.0, 2.0, 3.0, 4.0, 5.0, 0.0, 7.0],
+                "conversion_value": [1.0] * 7,
+            }
+        )
+
+    def test_same_as_whole_dataframe(self):
+        """Test that cleaning the data in chunks gives the same result as
+        cleaning it as a single dataframe, including where duplicates span
+        multiple chunks.
+        """
+        expected_results = base.clean_data(
+            self.dataframe, SearchTerm, SearchTerm.cleaning_strategies
+        )
+        chunks = (
+            self.dataframe.iloc[start : start + 2]  # noqa: E203
+            for start in range(0, len(self.dataframe), 2)
+        )
+        results = pd.concat(
+            base.clean_data(chunks, SearchTerm, SearchTerm.cleaning_strategies)
+        )
+        self.assertTrue(
+            results.equals(expected_results),
+            f"\nActual:\n{results}\nExpected:\n{expected_results}",
+        )
+
+    def test_fused_and_planned(self):
+        """Test that the strategies which clean each chunk on its own are
+        fused and planned, giving the same result as cleaning the whole
+        dataframe.
+        """
+        expected_results = base.clean_data(
+            self.dataframe, SearchTerm, SearchTerm.cleaning_strategies
+        )
+        chunks = (
+            self.dataframe.iloc[start : start + 3]  # noqa: E203
+            for start in range(0, len(self.dataframe), 3)
+        )
+        with mock.patch.object(
+            base, "apply_fused", wraps=base.apply_fused
+        ) as apply_fused:
+            results = pd.concat(
+                base.clean_chunks(
+                    chunks,
+                    SearchTerm,
+                    SearchTerm.cleaning_strategies,
+                    fuse=True,
+                    plan=True,
+                )
+            )
+        self.assertTrue(apply_fused.called)
+        self.assertTrue(
+            results.equals(expected_results),
+            f"\nActual:\n{results}\nExpected:\n{expected_results}",
+        )
+
+    def test_lazy(self):
+        """Test that a chunk passes through strategies which do not need to
+        see later chunks before the next chunk is read.
+        """
+        read = []
+
+        def chunks():
+            for start in range(0, len(self.dataframe), 2):
+                read.append(start)
+                yield self.dataframe.iloc[start : start + 2]  # noqa: E203
+
+        results = base.clean_chunks(
+            chunks(),
+            SearchTerm,
+            [methods.FilterValidForeignKeys, methods.RemoveColumns],
+        )
+        next(results)
+        self.assertEqual(read, [0])
+
+    def test_keys_looked_up_once(self):
+        """Test that each valid foreign key is only looked up once, both
+        across the chunks and across loads.
+        """
+        self.addCleanup(key_cache.valid_keys.clear)
+        with self.captureOnCommitCallbacks(execute=True):
+            list(
+                base.clean_chunks(
+                    [self.dataframe.iloc[:3]],
+                    SearchTerm,
+                    [methods.FilterValidForeignKeys],
+                )
+            )
+
+        # Only the invalid key is looked up again.
+        chunks = [self.dataframe.iloc[:3], self.dataframe.iloc[3:]]
+        with self.assertNumQueries(1):
+            list(
+                base.clean_chunks(
+                    chunks, SearchTerm, [methods.FilterValidForeignKeys]
+                )
+            )
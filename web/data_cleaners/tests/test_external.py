@@ -0,0 +1,152 @@
+"""Unittests for the `external` module."""
+
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+from .. import external
+
+
+class TestExternal(SimpleTestCase):
+    """Unittests for removing duplicates from data held on disk."""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.dataframe = pd.DataFrame(
+            {
+                "date": rng.choice(["2022-01-01", "2022-01-02"], 1000),
+                "ad_group_id": rng.integers(0, 5, 1000),
+                "search_term": [
+                    f"search term {i}" for i in rng.integers(0, 50, 1000)
+                ],
+                "cost": np.arange(1000) / 100,
+            }
+        )
+        self.columns = ["date", "ad_group_id", "search_term"]
+
+    def chunks(self, chunk_size: int):
+        return (
+            self.dataframe.iloc[start : start + chunk_size]  # noqa: E203
+            for start in range(0, len(self.dataframe), chunk_size)
+        )
+
+    def test_row_digests(self):
+        """Test that rows with the same values have the same digests and
+        that the positions start from the given position.
+        """
+        dataframe = pd.DataFrame({"a": ["x", "y", "x"], "b": [1, 1, 1]})
+        records = external.row_digests(dataframe, ["a", "b"], start=10)
+        self.assertEqual(records["position"].tolist(), [10, 11, 12])
+        self.assertEqual(records[0]["high"], records[2]["high"])
+        self.assertEqual(records[0]["low"], records[2]["low"])
+        self.assertNotEqual(records[0]["high"], records[1]["high"])
+
+    def test_row_digests_dtypes(self):
+        """Test that equal values have the same digest whatever the dtype of
+        their column.
+        """
+        columns = [
+            pd.Series([1, 2, None], dtype="Int32"),
+            pd.Series([1.0, 2.0, np.nan]),
+            pd.Series([1, 2, None], dtype="category"),
+            pd.Series(["1", "2", None], dtype="string"),
+            pd.Series([1, 2, None], dtype=object),
+        ]
+        digests = [
+            external.row_digests(pd.DataFrame({"a": column}), ["a"])["high"]
+            for column in columns
+        ]
+        for column, results in zip(columns[1:], digests[1:]):
+            with self.subTest(dtype=column.dtype):
+                self.assertEqual(results.tolist(), digests[0].tolist())
+
+        # Floats which are not whole numbers are not rounded.
+        records = external.row_digests(pd.DataFrame({"a": [1.5, 1.0]}), ["a"])
+        self.assertEqual(records[1]["high"], digests[0][0])
+        self.assertNotEqual(records[0]["high"], digests[0][0])
+
+    def test_keep_last_mixed_dtypes(self):
+        """Test that where the same key is read with different dtypes in
+        different chunks, the duplicates are still removed, as they are when
+        the chunks are combined in memory.
+        """
+        first = pd.DataFrame(
+            {
+                "ad_group_id": pd.Series([1, 2], dtype="Int32"),
+                "date": pd.Series(["2022-01-01"] * 2, dtype="category"),
+                "clicks": [1, 2],
+            }
+        )
+        second = pd.DataFrame(
+            {
+                "ad_group_id": [1.0, np.nan],
+                "date": pd.Series(["2022-01-01"] * 2, dtype="string"),
+                "clicks": [3, 4],
+            }
+        )
+        expected_results = pd.concat([first, second]).drop_duplicates(
+            subset=["ad_group_id", "date"], keep="last"
+        )
+        for memory_budget in (0, 10 ** 9):
+            with self.subTest(memory_budget=memory_budget):
+                results = pd.concat(
+                    external.keep_last(
+                        iter([first, second]),
+                        ["ad_group_id", "date"],
+                        memory_budget,
+                    )
+                )
+                self.assertEqual(results["clicks"].tolist(), [2, 3, 4])
+                self.assertEqual(
+                    results["clicks"].tolist(),
+                    expected_results["clicks"].tolist(),
+                )
+
+    def test_last_positions(self):
+        """Test that the last position of each digest is kept."""
+        records = np.array(
+            [(1, 1, 0), (2, 1, 1), (1, 1, 2), (1, 2, 3)],
+            dtype=external.RECORD_DTYPE,
+        )
+        self.assertEqual(
+            sorted(external.last_positions(records).tolist()), [1, 2, 3]
+        )
+
+    def test_keep_last(self):
+        """Test that the result is the same as removing the duplicates in
+        memory, whether or not the digests are partitioned to disk.
+        """
+        expected_results = self.dataframe.drop_duplicates(
+            subset=self.columns, keep="last"
+        )
+        for memory_budget in (0, 10 ** 9):
+            with self.subTest(memory_budget=memory_budget):
+                chunks = list(
+                    external.keep_last(
+                        self.chunks(64), self.columns, memory_budget
+                    )
+                )
+                self.assertTrue(all(len(chunk) == 64 for chunk in chunks[:-1]))
+                results = pd.concat(chunks)
+                self.assertTrue(
+                    results.equals(expected_results),
+                    f"\nActual:\n{results}\nExpected:\n{expected_results}",
+                )
+
+    def test_keep_last_no_chunks(self):
+        """Test that nothing is yielded where there are no chunks."""
+        self.assertEqual(
+            list(external.keep_last(iter([]), self.columns, 0)), []
+        )
+
+    def test_rechunk(self):
+        """Test that dataframes are combined and split into chunks of the
+        given size.
+        """
+        dataframes = [
+            self.dataframe.iloc[:3],
+            self.dataframe.iloc[3:3],
+            self.dataframe.iloc[3:10],
+        ]
+        chunks = list(external.rechunk(dataframes, 4))
+        self.assertEqual([len(chunk) for chunk in chunks], [4, 4, 2])
+        self.assertTrue(pd.concat(chunks).equals(self.dataframe.iloc[:10]))
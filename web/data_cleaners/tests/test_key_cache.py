@@ -0,0 +1,82 @@
+"""Unittests for the `key_cache` module."""
+
+from unittest import mock
+import pandas as pd
+from django.db.models.signals import post_delete
+from django.test import SimpleTestCase
+from campaigns.models import AdGroup, Campaign
+from .. import key_cache
+
+
+class TestKeyCache(SimpleTestCase):
+    """Unittests for the `KeyCache` class."""
+
+    def setUp(self):
+        self.cache = key_cache.KeyCache()
+        # Disconnects the receivers of the models whose keys were cached.
+        self.addCleanup(self.cache.clear)
+
+    def test_contains(self):
+        """Test that only the keys which have been merged are found."""
+        self.assertEqual(
+            self.cache.contains(Campaign, "id", [1, 2]).tolist(),
+            [False, False],
+        )
+        self.cache.merge(Campaign, "id", [5, 1, 3])
+        self.cache.merge(Campaign, "id", [3, 7])
+        self.assertEqual(
+            self.cache.keys[(Campaign, "id")].tolist(), [1, 3, 5, 7]
+        )
+        self.assertEqual(
+            self.cache.contains(Campaign, "id", [0, 1, 4, 7, 9]).tolist(),
+            [False, True, False, True, False],
+        )
+        self.assertEqual(self.cache.contains(Campaign, "id", []).tolist(), [])
+
+    def test_contains_strings(self):
+        """Test that string keys are only found where they match exactly."""
+        self.cache.merge(Campaign, "structure_value", ["ab", "c"])
+        self.assertEqual(
+            self.cache.contains(
+                Campaign, "structure_value", ["a", "ab", "abc", "c"]
+            ).tolist(),
+            [False, True, False, True],
+        )
+
+    def test_invalidate(self):
+        """Test that only the keys of the given model are forgotten."""
+        self.cache.merge(Campaign, "id", [1])
+        self.cache.merge(AdGroup, "id", [1])
+        self.cache.invalidate(Campaign)
+        self.assertEqual(list(self.cache.keys), [(AdGroup, "id")])
+
+    def test_add_rows(self):
+        """Test that the keys of rows which were written are only added for
+        the fields of the model which are cached.
+        """
+        with mock.patch.object(
+            key_cache.transaction, "on_commit", lambda merge: merge()
+        ):
+            self.cache.add_rows(Campaign, pd.DataFrame({"id": [1]}))
+            self.assertEqual(self.cache.keys, {})
+
+            self.cache.merge(Campaign, "id", [1])
+            self.cache.add_rows(
+                Campaign, pd.DataFrame({"id": [3, 2, 3], "status": "a"})
+            )
+        self.assertEqual(self.cache.keys[(Campaign, "id")].tolist(), [1, 2, 3])
+        self.assertEqual(self.cache.fields(Campaign), ["id"])
+
+    def test_delete_receiver(self):
+        """Test that a model only has a `post_delete` receiver while its keys
+        are cached, so that the rows of other models are deleted in bulk.
+        """
+        self.assertFalse(post_delete.has_listeners(AdGroup))
+        self.cache.merge(AdGroup, "id", [1])
+        self.assertTrue(post_delete.has_listeners(AdGroup))
+        self.cache.invalidate(AdGroup)
+        self.assertFalse(post_delete.has_listeners(AdGroup))
+
+        self.cache.merge(AdGroup, "id", [1])
+        self.cache.clear()
+        self.assertFalse(post_delete.has_listeners(AdGroup))
@@ -2,12 +2,14 @@
 
 from datetime import date
 from types import SimpleNamespace
+from django.db import connection, transaction
 from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.contenttypes.models import ContentType
 import pandas as pd
 from campaigns import models as campaign_models
 from search import models as search_models
-from .. import methods
+from .. import key_cache, methods
 
 
 class TestRemoveDuplicates(SimpleTestCase):
@@ -120,6 +122,40 @@ class TestRemoveDuplicates(SimpleTestCase):
             f"\nActual:\n{results}\nExpected:\n{expected_results}",
         )
 
+    def test_stream_memory_budget(self):
+        """Test that removing duplicates across chunks within a memory
+        budget gives the same result as doing so in memory.
+        """
+        dataframe = pd.DataFrame(
+            {"a": [1, 2, 1, 3, 2, 1, 4], "b": list("xyxzyxw"), "c": range(7)}
+        )
+        model = SimpleNamespace(
+            DataCleaner=SimpleNamespace(
+                remove_duplicates_subset_fields=["a", "b"]
+            )
+        )
+        budget_model = SimpleNamespace(
+            DataCleaner=SimpleNamespace(
+                remove_duplicates_subset_fields=["a", "b"],
+                remove_duplicates_memory_budget=0,
+            )
+        )
+
+        def chunks():
+            return (dataframe.iloc[start:][:2] for start in (0, 2, 4, 6))
+
+        expected_results = pd.concat(
+            methods.RemoveDuplicates.stream(model, chunks())
+        )
+        results = pd.concat(
+            methods.RemoveDuplicates.stream(budget_model, chunks())
+        )
+        self.assertTrue(
+            results.equals(expected_results),
+            f"\nActual:\n{results}\nExpected:\n{expected_results}",
+        )
+        self.assertEqual(results["c"].tolist(), [3, 4, 5, 6])
+
 
 class TestFilterValidForeignKeys(TestCase):
     """Unittests for the `FilterValidForeignKeys` class."""
@@ -163,6 +199,188 @@ class TestFilterValidForeignKeys(TestCase):
             f"\nActual:\n{results}\nExpected:\n{expected_results}",
         )
 
+    def test_only_batch_keys_fetched(self):
+        """Test that only the keys in the dataframe are looked up, in a
+        single query, rather than every key in the table.
+        """
+        for i in (50, 100, 150):
+            campaign_models.Campaign.objects.create(
+                id=i, structure_value="a", status="ENABLED"
+            )
+
+        filter_valid_fks = methods.FilterValidForeignKeys(
+            pd.DataFrame(
+                {
+                    "ad_group_id": [1, 2, 3, 4],
+                    "campaign_id": pd.array([50, 50, 200, None], "Int64"),
+                }
+            ),
+            campaign_models.AdGroup,
+        )
+        with CaptureQueriesContext(connection) as queries:
+            filter_valid_fks.clean()
+
+        self.assertEqual(len(queries), 1)
+        self.assertIn("= ANY(", queries[0]["sql"])
+        self.assertEqual(
+            filter_valid_fks.dataframe["campaign_id"].tolist(), [50, 50]
+        )
+
+    def test_fetch_valid_keys(self):
+        """Test that only the keys which exist are returned."""
+        campaign_models.Campaign.objects.create(
+            id=50, structure_value="a", status="ENABLED"
+        )
+        fetch_valid_keys = methods.FilterValidForeignKeys.fetch_valid_keys
+        self.assertEqual(
+            fetch_valid_keys(campaign_models.Campaign, "id", [50, 100]), {50}
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                fetch_valid_keys(campaign_models.Campaign, "id", []), set()
+            )
+
+    def test_valid_keys_cached(self):
+        """Test that keys which have been found to be valid are not looked
+        up again once the transaction they were found in is committed, and
+        that they are forgotten when rows are deleted.
+        """
+        self.addCleanup(key_cache.valid_keys.clear)
+        for i in (50, 100):
+            campaign_models.Campaign.objects.create(
+                id=i, structure_value="a", status="ENABLED"
+            )
+
+        def clean(campaign_ids):
+            filter_valid_fks = methods.FilterValidForeignKeys(
+                pd.DataFrame(
+                    {
+                        "ad_group_id": range(len(campaign_ids)),
+                        "campaign_id": campaign_ids,
+                    }
+                ),
+                campaign_models.AdGroup,
+            )
+            filter_valid_fks.clean()
+            return filter_valid_fks.dataframe["campaign_id"].tolist()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(clean([50, 200]), [50])
+        with self.assertNumQueries(0):
+            self.assertEqual(clean([50, 50]), [50, 50])
+
+        # Only the key which has not been seen is looked up.
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(clean([50, 100]), [50, 100])
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("50", queries[0]["sql"])
+
+        campaign_models.Campaign.objects.filter(id=50).delete()
+        self.assertEqual(clean([50]), [])
+
+    def test_valid_keys_kept_after_load(self):
+        """Test that loading data into a table adds the keys which were
+        written to the cache, rather than forgetting the keys of the table.
+        """
+        self.addCleanup(key_cache.valid_keys.clear)
+        campaign_models.Campaign.objects.create(
+            id=50, structure_value="a", status="ENABLED"
+        )
+        valid_keys = methods.FilterValidForeignKeys.valid_keys
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(
+                valid_keys(campaign_models.Campaign, "id", [50]), {50}
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            campaign_models.Campaign.load_from_dataframe(
+                pd.DataFrame(
+                    {
+                        "campaign_id": [100],
+                        "structure_value": "a",
+                        "status": "ENABLED",
+                    }
+                )
+            )
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                valid_keys(campaign_models.Campaign, "id", [50, 100]),
+                {50, 100},
+            )
+
+    def test_valid_keys_not_cached_before_commit(self):
+        """Test that keys found within a transaction which is rolled back
+        are not cached, as they may have been created by it.
+        """
+        self.addCleanup(key_cache.valid_keys.clear)
+        with transaction.atomic():
+            campaign_models.Campaign.objects.create(
+                id=50, structure_value="a", status="ENABLED"
+            )
+            self.assertEqual(
+                methods.FilterValidForeignKeys.valid_keys(
+                    campaign_models.Campaign, "id", [50]
+                ),
+                {50},
+            )
+            transaction.set_rollback(True)
+
+        self.assertEqual(key_cache.valid_keys.keys, {})
+
+
+class TestFilterInvalidValues(SimpleTestCase):
+    """Unittests for the `FilterInvalidValues` class."""
+
+    def test_search_terms(self):
+        """Test that the rows which the database would reject are removed
+        and that every other row is kept.
+        """
+        dataframe = pd.DataFrame(
+            {
+                "ad_group_id": [1, 1, 1, 1, 1, 1, 1],
+                "clicks": pd.array([0, -1, 1, 1, 1, None, 1], dtype="Int32"),
+                "cost": [
+                    99_999_999.99,
+                    1.0,
+                    100_000_000.0,
+                    99_999_999.999,
+                    0.123,
+                    1.0,
+                    1.0,
+                ],
+                "search_term": pd.array(
+                    ["a", "b", "c", "d", "e", "f", "g" * 256],
+                    dtype="string[pyarrow]",
+                ),
+            }
+        )
+
+        strategy = methods.FilterInvalidValues(
+            dataframe, search_models.SearchTerm
+        )
+        with self.assertLogs("data_cleaners.methods", "WARNING"):
+            strategy.clean()
+
+        # Extra decimal places are rounded by the database, unless rounding
+        # makes the value too large.
+        self.assertEqual(
+            strategy.dataframe["search_term"].tolist(), ["a", "e"]
+        )
+
+    def test_categorical_lengths(self):
+        """Test that the lengths of categorical values are checked and that
+        missing values are only removed where the field is not nullable.
+        """
+        dataframe = pd.DataFrame(
+            {
+                "id": [1, 2, 3, 2 ** 63],
+                "status": pd.Categorical(["ENABLED", "x" * 51, None, "a"]),
+            }
+        )
+        mask = methods.FilterInvalidValues(
+            dataframe, campaign_models.Campaign
+        ).keep_mask()
+        self.assertEqual(mask.tolist(), [True, False, False, False])
+
 
 class RemoveColumns(SimpleTestCase):
     """Unittests for the `RemoveColumns` class."""
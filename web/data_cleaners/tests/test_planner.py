@@ -0,0 +1,164 @@
+"""Unittests for the `planner` module."""
+
+from types import SimpleNamespace
+from unittest import mock
+import pandas as pd
+from django.test import SimpleTestCase
+from campaigns.models import AdGroup
+from search.cleaning_methods import CalculateRoas
+from search.models import SearchTerm
+from .. import base, methods, planner
+
+SEARCH_TERM_COLUMNS = [
+    "date",
+    "ad_group_id",
+    "campaign_id",
+    "clicks",
+    "cost",
+    "conversion_value",
+    "conversions",
+    "search_term",
+]
+
+
+class TestCommutes(SimpleTestCase):
+    """Unittests for the `commutes` function."""
+
+    def test_filters_on_subset(self):
+        """Test that filtering foreign keys which are part of the duplicate
+        subset can be swapped with removing duplicates.
+        """
+        self.assertTrue(
+            planner.commutes(
+                SearchTerm,
+                methods.RemoveDuplicates,
+                methods.FilterValidForeignKeys,
+            )
+        )
+
+    def test_filters_not_on_subset(self):
+        """Test that filtering foreign keys which are not part of the
+        duplicate subset cannot be swapped with removing duplicates.
+        """
+        self.assertFalse(
+            planner.commutes(
+                AdGroup,
+                methods.RemoveDuplicates,
+                methods.FilterValidForeignKeys,
+            )
+        )
+
+    def test_column_conflicts(self):
+        """Test that a strategy which removes a column that another strategy
+        reads cannot be swapped with it.
+        """
+        model = SimpleNamespace(
+            DataCleaner=SimpleNamespace(remove_columns=["cost"])
+        )
+        self.assertFalse(
+            planner.commutes(model, methods.RemoveColumns, CalculateRoas)
+        )
+
+    def test_not_plannable(self):
+        """Test that strategies which are not plannable are never swapped."""
+
+        class Reverse(base.CleaningStrategy):
+            def clean(self):
+                self.dataframe = self.dataframe.iloc[::-1]
+
+        self.assertFalse(
+            planner.commutes(SearchTerm, Reverse, methods.RemoveColumns)
+        )
+
+
+class TestPlanStrategies(SimpleTestCase):
+    """Unittests for the `plan_strategies` function."""
+
+    def test_search_term(self):
+        """Test that columns are removed first, foreign keys are filtered
+        before removing duplicates and the values are validated after the
+        RoAS is calculated.
+        """
+        self.assertEqual(
+            planner.plan_strategies(
+                SearchTerm,
+                SearchTerm.cleaning_strategies,
+                100_000,
+                SEARCH_TERM_COLUMNS,
+            ),
+            [
+                methods.RemoveColumns,
+                methods.FilterValidForeignKeys,
+                methods.RemoveDuplicates,
+                CalculateRoas,
+                methods.FilterInvalidValues,
+            ],
+        )
+
+    def test_given_order_kept(self):
+        """Test that the given order is kept where no other order is
+        cheaper.
+        """
+        self.assertEqual(
+            planner.plan_strategies(
+                AdGroup,
+                AdGroup.cleaning_strategies,
+                1000,
+                ["ad_group_id", "campaign_id", "alias", "status"],
+            ),
+            AdGroup.cleaning_strategies,
+        )
+
+
+class TestExplain(SimpleTestCase):
+    """Unittests for the `explain` function."""
+
+    def test_explain(self):
+        """Test that the plan lists each strategy in the planned order along
+        with the pass it is applied in.
+        """
+        results = planner.explain(
+            SearchTerm,
+            SearchTerm.cleaning_strategies,
+            100_000,
+            SEARCH_TERM_COLUMNS,
+        )
+        lines = results.splitlines()
+        self.assertIn("Cleaning plan for SearchTerm", lines[0])
+        self.assertIn("RemoveColumns", lines[3])
+        self.assertIn("CalculateRoas", lines[-2])
+        self.assertTrue(lines[-2].endswith("2"))
+        self.assertIn("FilterInvalidValues", lines[-1])
+
+    def test_planned_same_as_given(self):
+        """Test that cleaning with the planned order gives the same result
+        as the given order.
+        """
+        dataframe = pd.DataFrame(
+            {
+                "date": ["2022-01-01"] * 4,
+                "ad_group_id": [1, 1, 2, 1],
+                "campaign_id": [1, 1, 1, 1],
+                "search_term": ["a", "a", "a", "b"],
+                "cost": [1.0, 2.0, 3.0, 0.0],
+                "conversion_value": [1.0, 1.0, 1.0, 1.0],
+            }
+        )
+        patcher = mock.patch.object(
+            methods.FilterValidForeignKeys,
+            "valid_keys",
+            side_effect=lambda model, field, keys: {1} & set(keys),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        expected_results = base.clean_data(
+            dataframe, SearchTerm, SearchTerm.cleaning_strategies
+        )
+        results = base.clean_data(
+            dataframe, SearchTerm, SearchTerm.cleaning_strategies, plan=True
+        )
+        self.assertTrue(
+            results.equals(expected_results),
+            f"\nActual:\n{results}\nExpected:\n{expected_results}",
+        )
@@ -0,0 +1,346 @@
+"""This module contains a writer which loads cleaned data with the asyncpg
+driver, keeping several `COPY` streams in flight on a small pool of
+connections so that a single process can keep the database busy without a
+process per file.
+
+Each chunk of data is split between the streams by a hash of the columns
+which identify a row, so the rows with the same key always go through the
+same stream. Each stream loads its parts in the order they were submitted,
+so a later chunk still overwrites the rows of an earlier one, and no two
+streams ever write the same row, so they cannot deadlock on each other.
+
+The event loop runs on its own thread, so the writer is driven from ordinary
+synchronous code such as the load commands. Submitting a chunk waits while
+the streams are full, so the data being written is bounded in memory.
+"""
+
+import asyncio
+import io
+import threading
+import typing as _t
+from concurrent.futures import Future
+import asyncpg
+import pandas as pd
+from django.db import connections
+from django.db.models import Model
+from . import manifest, utils
+from .base import LoadingStrategy, LoadResult
+
+# The number of streams which write to the database at the same time.
+DEFAULT_STREAMS = 4
+
+# The number of parts which may wait for each stream before submitting more
+# data waits for the stream.
+STREAM_QUEUE_SIZE = 2
+
+# Marks the end of the parts given to a stream.
+_DONE = None
+
+
+def connect_options(alias: str = "default") -> dict:
+    """Get the keyword arguments to connect to one of django's databases
+    with asyncpg.
+
+    Args:
+        alias: The alias of the database in django's settings.
+
+    Returns:
+        The keyword arguments for `asyncpg.connect` and
+        `asyncpg.create_pool`.
+    """
+    settings = connections[alias].settings_dict
+    return {
+        "database": settings["NAME"],
+        "user": settings["USER"] or None,
+        "password": settings["PASSWORD"] or None,
+        "host": settings["HOST"] or None,
+        "port": int(settings["PORT"]) if settings["PORT"] else None,
+    }
+
+
+class AsyncCopyMerge(LoadingStrategy):
+    """Copies the data into a temporary staging table and merges it into the
+    table in a single query, in the same way as `methods.CopyMerge`, but
+    over an asyncpg connection.
+    """
+
+    async def load_async(self, connection: asyncpg.Connection) -> LoadResult:
+        """Load the data in a single transaction on the given connection.
+
+        Args:
+            connection: An asyncpg connection.
+
+        Returns:
+            The number of rows inserted, updated and left unchanged.
+        """
+        self.validate_model()
+        staging_table = f"{self.db_table}_staging"
+        source = io.BytesIO(
+            utils.csv_buffer(self.dataframe, self.columns).getvalue().encode()
+        )
+
+        # The staging table is dropped at the end of the transaction.
+        async with connection.transaction():
+            await connection.execute(
+                f"""
+                CREATE TEMPORARY TABLE {staging_table} ON COMMIT DROP AS
+                SELECT {", ".join(self.columns)} FROM {self.db_table}
+                WITH NO DATA;"""
+            )
+            await connection.copy_to_table(
+                staging_table,
+                source=source,
+                columns=self.columns,
+                format="csv",
+                null="\\N",
+            )
+            inserted, updated = await connection.fetchrow(
+                utils.merge_query(
+                    self.db_table,
+                    staging_table,
+                    self.columns,
+                    self.conflict_columns,
+                    self.update_columns,
+                )
+            )
+            await connection.execute(f"DROP TABLE {staging_table};")
+        return LoadResult.from_counts(len(self.dataframe), inserted, updated)
+
+    def load(self) -> LoadResult:
+        """Load the data over a new connection to the default database.
+
+        Returns:
+            The number of rows inserted, updated and left unchanged.
+        """
+
+        async def load() -> LoadResult:
+            connection = await asyncpg.connect(**connect_options())
+            try:
+                return await self.load_async(connection)
+            finally:
+                await connection.close()
+
+        return asyncio.run(load())
+
+
+class AsyncWriter:
+    """Writes chunks of cleaned data into a model's table over several
+    asyncpg connections at once. See the module's docstring.
+
+    The writer is used as a context manager, or started with `start` and
+    stopped with `close`. Unlike `base.load_data`, each part of a chunk is
+    committed on its own as soon as it has been written.
+    """
+
+    def __init__(
+        self,
+        model: Model,
+        streams: int = DEFAULT_STREAMS,
+        alias: str = "default",
+    ):
+        """Initialize the writer.
+
+        Args:
+            model: The django model to load the data into.
+            streams: The number of streams which write at the same time,
+                each on its own connection.
+            alias: The alias of the database in django's settings.
+        """
+        self.model = model
+        self.streams = streams
+        self.alias = alias
+        self.result = LoadResult()
+        self.error: _t.Optional[BaseException] = None
+        self._loop: _t.Optional[asyncio.AbstractEventLoop] = None
+        self._thread: _t.Optional[threading.Thread] = None
+        self._pool: _t.Optional[asyncpg.Pool] = None
+        self._queues: _t.List[asyncio.Queue] = []
+        self._workers: _t.List[asyncio.Task] = []
+
+    def __enter__(self) -> "AsyncWriter":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def start(self) -> "AsyncWriter":
+        """Start the event loop and open a connection for each stream.
+
+        Returns:
+            The writer.
+        """
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, daemon=True
+        )
+        self._thread.start()
+        try:
+            self._call(self._open())
+        except BaseException:
+            self._stop_loop()
+            raise
+        return self
+
+    def submit(self, dataframe: pd.DataFrame) -> Future:
+        """Split a chunk of cleaned data between the streams, waiting while
+        the streams already have as many parts as they can hold.
+
+        Args:
+            dataframe: The cleaned data.
+
+        Returns:
+            A future of the number of rows of the chunk which were inserted,
+            updated and left unchanged, which is set once every part of the
+            chunk has been committed.
+        """
+        if self.error is not None:
+            raise self.error
+        if not len(dataframe):
+            future = Future()
+            future.set_result(LoadResult())
+            return future
+        parts = list(self.split(dataframe))
+        futures = self._call(self._enqueue(parts))
+        return asyncio.run_coroutine_threadsafe(
+            self._gather(futures), self._loop
+        )
+
+    def split(
+        self, dataframe: pd.DataFrame
+    ) -> _t.Iterator[_t.Tuple[int, AsyncCopyMerge]]:
+        """Split the rows of a chunk between the streams by a hash of the
+        columns which identify a row.
+
+        Args:
+            dataframe: The cleaned data.
+
+        Yields:
+            The stream and the loading strategy of each part of the chunk.
+        """
+        strategy = AsyncCopyMerge(dataframe, self.model)
+        strategy.validate_model()
+        if self.streams == 1:
+            yield 0, strategy
+            return
+
+        hashes = pd.util.hash_pandas_object(
+            dataframe[strategy.conflict_columns], index=False
+        ).to_numpy()
+        streams = hashes % self.streams
+        for stream in range(self.streams):
+            mask = streams == stream
+            if mask.any():
+                yield stream, AsyncCopyMerge(dataframe[mask], self.model)
+
+    def close(self) -> LoadResult:
+        """Wait for the data which has been submitted to be written, then
+        close the connections and stop the event loop. Where rows were
+        inserted, the manifest of the data loaded into the tables which refer
+        to the model is forgotten, as in `base.load_data`.
+
+        Returns:
+            The number of rows inserted, updated and left unchanged by every
+            chunk which was written.
+        """
+        if self._loop is None:
+            return self.result
+        try:
+            self._call(self._shutdown())
+        finally:
+            self._stop_loop()
+        if self.result.inserted:
+            manifest.forget_dependents(self.model)
+        return self.result
+
+    def _call(self, coroutine: _t.Coroutine) -> _t.Any:
+        """Run a coroutine on the event loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def _stop_loop(self) -> None:
+        """Stop the event loop and wait for its thread to finish."""
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+
+    async def _open(self) -> None:
+        """Open the pool of connections and start a worker for each
+        stream.
+        """
+        self._pool = await asyncpg.create_pool(
+            min_size=self.streams,
+            max_size=self.streams,
+            **connect_options(self.alias),
+        )
+        self._queues = [
+            asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+            for _ in range(self.streams)
+        ]
+        self._workers = [
+            asyncio.ensure_future(self._work(queue)) for queue in self._queues
+        ]
+
+    async def _enqueue(
+        self, parts: _t.List[_t.Tuple[int, AsyncCopyMerge]]
+    ) -> _t.List[asyncio.Future]:
+        """Put each part of a chunk on the queue of its stream.
+
+        Returns:
+            A future of the result of each part.
+        """
+        futures = []
+        for stream, strategy in parts:
+            future = self._loop.create_future()
+            await self._queues[stream].put((strategy, future))
+            futures.append(future)
+        return futures
+
+    async def _gather(self, futures: _t.List[asyncio.Future]) -> LoadResult:
+        """Wait for the parts of a chunk and add up their results."""
+        results = await asyncio.gather(*futures)
+        return LoadResult(*map(sum, zip(LoadResult(), *results)))
+
+    async def _work(self, queue: asyncio.Queue) -> None:
+        """Load the parts given to a stream, in order, on one connection."""
+        async with self._pool.acquire() as connection:
+            while True:
+                item = await queue.get()
+                if item is _DONE:
+                    return
+                await self._load_part(connection, *item)
+
+    async def _load_part(
+        self,
+        connection: asyncpg.Connection,
+        strategy: AsyncCopyMerge,
+        future: asyncio.Future,
+    ) -> None:
+        """Load a part of a chunk and set its future. Once any stream has
+        failed, the remaining parts are failed without being loaded, as
+        loading them could leave older rows in the table.
+        """
+        # This is kept apart from `_work`, so that the traceback of an error
+        # does not hold the worker's frame, which would be closed where the
+        # traceback is cleared.
+        if self.error is not None:
+            future.set_exception(self.error)
+            return
+        try:
+            result = await strategy.load_async(connection)
+        except Exception as error:
+            self.error = error
+            future.set_exception(error)
+            return
+        self.result = LoadResult(*map(sum, zip(self.result, result)))
+        future.set_result(result)
+
+    async def _shutdown(self) -> None:
+        """Let the workers finish the parts they have been given, then close
+        the pool of connections.
+        """
+        for queue in self._queues:
+            await queue.put(_DONE)
+        try:
+            await asyncio.gather(*self._workers)
+        finally:
+            await self._pool.close()
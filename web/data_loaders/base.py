@@ -0,0 +1,252 @@
+"""This module contains an abstract base class for data loading strategies
+that is used to define new loading strategies. It also contains the main
+function that is used to load data using a loading strategy.
+"""
+
+import json
+import typing as _t
+from abc import ABC, abstractmethod
+from functools import cached_property
+import pandas as pd
+from django.db import transaction
+from django.db.models import Model, UniqueConstraint
+from data_cleaners.key_cache import valid_keys
+from . import manifest, tuning
+from .models import QuarantinedRow
+from .utils import DEFAULT_BATCH_SIZE
+
+
+class LoadResult(_t.NamedTuple):
+    """The number of rows which were inserted, updated and left unchanged
+    by a load, and the number which were rejected by the database and
+    quarantined instead.
+    """
+
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    quarantined: int = 0
+
+    @property
+    def rows(self) -> int:
+        """The total number of rows loaded."""
+        return self.inserted + self.updated + self.unchanged
+
+    @classmethod
+    def from_counts(
+        cls, rows: int, inserted: int, updated: int, quarantined: int = 0
+    ) -> "LoadResult":
+        """Build the result of a load from the number of rows which were
+        given to it and the number which were inserted, updated and
+        quarantined. Every other row was left unchanged.
+
+        Args:
+            rows: The number of rows given to the load.
+            inserted: The number of rows inserted.
+            updated: The number of rows updated.
+            quarantined: The number of rows quarantined.
+
+        Returns:
+            The result of the load.
+        """
+        return cls(
+            inserted,
+            updated,
+            rows - inserted - updated - quarantined,
+            quarantined,
+        )
+
+
+class LoadingStrategy(ABC):
+    """This class defines the strategy for loading data into a table. The
+    columns to load, the columns which identify an existing row and the
+    columns to update are all derived from the model so that any model can be
+    loaded without writing any SQL.
+    """
+
+    def __init__(
+        self,
+        dataframe: pd.DataFrame,
+        model: Model,
+        batch_size: _t.Union[int, str] = DEFAULT_BATCH_SIZE,
+        quarantine: bool = False,
+    ):
+        """Initialize the loading strategy.
+
+        Args:
+            dataframe: A cleaned pandas dataframe.
+            model: The django model to load the data into.
+            batch_size: The maximum number of rows to send to the database in
+                a single query, or `auto` to tune it. See `tuning`.
+            quarantine: Whether to quarantine the rows which the database
+                rejects, such as values which do not fit in their column, and
+                load the rest of the data, rather than failing the load.
+        """
+        self.dataframe = dataframe
+        self.model = model
+        self.batch_size = batch_size
+        self.quarantine = quarantine
+        self.quarantined_rows: _t.List[QuarantinedRow] = []
+
+    @property
+    def db_table(self) -> str:
+        """The name of the table the data is loaded into."""
+        return self.model._meta.db_table
+
+    @property
+    def batch_rows(self) -> int:
+        """The number of rows in a batch. Where the batch size is tuned,
+        this is the size which has been chosen for the model so far.
+        """
+        if self.batch_size == tuning.AUTO_BATCH_SIZE:
+            return tuning.batch_sizer(self.model, DEFAULT_BATCH_SIZE).size
+        return self.batch_size
+
+    @cached_property
+    def columns(self) -> _t.List[str]:
+        """The columns of the table which are present in the dataframe, in the
+        order that they are defined on the model.
+        """
+        return [
+            field.column
+            for field in self.model._meta.concrete_fields
+            if field.column in self.dataframe.columns
+        ]
+
+    @cached_property
+    def conflict_columns(self) -> _t.List[str]:
+        """The columns which identify a row that already exists in the table.
+        This is the primary key where it is being loaded, otherwise the first
+        unique constraint for which all columns are being loaded. An empty
+        list is returned if there are no such columns.
+        """
+        opts = self.model._meta
+        if opts.pk.column in self.columns:
+            return [opts.pk.column]
+
+        unique_sets = list(opts.unique_together) + [
+            constraint.fields
+            for constraint in opts.constraints
+            if isinstance(constraint, UniqueConstraint)
+            and constraint.condition is None
+            and constraint.fields
+        ]
+        for field_names in unique_sets:
+            columns = [opts.get_field(name).column for name in field_names]
+            if all(column in self.columns for column in columns):
+                return columns
+        return []
+
+    @cached_property
+    def update_columns(self) -> _t.List[str]:
+        """The columns to update where a row already exists in the table."""
+        return [
+            column
+            for column in self.columns
+            if column not in self.conflict_columns
+        ]
+
+    def can_use_loader(self) -> _t.Tuple[bool, _t.Union[str, None]]:
+        """Returns True if the loading strategy can be used.
+
+        Returns:
+            A tuple containing a boolean indicating if the loading strategy
+            can be used and a string containing an error message if the
+            loading strategy cannot be used. If the loading strategy can be
+            used, the error message will be None.
+        """
+        if not self.conflict_columns:
+            return (
+                False,
+                "The data does not contain the primary key or all the fields "
+                "of a unique constraint of the model. These are required to "
+                "know which rows already exist in the table.",
+            )
+        return True, None
+
+    def validate_model(self) -> None:
+        """Validates if the data can be loaded into the model. If not, raise
+        an error.
+        """
+        can_use, error_message = self.can_use_loader()
+        if not can_use:
+            raise NotImplementedError(error_message)
+
+    def quarantine_rows(self, rows: pd.DataFrame, error: Exception) -> None:
+        """Set aside rows which were rejected by the database, to be saved
+        once the load has finished. See `save_quarantined`.
+
+        Args:
+            rows: The rejected rows.
+            error: The error the rows caused.
+        """
+        # Values such as dates and decimals are written as strings.
+        records = json.loads(
+            rows.to_json(
+                orient="records", date_format="iso", default_handler=str
+            )
+        )
+        label = self.model._meta.label
+        self.quarantined_rows.extend(
+            QuarantinedRow(model=label, data=record, error=str(error).strip())
+            for record in records
+        )
+
+    def save_quarantined(self) -> int:
+        """Save the rows which were set aside by `quarantine_rows`.
+
+        Returns:
+            The number of rows saved.
+        """
+        QuarantinedRow.objects.bulk_create(self.quarantined_rows)
+        return len(self.quarantined_rows)
+
+    @abstractmethod
+    def load(self) -> LoadResult:
+        """This method inserts the rows of the dataframe into the table,
+        updating the rows which already exist and have changed. Where
+        `quarantine` is set, the rows which the database rejects should be
+        passed to `quarantine_rows` and saved with `save_quarantined`.
+
+        Returns:
+            The number of rows inserted, updated, left unchanged and
+            quarantined.
+        """
+        pass
+
+
+def load_data(
+    dataframe: pd.DataFrame,
+    model: Model,
+    strategy: _t.Type[LoadingStrategy],
+    **options,
+) -> LoadResult:
+    """This function loads the data into the model's table using the given
+    strategy. All of the data is loaded in a single transaction. Upserting
+    rows only adds keys to the table, so where the model's keys are cached as
+    valid foreign keys, the keys of the rows are added to the cache once the
+    transaction is committed. See `key_cache.KeyCache.add_rows`. Where rows
+    are inserted, the manifest of the data loaded into the tables which
+    refer to the model is forgotten. See `manifest.forget_dependents`.
+
+    Args:
+        dataframe: A cleaned pandas dataframe.
+        model: A django model.
+        strategy: The loading strategy.
+        options: Keyword arguments for the loading strategy.
+
+    Returns:
+        The number of rows inserted, updated, left unchanged and quarantined.
+    """
+    if len(dataframe) == 0:
+        return LoadResult()
+
+    with transaction.atomic():
+        result = strategy(dataframe, model, **options).load()
+        # The rows which were quarantined were not written, but which rows
+        # they were is not known here, so no keys are cached.
+        if not result.quarantined:
+            valid_keys.add_rows(model, dataframe)
+        if result.inserted:
+            manifest.forget_dependents(model)
+    return result
@@ -0,0 +1,296 @@
+"""This module contains a loader for bulk loads, such as the first full load
+of a table, where maintaining the table's indexes and writing every row to
+the write-ahead log (WAL) for each chunk costs more than the data itself.
+
+The chunks are copied into an `UNLOGGED` staging table, which is not written
+to the WAL. Once all of the data has been staged, the table's secondary
+indexes are dropped, the last row staged for each key is merged into the
+table in a single query and the indexes are rebuilt, each in one pass over
+the data rather than one row at a time. The table is then analysed so that
+the planner's statistics reflect the new rows.
+
+Where the table is empty, its unique indexes are dropped as well and the
+rows are inserted without checking for conflicts, as the staged rows are
+already unique. Otherwise the unique indexes are kept, as they identify the
+rows which already exist. The primary key and any index which a foreign key
+relies on are always kept.
+
+Each load stages its chunks in a table of its own, named with a random
+suffix, so that loads of the same table which run at the same time do not
+replace or read each other's staged rows.
+
+The indexes are dropped, the data merged and the indexes rebuilt in a single
+transaction, so if any step fails the table is left as it was. The table is
+locked for the length of that transaction.
+"""
+
+import time
+import typing as _t
+import uuid
+import pandas as pd
+from django.db import connection, transaction
+from django.db.models import Model
+from data_cleaners.key_cache import valid_keys
+from . import manifest, utils
+from .base import LoadingStrategy, LoadResult
+from .methods import CopyMerge
+
+# The column of the staging table which records the order the rows were
+# staged in, so that the last row for each key is kept.
+POSITION_COLUMN = "bulk_position"
+
+# The memory each index may use while it is rebuilt.
+MAINTENANCE_WORK_MEM = "256MB"
+
+
+class SecondaryIndex(_t.NamedTuple):
+    """An index of a table which is dropped and rebuilt by a bulk load."""
+
+    name: str
+    # The statement which creates the index, or the definition of the
+    # constraint which the index belongs to.
+    definition: str
+    constraint: bool
+
+    def drop_statement(self, table: str) -> str:
+        """Get the statement which drops the index."""
+        if self.constraint:
+            return f'ALTER TABLE {table} DROP CONSTRAINT "{self.name}";'
+        return f'DROP INDEX "{self.name}";'
+
+    def create_statement(self, table: str) -> str:
+        """Get the statement which rebuilds the index."""
+        if self.constraint:
+            return (
+                f'ALTER TABLE {table} ADD CONSTRAINT "{self.name}" '
+                f"{self.definition};"
+            )
+        return f"{self.definition};"
+
+
+def secondary_indexes(
+    cursor, table: str, keep_unique: bool
+) -> _t.List[SecondaryIndex]:
+    """Find the indexes of a table which can be dropped while data is loaded
+    and rebuilt afterwards. The primary key and any index which a foreign key
+    relies on are never included.
+
+    Args:
+        cursor: A database cursor.
+        table: The name of the table.
+        keep_unique: Whether to leave out unique indexes.
+
+    Returns:
+        The indexes.
+    """
+    cursor.execute(
+        """
+        SELECT
+            index_class.relname,
+            coalesce(
+                pg_get_constraintdef(owner.oid),
+                pg_get_indexdef(idx.indexrelid)
+            ),
+            owner.oid IS NOT NULL
+        FROM pg_index AS idx
+        JOIN pg_class AS index_class ON index_class.oid = idx.indexrelid
+        LEFT JOIN pg_constraint AS owner
+            ON owner.conindid = idx.indexrelid
+            AND owner.conrelid = idx.indrelid
+            AND owner.contype IN ('u', 'x')
+        WHERE idx.indrelid = %s::regclass
+            AND NOT idx.indisprimary
+            AND NOT (idx.indisunique AND %s)
+            AND NOT EXISTS (
+                SELECT FROM pg_constraint AS reference
+                WHERE reference.contype = 'f'
+                    AND reference.conindid = idx.indexrelid
+            )
+        ORDER BY index_class.relname;""",
+        [table, keep_unique],
+    )
+    return [SecondaryIndex(*row) for row in cursor.fetchall()]
+
+
+class BulkLoad:
+    """Stages chunks of cleaned data in an `UNLOGGED` table and merges them
+    into a model's table in one go. See the module's docstring.
+
+    Chunks are added with `stage` and merged with `finish`. The staging
+    table is dropped by `finish`, or by `discard` where the load is
+    abandoned.
+    """
+
+    def __init__(self, model: Model):
+        """Initialize the bulk load.
+
+        Args:
+            model: The django model to load the data into.
+        """
+        self.model = model
+        # Makes the names of the tables created by this load unique, so that
+        # concurrent loads of the same model each have their own.
+        self.suffix = uuid.uuid4().hex[:8]
+        self.staging_table = f"{model._meta.db_table}_bulk_{self.suffix}"
+        self.layout: _t.Optional[LoadingStrategy] = None
+        self.staged_rows = 0
+        self.indexes: _t.List[SecondaryIndex] = []
+        # The number of seconds spent on each step of `finish`.
+        self.timings: _t.Dict[str, float] = {}
+
+    @property
+    def db_table(self) -> str:
+        """The name of the table the data is loaded into."""
+        return self.model._meta.db_table
+
+    def stage(self, dataframe: pd.DataFrame) -> int:
+        """Copy a chunk of cleaned data into the staging table, creating the
+        table for the first chunk. Every chunk must have the same columns.
+
+        Args:
+            dataframe: The cleaned data.
+
+        Returns:
+            The number of rows staged.
+        """
+        if not len(dataframe):
+            return 0
+        if self.layout is None:
+            # The columns are derived from the model in the same way as the
+            # loading strategies.
+            self.layout = CopyMerge(dataframe, self.model)
+            self.layout.validate_model()
+            self.create()
+
+        columns = ", ".join(self.layout.columns)
+        buffer = utils.csv_buffer(dataframe, self.layout.columns)
+        with connection.cursor() as cursor, connection.wrap_database_errors:
+            cursor.copy_expert(
+                f"COPY {self.staging_table} ({columns}) FROM STDIN "
+                "WITH (FORMAT csv, NULL '\\N')",
+                buffer,
+            )
+        self.staged_rows += len(dataframe)
+        return len(dataframe)
+
+    def create(self) -> None:
+        """Create the staging table."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                CREATE UNLOGGED TABLE {self.staging_table} AS
+                SELECT {", ".join(self.layout.columns)} FROM {self.db_table}
+                WITH NO DATA;"""
+            )
+            cursor.execute(
+                f"ALTER TABLE {self.staging_table} ADD COLUMN "
+                f"{POSITION_COLUMN} bigint GENERATED ALWAYS AS IDENTITY;"
+            )
+
+    def merge_query(self, initial: bool) -> str:
+        """Build the query which merges the last row staged for each key
+        into the table. The query returns the number of distinct rows which
+        were staged, and the number of those which were inserted and
+        updated.
+
+        Args:
+            initial: Whether the table is empty, in which case the rows are
+                inserted without checking for conflicts.
+
+        Returns:
+            The query.
+        """
+        columns = ", ".join(self.layout.columns)
+        keys = ", ".join(self.layout.conflict_columns)
+        conflict = (
+            ""
+            if initial
+            else utils.conflict_clause(
+                self.db_table,
+                self.layout.conflict_columns,
+                self.layout.update_columns,
+            )
+        )
+        return f"""
+            WITH staged AS MATERIALIZED (
+                SELECT DISTINCT ON ({keys}) {columns}
+                FROM {self.staging_table}
+                ORDER BY {keys}, {POSITION_COLUMN} DESC
+            ),
+            upserted AS (
+                INSERT INTO {self.db_table} ({columns})
+                SELECT {columns} FROM staged
+                {conflict}
+                RETURNING xmax = 0 AS inserted
+            )
+            SELECT
+                (SELECT count(*) FROM staged),
+                count(*) FILTER (WHERE inserted),
+                count(*) FILTER (WHERE NOT inserted)
+            FROM upserted;"""
+
+    def finish(self) -> LoadResult:
+        """Merge the staged data into the table, dropping its secondary
+        indexes first and rebuilding them afterwards, then analyse the table
+        and drop the staging table. The keys which were staged are added to
+        the cache of valid foreign keys and, where rows were inserted, the
+        manifest of the data loaded into the tables which refer to the model
+        is forgotten, as in `base.load_data`.
+
+        Returns:
+            The number of distinct rows inserted, updated and left
+            unchanged.
+        """
+        if self.layout is None:
+            return LoadResult()
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            started = time.perf_counter()
+            initial = not self.model.objects.exists()
+            self.indexes = secondary_indexes(
+                cursor, self.db_table, keep_unique=not initial
+            )
+            for index in self.indexes:
+                cursor.execute(index.drop_statement(self.db_table))
+            cursor.execute(self.merge_query(initial))
+            rows, inserted, updated = cursor.fetchone()
+            # Django's foreign keys are checked at the end of the
+            # transaction, but an index cannot be built on a table with
+            # checks pending, so they are run now.
+            connection.check_constraints()
+            self.timings["merge"] = time.perf_counter() - started
+
+            started = time.perf_counter()
+            cursor.execute(
+                f"SET LOCAL maintenance_work_mem = '{MAINTENANCE_WORK_MEM}';"
+            )
+            for index in self.indexes:
+                cursor.execute(index.create_statement(self.db_table))
+            self.timings["index"] = time.perf_counter() - started
+
+            started = time.perf_counter()
+            cursor.execute(f"ANALYZE {self.db_table};")
+            self.timings["analyze"] = time.perf_counter() - started
+
+            for field in valid_keys.fields(self.model):
+                column = self.model._meta.get_field(field).column
+                if column in self.layout.columns:
+                    cursor.execute(
+                        f"SELECT DISTINCT {column} FROM {self.staging_table};"
+                    )
+                    valid_keys.add(
+                        self.model, field, [row[0] for row in cursor]
+                    )
+            cursor.execute(f"DROP TABLE {self.staging_table};")
+            if inserted:
+                manifest.forget_dependents(self.model)
+        self.layout = None
+        return LoadResult.from_counts(rows, inserted, updated)
+
+    def discard(self) -> None:
+        """Drop the staging table, where the load is abandoned."""
+        if self.layout is None:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {self.staging_table};")
+        self.layout = None
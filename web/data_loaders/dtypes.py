@@ -0,0 +1,183 @@
+"""This module contains functions for deriving compact pandas dtypes from a
+model's fields, so that data is read into memory in the types it will be
+loaded as rather than the types pandas would infer.
+"""
+
+import re
+import sys
+import typing as _t
+import pandas as pd
+from django.db import connection
+from django.db.models import Model
+
+# CharFields which are no longer than this are assumed to hold a small set of
+# labels, such as a status, and so are read as categoricals.
+CATEGORY_MAX_LENGTH = 50
+
+# The pandas dtypes for each of the database types. The nullable integer types
+# are used so that missing values do not turn the column into floats.
+DB_TYPE_DTYPES = {
+    "smallint": "Int16",
+    "integer": "Int32",
+    "bigint": "Int64",
+    "numeric": "float64",
+    "real": "float32",
+    "double precision": "float64",
+    "boolean": "boolean",
+    "date": "category",
+    "text": "string[pyarrow]",
+}
+
+# The dtypes which any value can be read as. Columns of the other dtypes,
+# such as integers, are read with their types inferred and converted once
+# read by `convert_dtypes`, as reading a value which does not fit the dtype,
+# such as `1.5` for an integer, would otherwise fail the whole read before
+# the rows could be cleaned.
+LENIENT_DTYPES = {"category", "string[pyarrow]"}
+
+# The size of an empty python string, which each string held in an object
+# column takes up in addition to its characters.
+EMPTY_STR_SIZE = sys.getsizeof("")
+
+
+def field_dtype(field) -> _t.Optional[str]:
+    """Get the pandas dtype to read a model field's column as.
+
+    Args:
+        field: The model field.
+
+    Returns:
+        The pandas dtype, or None if the type should be inferred.
+    """
+    db_type = re.sub(r"\(.*\)", "", field.cast_db_type(connection)).strip()
+    if db_type == "varchar":
+        if field.choices or field.max_length <= CATEGORY_MAX_LENGTH:
+            return "category"
+        return "string[pyarrow]"
+    return DB_TYPE_DTYPES.get(db_type)
+
+
+def model_dtypes(
+    model: Model, column_map: _t.Optional[_t.Dict[str, str]] = None
+) -> _t.Dict[str, str]:
+    """Build a map of the columns of a file to the pandas dtypes to read them
+    as, based on the model's fields.
+
+    Args:
+        model: The model the data is loaded into.
+        column_map: A map of the file's column names to the model's column
+            names where they differ.
+
+    Returns:
+        The pandas dtype for each of the file's columns which belongs to the
+        model.
+    """
+    column_map = column_map or {}
+    fields = {field.column: field for field in model._meta.concrete_fields}
+    dtypes = {}
+    for column, field in fields.items():
+        dtype = field_dtype(field)
+        if dtype is not None:
+            dtypes[column] = dtype
+    for file_column, model_column in column_map.items():
+        if model_column in dtypes:
+            dtypes[file_column] = dtypes.pop(model_column)
+    return dtypes
+
+
+def read_dtypes(dtypes: _t.Dict[str, str]) -> _t.Dict[str, str]:
+    """Select the dtypes which columns can be read as without a single value
+    failing the read. See `LENIENT_DTYPES`.
+
+    Args:
+        dtypes: The pandas dtype for each column. See `model_dtypes`.
+
+    Returns:
+        The pandas dtype for each column which can be read as it.
+    """
+    return {
+        column: dtype
+        for column, dtype in dtypes.items()
+        if dtype in LENIENT_DTYPES
+    }
+
+
+def convert_dtypes(
+    dataframe: pd.DataFrame, dtypes: _t.Dict[str, str]
+) -> pd.DataFrame:
+    """Convert the columns of a dataframe which were not read as their
+    dtypes. A column with a value which does not fit its dtype, such as a
+    fraction or an integer which is out of range, is left as it is, so that
+    the rows with those values can be removed when the data is cleaned (see
+    `data_cleaners.methods.FilterInvalidValues`) and the column converted
+    afterwards.
+
+    Args:
+        dataframe: The dataframe, which is modified in place.
+        dtypes: The pandas dtype for each column. See `model_dtypes`.
+
+    Returns:
+        The dataframe.
+    """
+    for column, dtype in dtypes.items():
+        if column not in dataframe.columns or dtype in LENIENT_DTYPES:
+            continue
+        if dataframe[column].dtype == dtype:
+            continue
+        try:
+            dataframe[column] = dataframe[column].astype(dtype)
+        except (TypeError, ValueError, OverflowError):
+            continue
+    return dataframe
+
+
+def inferred_memory_usage(dataframe: pd.DataFrame) -> int:
+    """Estimate the memory a dataframe would use had the types of its columns
+    been inferred by pandas rather than given. Inferred integers and floats
+    take up 8 bytes per row, booleans take up 1 byte per row and strings are
+    held as python objects.
+
+    Args:
+        dataframe: The dataframe read using compact dtypes.
+
+    Returns:
+        The estimated memory usage in bytes.
+    """
+    total = dataframe.index.memory_usage()
+    for column in dataframe.columns:
+        series = dataframe[column]
+        rows = len(series)
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            counts = series.value_counts(sort=False)
+            sizes = counts.index.map(sys.getsizeof).to_numpy()
+            total += 8 * rows + int((sizes * counts.to_numpy()).sum())
+        elif pd.api.types.is_string_dtype(series.dtype):
+            if series.dtype == object:
+                total += series.memory_usage(index=False, deep=True)
+            else:
+                total += (
+                    8 * rows
+                    + EMPTY_STR_SIZE * int(series.count())
+                    + int(series.str.len().sum())
+                )
+        elif pd.api.types.is_bool_dtype(series.dtype):
+            total += rows
+        else:
+            total += 8 * rows
+    return total
+
+
+def format_bytes(size: float) -> str:
+    """Format a number of bytes to be human readable.
+
+    Args:
+        size: The number of bytes.
+
+    Returns:
+        The formatted size, such as "1.5 MB".
+    """
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(size) < 1024 or unit == "GB":
+            break
+        size /= 1024
+    return f"{size:.1f} {unit}"
@@ -0,0 +1,84 @@
+"""This module contains the function which cleans and loads a data frame
+into a model's table, and a mixin which adds it to a model as
+`load_from_dataframe`. The data is cleaned with the model's
+`cleaning_strategies` and loaded with one of the loading strategies in
+`methods`.
+"""
+
+import typing as _t
+import pandas as pd
+from django.db.models import Model
+from data_cleaners.base import CleaningStrategy, clean_data
+from . import methods
+from .base import LoadResult, load_data
+from .utils import DEFAULT_BATCH_SIZE
+
+
+def load_model_dataframe(
+    model: Model,
+    dataframe: pd.DataFrame,
+    method: str = "auto",
+    batch_size: _t.Union[int, str] = DEFAULT_BATCH_SIZE,
+    copy: bool = True,
+    quarantine: bool = False,
+    clean: bool = True,
+) -> LoadResult:
+    """Updates or inserts records in bulk from a pandas dataframe.
+
+    Args:
+        model - The django model to load the data into. Its
+            `cleaning_strategies` are used to clean the data.
+        dataframe - Pandas dataframe containing the data to be uploaded.
+        method - The name of the method used to send the data to the
+            database. See `methods.LOAD_METHODS`.
+        batch_size - The maximum number of records sent to the database in a
+            single query, or `auto` to tune it while loading. See `tuning`.
+        copy - Whether to copy the dataframe before cleaning it. Set this to
+            False where the dataframe is no longer needed, in which case it
+            may be modified.
+        quarantine - Whether to quarantine the records which the database
+            rejects and load the rest, rather than failing. See
+            `models.QuarantinedRow`.
+        clean - Whether to clean the dataframe before loading it. Set this to
+            False where it has already been cleaned with the model's
+            `cleaning_strategies`.
+
+    Returns:
+        The number of records inserted, updated, left unchanged and
+        quarantined.
+    """
+    strategy = methods.get_strategy(method)
+    if clean:
+        dataframe = clean_data(
+            dataframe,
+            model,
+            model.cleaning_strategies,
+            copy=copy,
+            fuse=True,
+            plan=True,
+        )
+    return load_data(
+        dataframe,
+        model,
+        strategy,
+        batch_size=batch_size,
+        quarantine=quarantine,
+    )
+
+
+class DataFrameLoaderMixin:
+    """Adds `load_from_dataframe` to a model. The model should set
+    `cleaning_strategies` to the strategies used to clean data before it is
+    loaded, in order.
+    """
+
+    cleaning_strategies: _t.List[_t.Type[CleaningStrategy]] = []
+
+    @classmethod
+    def load_from_dataframe(
+        cls, dataframe: pd.DataFrame, **options
+    ) -> LoadResult:
+        """Updates or inserts records in bulk from a pandas dataframe. See
+        `load_model_dataframe` for the options.
+        """
+        return load_model_dataframe(cls, dataframe, **options)
@@ -0,0 +1,189 @@
+"""This module contains functions for keeping a manifest of the data which
+has been loaded, so that files and partitions of files which are delivered
+again with the same content can be skipped rather than loaded again.
+
+A file is identified by a checksum of its bytes, so an unchanged file is
+skipped without being parsed. Where a file has changed, the rows which share
+a value of a partition column, such as a date, are hashed together and only
+the partitions whose content has changed are loaded. A partition belongs to
+a file, so where the rows of a date are spread across several files, each
+file's share of them is recorded and compared separately.
+"""
+
+import hashlib
+import typing as _t
+import pandas as pd
+from django.apps import apps
+from django.db.models import Model
+from .models import LoadedFile, LoadedPartition
+
+# The number of bytes of a file which are read into memory at a time while
+# calculating its checksum.
+CHECKSUM_BLOCK_SIZE = 1024 * 1024
+
+
+def model_label(model: Model) -> str:
+    """Get the label which a model's data is recorded under.
+
+    Args:
+        model: A django model.
+
+    Returns:
+        The label, such as `search.SearchTerm`.
+    """
+    return model._meta.label
+
+
+def file_checksum(filepath: str) -> str:
+    """Calculate a checksum of the bytes of a file.
+
+    Args:
+        filepath: The path to the file.
+
+    Returns:
+        The checksum as a hex string.
+    """
+    digest = hashlib.blake2b(digest_size=32)
+    with open(filepath, "rb") as _file:
+        for block in iter(lambda: _file.read(CHECKSUM_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def is_file_loaded(model: Model, checksum: str) -> bool:
+    """Check whether a file with the same content has already been loaded
+    into the model's table.
+
+    Args:
+        model: A django model.
+        checksum: The checksum of the file. See `file_checksum`.
+
+    Returns:
+        True if the file has already been loaded.
+    """
+    return LoadedFile.objects.filter(
+        model=model_label(model), checksum=checksum
+    ).exists()
+
+
+def record_file(model: Model, filepath: str, checksum: str, size: int) -> None:
+    """Record that a file has been loaded into the model's table.
+
+    Args:
+        model: A django model.
+        filepath: The path to the file.
+        checksum: The checksum of the file. See `file_checksum`.
+        size: The size of the file in bytes.
+    """
+    LoadedFile.objects.update_or_create(
+        model=model_label(model),
+        checksum=checksum,
+        defaults={"path": filepath, "size": size},
+    )
+
+
+def partition_checksums(
+    chunks: _t.Iterable[pd.DataFrame], column: str
+) -> _t.Dict[str, str]:
+    """Calculate a checksum of the rows of each partition of the data, where
+    a partition is the rows which share a value of the given column. The
+    checksum depends on the values and order of the rows, so it only matches
+    where the partition would be loaded with the same result.
+
+    Args:
+        chunks: The chunks of data, in order.
+        column: The column which the data is partitioned by.
+
+    Returns:
+        The checksum of each partition, keyed by the value of the column as a
+        string.
+    """
+    digests = {}
+    for chunk in chunks:
+        row_hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+        values = chunk[column].astype(str)
+        partitions = values.groupby(values, sort=False).indices
+        for value, positions in partitions.items():
+            if value not in digests:
+                digests[value] = hashlib.blake2b(digest_size=32)
+            digests[value].update(row_hashes[positions].tobytes())
+    return {value: digest.hexdigest() for value, digest in digests.items()}
+
+
+def changed_partitions(
+    model: Model, filepath: str, column: str, checksums: _t.Dict[str, str]
+) -> _t.Dict[str, str]:
+    """Find the partitions of a file whose content differs from when they
+    were last loaded into the model's table, or which have never been
+    loaded.
+
+    Args:
+        model: A django model.
+        filepath: The path to the file.
+        column: The column which the data is partitioned by.
+        checksums: The checksum of each partition. See
+            `partition_checksums`.
+
+    Returns:
+        The checksums of the partitions which have changed.
+    """
+    loaded = dict(
+        LoadedPartition.objects.filter(
+            model=model_label(model),
+            path=filepath,
+            column=column,
+            value__in=checksums,
+        ).values_list("value", "checksum")
+    )
+    return {
+        value: checksum
+        for value, checksum in checksums.items()
+        if loaded.get(value) != checksum
+    }
+
+
+def record_partitions(
+    model: Model, filepath: str, column: str, checksums: _t.Dict[str, str]
+) -> None:
+    """Record the content of partitions of a file which have been loaded
+    into the model's table.
+
+    Args:
+        model: A django model.
+        filepath: The path to the file.
+        column: The column which the data is partitioned by.
+        checksums: The checksum of each partition which was loaded.
+    """
+    label = model_label(model)
+    for value, checksum in checksums.items():
+        LoadedPartition.objects.update_or_create(
+            model=label,
+            path=filepath,
+            column=column,
+            value=value,
+            defaults={"checksum": checksum},
+        )
+
+
+def forget_dependents(model: Model) -> None:
+    """Forget the data loaded into the tables of the models which have a
+    foreign key to the given model. Rows which were removed from that data
+    because their foreign key was invalid may now be valid, so the data must
+    not be skipped the next time it is delivered.
+
+    Args:
+        model: The model whose table has had rows inserted.
+    """
+    labels = [
+        model_label(dependent)
+        for dependent in apps.get_models()
+        if any(
+            fk["model"] is model
+            for fk in getattr(
+                getattr(dependent, "DataCleaner", None), "fk_map", {}
+            ).values()
+        )
+    ]
+    if labels:
+        LoadedFile.objects.filter(model__in=labels).delete()
+        LoadedPartition.objects.filter(model__in=labels).delete()
@@ -0,0 +1,133 @@
+"""This module contains shared methods for loading data."""
+
+import typing as _t
+from django.db import connection, transaction
+from .base import LoadingStrategy, LoadResult
+from . import utils
+
+
+class InsertValues(LoadingStrategy):
+    """Loads the data in batches of insert queries, where each column of a
+    batch is sent to the database as a single array. When quarantining, each
+    batch is loaded under its own savepoint so that a batch which fails can
+    be split to find the rows which cause the error.
+    """
+
+    def load(self) -> LoadResult:
+        """Executes the loading task."""
+        self.validate_model()
+        with connection.cursor() as cursor:
+            inserted, updated = utils.upsert_dataframe(
+                cursor,
+                self.model,
+                self.dataframe,
+                columns=self.columns,
+                conflict_columns=self.conflict_columns,
+                update_columns=self.update_columns,
+                batch_size=self.batch_size,
+                on_error=self.quarantine_rows if self.quarantine else None,
+            )
+        return LoadResult.from_counts(
+            len(self.dataframe), inserted, updated, self.save_quarantined()
+        )
+
+
+class CopyMerge(LoadingStrategy):
+    """Streams the data into a temporary staging table using `COPY` and then
+    merges the staging table into the table with a single query. When
+    quarantining, the data is loaded with `InsertValues` instead if the
+    database rejects any of it, as a single query cannot be split.
+    """
+
+    def load(self) -> LoadResult:
+        """Executes the loading task."""
+        self.validate_model()
+        if not self.quarantine:
+            return self.copy_merge()
+        try:
+            with transaction.atomic():
+                return self.copy_merge()
+        except utils.ROW_ERRORS:
+            return InsertValues(
+                self.dataframe, self.model, self.batch_size, quarantine=True
+            ).load()
+
+    def copy_merge(self) -> LoadResult:
+        """Copies the data into the staging table and merges it into the
+        table.
+        """
+        staging_table = f"{self.db_table}_staging"
+        columns = ", ".join(self.columns)
+
+        buffer = utils.csv_buffer(self.dataframe, self.columns)
+
+        # The staging table is dropped at the end of the transaction.
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                CREATE TEMPORARY TABLE {staging_table} ON COMMIT DROP AS
+                SELECT {columns} FROM {self.db_table} WITH NO DATA;"""
+            )
+            # `copy_expert` is not wrapped by django, so its errors are
+            # translated to django's errors here.
+            with connection.wrap_database_errors:
+                cursor.copy_expert(
+                    f"COPY {staging_table} ({columns}) FROM STDIN "
+                    "WITH (FORMAT csv, NULL '\\N')",
+                    buffer,
+                )
+            cursor.execute(
+                utils.merge_query(
+                    self.db_table,
+                    staging_table,
+                    self.columns,
+                    self.conflict_columns,
+                    self.update_columns,
+                )
+            )
+            inserted, updated = cursor.fetchone()
+            cursor.execute(f"DROP TABLE {staging_table};")
+        return LoadResult.from_counts(len(self.dataframe), inserted, updated)
+
+
+class AutoSelect(LoadingStrategy):
+    """Loads the data using whichever method is fastest for the amount of
+    data. Where the data fits in a single batch, the overhead of creating a
+    staging table outweighs the benefit of `COPY`.
+    """
+
+    def load(self) -> LoadResult:
+        """Executes the loading task."""
+        strategy = (
+            CopyMerge
+            if len(self.dataframe) > self.batch_rows
+            else InsertValues
+        )
+        return strategy(
+            self.dataframe, self.model, self.batch_size, self.quarantine
+        ).load()
+
+
+# The loading strategies which can be selected by name.
+LOAD_METHODS = {
+    "auto": AutoSelect,
+    "insert": InsertValues,
+    "copy": CopyMerge,
+}
+
+
+def get_strategy(method: str) -> _t.Type[LoadingStrategy]:
+    """Get the loading strategy for the name of a load method.
+
+    Args:
+        method: The name of the load method.
+
+    Returns:
+        The loading strategy.
+    """
+    if method not in LOAD_METHODS:
+        raise ValueError(
+            f"Unknown load method ({method}). Expected one of: "
+            f"{', '.join(LOAD_METHODS)}."
+        )
+    return LOAD_METHODS[method]
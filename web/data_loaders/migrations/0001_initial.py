@@ -0,0 +1,57 @@
+# Generated by Django 4.0.1 on 2026-10-18 18:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="LoadedPartition",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("model", models.CharField(max_length=100)),
+                ("column", models.CharField(max_length=100)),
+                ("value", models.CharField(max_length=255)),
+                ("checksum", models.CharField(max_length=64)),
+                ("loaded_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "unique_together": {("model", "column", "value")},
+            },
+        ),
+        migrations.CreateModel(
+            name="LoadedFile",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("model", models.CharField(max_length=100)),
+                ("checksum", models.CharField(max_length=64)),
+                ("path", models.CharField(max_length=1024)),
+                ("size", models.BigIntegerField()),
+                ("loaded_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "unique_together": {("model", "checksum")},
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.0.1 on 2026-10-18 18:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("data_loaders", "0002_loadcheckpoint"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="QuarantinedRow",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("model", models.CharField(max_length=100)),
+                ("data", models.JSONField()),
+                ("error", models.TextField()),
+                ("quarantined_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.0.1 on 2026-10-18 19:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("data_loaders", "0003_quarantinedrow"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="loadedpartition",
+            name="path",
+            field=models.CharField(default="", max_length=1024),
+            preserve_default=False,
+        ),
+        migrations.AlterUniqueTogether(
+            name="loadedpartition",
+            unique_together={("model", "path", "column", "value")},
+        ),
+    ]
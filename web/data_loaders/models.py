@@ -0,0 +1,138 @@
+import os
+from django.db import models
+
+
+class LoadedFile(models.Model):
+    """Represents a file which has been loaded into a model's table, so that
+    it can be skipped if it is delivered again with the same content.
+    """
+
+    # The label of the model, such as `search.SearchTerm`.
+    model = models.CharField(max_length=100)
+    checksum = models.CharField(max_length=64)
+    path = models.CharField(max_length=1024)
+    size = models.BigIntegerField()
+    loaded_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.model}: {self.path}"
+
+    class Meta:
+        unique_together = ("model", "checksum")
+
+
+class LoadedPartition(models.Model):
+    """Represents the content of the rows of a file which share a value of
+    a column, such as a date, as of the last time they were loaded into a
+    model's table. Only partitions whose content has changed need to be
+    loaded again. A value may be spread across several files, each of which
+    has its own partition.
+    """
+
+    model = models.CharField(max_length=100)
+    path = models.CharField(max_length=1024)
+    column = models.CharField(max_length=100)
+    value = models.CharField(max_length=255)
+    checksum = models.CharField(max_length=64)
+    loaded_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.model}: {self.column} = {self.value} ({self.path})"
+
+    class Meta:
+        unique_together = ("model", "path", "column", "value")
+
+
+class QuarantinedRow(models.Model):
+    """Represents a row which was rejected by the database when it was
+    loaded, such as a value which does not fit in its column, along with the
+    error it caused. Quarantined rows are kept so that they can be fixed and
+    loaded again without holding up the rest of the data.
+    """
+
+    model = models.CharField(max_length=100)
+    data = models.JSONField()
+    error = models.TextField()
+    quarantined_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.model}: {self.error}"
+
+
+class LoadCheckpoint(models.Model):
+    """Represents the progress of loading a file into a model's table. The
+    number of rows of the file which have been loaded is committed along
+    with each chunk of the file, so that a load which fails part of the way
+    through can be resumed from the last chunk which was committed.
+    """
+
+    model = models.CharField(max_length=100)
+    path = models.CharField(max_length=1024)
+    # The size and modification time, in nanoseconds, of the file, which
+    # must match for a load of the file to be resumed.
+    size = models.BigIntegerField()
+    modified = models.BigIntegerField()
+    rows = models.BigIntegerField(default=0)
+    completed = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.model}: {self.path} ({self.rows} rows)"
+
+    class Meta:
+        unique_together = ("model", "path")
+
+    @classmethod
+    def start(
+        cls, model: models.Model, filepath: str, resume: bool = False
+    ) -> "LoadCheckpoint":
+        """Get the checkpoint for loading a file into a model's table. The
+        load starts from the beginning of the file unless it is being resumed
+        and the file has not changed since the checkpoint was last updated.
+
+        Args:
+            model: The model the file is loaded into.
+            filepath: The path to the file.
+            resume: Whether to resume a previous load of the file.
+
+        Returns:
+            The checkpoint.
+        """
+        path = os.path.abspath(filepath)
+        stat = os.stat(path)
+        checkpoint, created = cls.objects.get_or_create(
+            model=model._meta.label,
+            path=path,
+            defaults={"size": stat.st_size, "modified": stat.st_mtime_ns},
+        )
+        if created:
+            return checkpoint
+
+        if (
+            not resume
+            or checkpoint.size != stat.st_size
+            or checkpoint.modified != stat.st_mtime_ns
+        ):
+            checkpoint.size, checkpoint.modified = (
+                stat.st_size,
+                stat.st_mtime_ns,
+            )
+            checkpoint.rows, checkpoint.completed = 0, False
+            checkpoint.save()
+        return checkpoint
+
+    def advance(self, rows: int) -> None:
+        """Record that the first rows of the file have been loaded. This
+        should be called in the same transaction as loading the rows.
+
+        Args:
+            rows: The total number of rows of the file which have been read
+                and loaded.
+        """
+        self.rows = rows
+        self.save(update_fields=["rows", "updated_at"])
+
+    def complete(self) -> None:
+        """Record that the whole file has been loaded."""
+        self.completed = True
+        self.save(update_fields=["completed", "updated_at"])
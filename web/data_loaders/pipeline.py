@@ -0,0 +1,232 @@
+"""This module contains a pipeline which overlaps the stages of loading data,
+so that the next chunk of a file is read and cleaned while the previous
+chunk is being written to the database, rather than the CPU waiting on the
+database and the database waiting on the CPU.
+
+Each stage runs on its own thread and passes its results to the next stage
+through a bounded queue. When a queue is full, the stage before it waits, so
+a slow stage holds back the stages before it rather than letting chunks pile
+up in memory. The results of the last stage are passed to a sink, or yielded
+by `items`, on the calling thread. Parsing, most of pandas and the database
+driver release the GIL while they work, so the stages run at the same time.
+
+Each thread has its own database connection, which cannot see the rows
+written by the caller's transaction until it is committed. Anything which
+reads or writes the database, such as cleaning data against the foreign keys
+which exist, should therefore run on the calling thread.
+
+The time each stage spends working is measured, so that the utilisation of
+each stage shows which of them limits the throughput.
+"""
+
+import queue
+import threading
+import time
+import typing as _t
+from django.db import connections
+
+# The number of chunks which may wait between two stages.
+DEFAULT_QUEUE_SIZE = 2
+
+# How often, in seconds, a stage waiting on a queue checks whether the
+# pipeline has been stopped.
+POLL_INTERVAL = 0.1
+
+# Marks the end of the items passed between stages.
+_DONE = object()
+
+
+class _Failure(_t.NamedTuple):
+    """An error raised by a stage, passed on to the calling thread."""
+
+    error: BaseException
+
+
+class Pipeline:
+    """Passes the items of a source through a series of stages, each of
+    which runs on its own thread, to the calling thread, either into a sink
+    with `run` or by iterating over `items`.
+    """
+
+    def __init__(
+        self,
+        source: _t.Iterable,
+        stages: _t.List[_t.Tuple[str, _t.Callable[[_t.Any], _t.Any]]],
+        sink: _t.Optional[_t.Tuple[str, _t.Callable[[_t.Any], None]]] = None,
+        source_name: str = "read",
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+    ):
+        """Initialize the pipeline.
+
+        Args:
+            source: The items to pass through the pipeline, such as the
+                chunks of a file. The time taken to produce each item is
+                measured as the first stage.
+            stages: The name and function of each stage, in order. Each
+                function takes the result of the previous stage.
+            sink: The name and function of the last stage, which takes the
+                result of the last of `stages` on the calling thread. Only
+                needed by `run`.
+            source_name: The name of the stage which produces the items.
+            queue_size: The number of items which may wait between two
+                stages before the earlier stage waits for the later one.
+        """
+        self.source = source
+        self.stages = stages
+        self.sink = sink
+        self.source_name = source_name
+        self.queue_size = queue_size
+        self.busy: _t.Dict[str, float] = {
+            name: 0.0 for name in [source_name] + [name for name, _ in stages]
+        }
+        if sink is not None:
+            self.busy[sink[0]] = 0.0
+        self.elapsed = 0.0
+        # The time the calling thread spent waiting for the stages.
+        self.waiting = 0.0
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        """Pass every item through the pipeline into the sink. Where any
+        stage raises an error, the other stages are stopped and the error is
+        raised on the calling thread.
+        """
+        name, function = self.sink
+        for item in self.items():
+            started = time.perf_counter()
+            function(item)
+            self.busy[name] += time.perf_counter() - started
+
+    def items(self) -> _t.Iterator[_t.Any]:
+        """Pass every item through the stages, yielding the results of the
+        last stage on the calling thread. Where any stage raises an error,
+        the other stages are stopped and the error is raised on the calling
+        thread. The stages are stopped as well when the iterator is closed
+        before it is exhausted.
+
+        Yields:
+            The results of the last stage, in order.
+        """
+        queues = [
+            queue.Queue(maxsize=self.queue_size)
+            for _ in range(len(self.stages) + 1)
+        ]
+        threads = [
+            threading.Thread(
+                target=self._produce, args=(queues[0],), daemon=True
+            )
+        ] + [
+            threading.Thread(
+                target=self._transform,
+                args=(name, function, queues[i], queues[i + 1]),
+                daemon=True,
+            )
+            for i, (name, function) in enumerate(self.stages)
+        ]
+
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                started = time.perf_counter()
+                item = queues[-1].get()
+                self.waiting += time.perf_counter() - started
+                if item is _DONE:
+                    return
+                if isinstance(item, _Failure):
+                    raise item.error
+                yield item
+        finally:
+            self._stopped.set()
+            for thread in threads:
+                thread.join()
+            self.elapsed = time.perf_counter() - started
+
+    def utilisation(self) -> _t.Dict[str, float]:
+        """Get the fraction of the time the pipeline ran for that each stage
+        spent working rather than waiting for the other stages.
+
+        Returns:
+            The utilisation of each stage, keyed by its name.
+        """
+        if not self.elapsed:
+            return {name: 0.0 for name in self.busy}
+        return {name: busy / self.elapsed for name, busy in self.busy.items()}
+
+    def _put(self, output: queue.Queue, item: _t.Any) -> bool:
+        """Put an item on a queue, waiting while it is full unless the
+        pipeline is stopped.
+
+        Args:
+            output: The queue.
+            item: The item.
+
+        Returns:
+            False if the pipeline was stopped before the item was put.
+        """
+        while not self._stopped.is_set():
+            try:
+                output.put(item, timeout=POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, source: queue.Queue) -> _t.Any:
+        """Get an item from a queue, waiting while it is empty unless the
+        pipeline is stopped.
+
+        Args:
+            source: The queue.
+
+        Returns:
+            The item, or `_DONE` if the pipeline was stopped.
+        """
+        while not self._stopped.is_set():
+            try:
+                return source.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _produce(self, output: queue.Queue) -> None:
+        """Produce the items of the source. Runs on its own thread."""
+        try:
+            items = iter(self.source)
+            while True:
+                started = time.perf_counter()
+                item = next(items, _DONE)
+                self.busy[self.source_name] += time.perf_counter() - started
+                if not self._put(output, item) or item is _DONE:
+                    return
+        except BaseException as error:
+            self._put(output, _Failure(error))
+        finally:
+            # Each thread has its own database connections, which would
+            # otherwise be left open.
+            connections.close_all()
+
+    def _transform(
+        self,
+        name: str,
+        function: _t.Callable[[_t.Any], _t.Any],
+        source: queue.Queue,
+        output: queue.Queue,
+    ) -> None:
+        """Apply a stage to each item. Runs on its own thread."""
+        try:
+            while True:
+                item = self._get(source)
+                if item is _DONE or isinstance(item, _Failure):
+                    self._put(output, item)
+                    return
+                started = time.perf_counter()
+                result = function(item)
+                self.busy[name] += time.perf_counter() - started
+                if not self._put(output, result):
+                    return
+        except BaseException as error:
+            self._put(output, _Failure(error))
+        finally:
+            connections.close_all()
@@ -0,0 +1,512 @@
+"""This module contains functions for reading the files which data is loaded
+from into pandas dataframes.
+"""
+
+import io
+import os
+import typing as _t
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+# The number of bytes sampled to estimate the size of a row of a CSV file.
+ROW_SIZE_SAMPLE_BYTES = 1024 * 1024
+
+# The extensions of the files which are loaded from a directory.
+FILE_EXTENSIONS = (".csv", ".parquet", ".feather", ".arrow", ".arrows")
+
+# The bytes that the files of each binary format start with. Arrow IPC
+# streams start with a continuation marker rather than a magic string.
+FILE_SIGNATURES = {
+    b"PAR1": "parquet",
+    b"ARROW1": "feather",
+    b"FEA1": "feather_v1",
+    b"\xff\xff\xff\xff": "arrow_stream",
+}
+
+
+def detect_format(filepath: str) -> str:
+    """Detect the format of a file from the bytes it starts with, so that
+    files are read correctly regardless of their extension.
+
+    Args:
+        filepath: The path to the file.
+
+    Returns:
+        One of `parquet`, `feather` (Arrow IPC files, including Feather),
+        `feather_v1` (legacy Feather files), `arrow_stream` (Arrow IPC
+        streams) or `csv`.
+    """
+    with open(filepath, "rb") as _file:
+        head = _file.read(max(map(len, FILE_SIGNATURES)))
+    for signature, file_format in FILE_SIGNATURES.items():
+        if head.startswith(signature):
+            return file_format
+    return "csv"
+
+
+def project(
+    names: _t.List[str], columns: _t.Optional[_t.Collection[str]]
+) -> _t.Optional[_t.List[str]]:
+    """Get the columns of a file which should be read.
+
+    Args:
+        names: The names of the columns in the file.
+        columns: The columns to read, or None to read every column.
+
+    Returns:
+        The names of the columns to read in the order they appear in the file,
+        or None to read every column.
+    """
+    if columns is None:
+        return None
+    return [name for name in names if name in columns]
+
+
+def iter_table(
+    table: pa.Table, chunk_size: _t.Optional[int] = None
+) -> _t.Iterator[pd.DataFrame]:
+    """Convert an Arrow table to pandas dataframes, one chunk at a time so
+    that only one chunk is converted into pandas memory at once.
+
+    Args:
+        table: The table to convert.
+        chunk_size: The maximum number of rows in each dataframe, or None to
+            convert the whole table to a single dataframe.
+
+    Yields:
+        The data as pandas dataframes.
+    """
+    if chunk_size is None:
+        yield table.to_pandas()
+        return
+    for batch in table.to_batches(max_chunksize=chunk_size):
+        yield batch.to_pandas()
+
+
+def iter_parquet(
+    filepath: str,
+    chunk_size: _t.Optional[int] = None,
+    columns: _t.Optional[_t.Collection[str]] = None,
+) -> _t.Iterator[pd.DataFrame]:
+    """Read a Parquet file. Only the requested columns are read from the file
+    and, where a chunk size is given, the file is streamed a row group at a
+    time so that memory usage does not grow with the size of the file.
+
+    Args:
+        filepath: The path to the Parquet file.
+        chunk_size: The maximum number of rows in each dataframe, or None to
+            read the whole file as a single dataframe.
+        columns: The columns to read, or None to read every column. Columns
+            which are not in the file are ignored.
+
+    Yields:
+        The data as pandas dataframes.
+    """
+    parquet_file = pq.ParquetFile(filepath, memory_map=True)
+    columns = project(parquet_file.schema_arrow.names, columns)
+    if chunk_size is None:
+        yield parquet_file.read(columns=columns).to_pandas()
+        return
+    for batch in parquet_file.iter_batches(
+        batch_size=chunk_size, columns=columns
+    ):
+        yield batch.to_pandas()
+
+
+def iter_feather(
+    filepath: str,
+    chunk_size: _t.Optional[int] = None,
+    columns: _t.Optional[_t.Collection[str]] = None,
+) -> _t.Iterator[pd.DataFrame]:
+    """Read an Arrow IPC file, which includes Feather files. The file is
+    memory-mapped and, where a chunk size is given, read one record batch at
+    a time, decoding only the requested columns. Uncompressed files are read
+    without copying, whereas compressed files have each batch decompressed
+    as it is read, so memory usage depends on the size of the record batches
+    the file was written with as well as the chunk size.
+
+    Args:
+        filepath: The path to the Arrow IPC file.
+        chunk_size: The maximum number of rows in each dataframe, or None to
+            read the whole file as a single dataframe.
+        columns: The columns to read, or None to read every column. Columns
+            which are not in the file are ignored.
+
+    Yields:
+        The data as pandas dataframes.
+    """
+    with pa.memory_map(filepath) as source:
+        names = pa.ipc.open_file(source).schema.names
+        options = pa.ipc.IpcReadOptions(
+            included_fields=(
+                None
+                if columns is None
+                else [i for i, name in enumerate(names) if name in columns]
+            )
+        )
+        reader = pa.ipc.open_file(source, options=options)
+        if chunk_size is None:
+            yield from iter_table(reader.read_all())
+            return
+        for i in range(reader.num_record_batches):
+            yield from iter_table(
+                pa.Table.from_batches([reader.get_batch(i)]), chunk_size
+            )
+
+
+def iter_feather_v1(
+    filepath: str,
+    chunk_size: _t.Optional[int] = None,
+    columns: _t.Optional[_t.Collection[str]] = None,
+) -> _t.Iterator[pd.DataFrame]:
+    """Read a legacy Feather (version 1) file, which is not an Arrow IPC
+    file and so can only be read as a whole table. Version 1 files are never
+    compressed, so the file is memory-mapped and only the chunk being
+    converted to pandas is held in memory.
+
+    Args:
+        filepath: The path to the Feather file.
+        chunk_size: The maximum number of rows in each dataframe, or None to
+            read the whole file as a single dataframe.
+        columns: The columns to read, or None to read every column. Columns
+            which are not in the file are ignored.
+
+    Yields:
+        The data as pandas dataframes.
+    """
+    table = feather.read_table(filepath, memory_map=True)
+    columns = project(table.schema.names, columns)
+    yield from iter_table(
+        table if columns is None else table.select(columns), chunk_size
+    )
+
+
+def iter_arrow_stream(
+    filepath: str,
+    chunk_size: _t.Optional[int] = None,
+    columns: _t.Optional[_t.Collection[str]] = None,
+) -> _t.Iterator[pd.DataFrame]:
+    """Read an Arrow IPC stream. The file is memory-mapped and, where a
+    chunk size is given, read one record batch at a time.
+
+    Args:
+        filepath: The path to the Arrow IPC stream.
+        chunk_size: The maximum number of rows in each dataframe, or None to
+            read the whole file as a single dataframe.
+        columns: The columns to read, or None to read every column. Columns
+            which are not in the file are ignored.
+
+    Yields:
+        The data as pandas dataframes.
+    """
+    with pa.memory_map(filepath) as source:
+        reader = pa.ipc.open_stream(source)
+        columns = project(reader.schema.names, columns)
+        if chunk_size is None:
+            table = reader.read_all()
+            yield from iter_table(
+                table if columns is None else table.select(columns)
+            )
+            return
+        for batch in reader:
+            table = pa.Table.from_batches([batch])
+            yield from iter_table(
+                table if columns is None else table.select(columns),
+                chunk_size,
+            )
+
+
+# The functions which read each of the binary file formats.
+ARROW_READERS = {
+    "parquet": iter_parquet,
+    "feather": iter_feather,
+    "feather_v1": iter_feather_v1,
+    "arrow_stream": iter_arrow_stream,
+}
+
+
+def csv_header_size(filepath: str) -> int:
+    """Get the size in bytes of the header line of a CSV file, including the
+    line break.
+
+    Args:
+        filepath: The path to the CSV file.
+
+    Returns:
+        The size of the header line.
+    """
+    with open(filepath, "rb") as _file:
+        return len(_file.readline())
+
+
+def csv_byte_ranges(
+    filepath: str, start: int, range_size: int
+) -> _t.List[_t.Tuple[int, int]]:
+    """Split a CSV file into byte ranges of roughly equal size. Each range is
+    aligned to start at the beginning of a line.
+
+    Args:
+        filepath: The path to the CSV file.
+        start: The offset of the first byte to split.
+        range_size: The approximate number of bytes in each range.
+
+    Returns:
+        The start and end offsets of each range.
+    """
+    size = os.path.getsize(filepath)
+    boundaries = [start]
+    with open(filepath, "rb") as _file:
+        while boundaries[-1] + range_size < size:
+            _file.seek(boundaries[-1] + range_size)
+            _file.readline()
+            boundaries.append(_file.tell())
+    if boundaries[-1] < size:
+        boundaries.append(size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def splits_quoted_field(
+    filepath: str, ranges: _t.List[_t.Tuple[int, int]]
+) -> bool:
+    """Check whether any boundary between the ranges falls inside a quoted
+    field, which happens when a quoted field contains a line break. A
+    boundary is inside a quoted field when an odd number of quotes precede
+    it, as escaped quotes are always doubled.
+
+    Args:
+        filepath: The path to the CSV file.
+        ranges: The start and end offsets of each range.
+
+    Returns:
+        True if any boundary falls inside a quoted field.
+    """
+    quotes = 0
+    with open(filepath, "rb") as _file:
+        for start, end in ranges[:-1]:
+            _file.seek(start)
+            quotes += _file.read(end - start).count(b'"')
+            if quotes % 2:
+                return True
+    return False
+
+
+def estimate_row_size(filepath: str, header_size: int) -> int:
+    """Estimate the average size in bytes of a row of a CSV file by sampling
+    the rows at the start of the file.
+
+    Args:
+        filepath: The path to the CSV file.
+        header_size: The size of the header line.
+
+    Returns:
+        The estimated size of a row.
+    """
+    with open(filepath, "rb") as _file:
+        _file.seek(header_size)
+        sample = _file.read(ROW_SIZE_SAMPLE_BYTES)
+    return max(1, len(sample) // max(1, sample.count(b"\n")))
+
+
+def read_csv_range(
+    filepath: str,
+    byte_range: _t.Tuple[int, int],
+    names: _t.List[str],
+    **options,
+) -> _t.Optional[pd.DataFrame]:
+    """Parse a range of lines of a CSV file.
+
+    Args:
+        filepath: The path to the CSV file.
+        byte_range: The start and end offsets of the lines to parse.
+        names: The column names from the header of the file.
+        options: Keyword arguments for `pd.read_csv`.
+
+    Returns:
+        The parsed lines, or None if the range only contains blank lines.
+    """
+    start, end = byte_range
+    with open(filepath, "rb") as _file:
+        _file.seek(start)
+        data = _file.read(end - start)
+    if not data.strip():
+        return None
+    return pd.read_csv(io.BytesIO(data), header=None, names=names, **options)
+
+
+def read_csv_ranges(
+    filepath: str,
+    ranges: _t.List[_t.Tuple[int, int]],
+    workers: int,
+    **options,
+) -> _t.Iterator[pd.DataFrame]:
+    """Parse ranges of lines of a CSV file on multiple threads, yielding the
+    parsed ranges in order. Ranges are submitted in windows so that no more
+    than `workers` parsed ranges are held in memory at a time.
+
+    Args:
+        filepath: The path to the CSV file.
+        ranges: The start and end offsets of each range of lines.
+        workers: The number of threads to parse the ranges with.
+        options: Keyword arguments for `pd.read_csv`.
+
+    Yields:
+        The parsed ranges.
+    """
+    names = pd.read_csv(filepath, nrows=0).columns.tolist()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = deque()
+        for byte_range in ranges:
+            futures.append(
+                executor.submit(
+                    read_csv_range, filepath, byte_range, names, **options
+                )
+            )
+            if len(futures) >= workers:
+                part = futures.popleft().result()
+                if part is not None:
+                    yield part
+        for future in futures:
+            part = future.result()
+            if part is not None:
+                yield part
+
+
+def iter_csv_parallel(
+    filepath: str,
+    workers: int,
+    chunk_size: _t.Optional[int] = None,
+    **options,
+) -> _t.Iterator[pd.DataFrame]:
+    """Parse a CSV file on multiple threads by splitting the file into ranges
+    of lines and parsing each range separately. The pandas parser releases
+    the GIL whilst tokenizing, so the ranges are parsed in parallel without
+    the cost of sending the parsed data between processes.
+
+    Where a chunk size is given, ranges of roughly that many rows are yielded
+    in the order they appear in the file, with at most `workers` ranges in
+    memory at once. Otherwise, the ranges are concatenated and the whole file
+    is yielded as one dataframe, which is identical to parsing the file on a
+    single thread.
+
+    If a quoted field containing a line break would be split between two
+    ranges, or the type of a column is inferred differently between ranges
+    when yielding the whole file, the file is parsed on a single thread
+    instead.
+
+    Args:
+        filepath: The path to the CSV file.
+        workers: The number of threads to parse the file with.
+        chunk_size: The approximate number of rows in each dataframe, or
+            None to yield the whole file as one dataframe.
+        options: Keyword arguments for `pd.read_csv`.
+
+    Yields:
+        The parsed data.
+    """
+    header_size = csv_header_size(filepath)
+    if chunk_size is None:
+        data_size = os.path.getsize(filepath) - header_size
+        range_size = data_size // workers + 1
+    else:
+        range_size = chunk_size * estimate_row_size(filepath, header_size)
+    ranges = csv_byte_ranges(filepath, header_size, range_size)
+
+    if len(ranges) < 2 or splits_quoted_field(filepath, ranges):
+        if chunk_size is None:
+            yield pd.read_csv(filepath, **options)
+        else:
+            with pd.read_csv(filepath, chunksize=chunk_size, **options) as r:
+                yield from r
+        return
+
+    parts = read_csv_ranges(filepath, ranges, workers, **options)
+    if chunk_size is not None:
+        yield from parts
+        return
+
+    # A column which is inferred to be of a different type in different
+    # ranges would have been inferred as a single type had the file been
+    # parsed in one go. Numeric columns are the exception, as concatenating
+    # integers with floats gives the same floats.
+    parts = list(parts)
+    if not have_compatible_dtypes(parts):
+        del parts
+        yield pd.read_csv(filepath, **options)
+        return
+    yield concat_parts(parts)
+
+
+def have_compatible_dtypes(dataframes: _t.List[pd.DataFrame]) -> bool:
+    """Check whether each column has the same type in every dataframe, or is
+    numeric in every dataframe, or is categorical in every dataframe.
+
+    Args:
+        dataframes: The dataframes to check.
+
+    Returns:
+        True if the types of the columns are compatible.
+    """
+    for column in dataframes[0].columns:
+        dtypes = {dataframe[column].dtype for dataframe in dataframes}
+        if len(dtypes) > 1 and not (
+            all(isinstance(dtype, pd.CategoricalDtype) for dtype in dtypes)
+            or all(
+                pd.api.types.is_numeric_dtype(dtype)
+                and not pd.api.types.is_bool_dtype(dtype)
+                for dtype in dtypes
+            )
+        ):
+            return False
+    return True
+
+
+def concat_parts(dataframes: _t.List[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate the parts of a file which were parsed separately. Each
+    part of a categorical column has only the categories found in that part,
+    so the categories are combined first to keep the column categorical.
+
+    Args:
+        dataframes: The parts of the file, in order.
+
+    Returns:
+        The whole file.
+    """
+    for column in dataframes[0].columns:
+        if not isinstance(dataframes[0][column].dtype, pd.CategoricalDtype):
+            continue
+        categories = dataframes[0][column].cat.categories
+        for dataframe in dataframes[1:]:
+            categories = categories.union(dataframe[column].cat.categories)
+        for dataframe in dataframes:
+            dataframe[column] = dataframe[column].cat.set_categories(
+                categories
+            )
+    return pd.concat(dataframes, ignore_index=True)
+
+
+def skip_rows(
+    chunks: _t.Iterable[pd.DataFrame], rows: int
+) -> _t.Iterator[pd.DataFrame]:
+    """Skip the first rows of data which is read in chunks, such as the rows
+    which were loaded before a load was interrupted. Every row is still read,
+    but rows which are skipped are not kept.
+
+    Args:
+        chunks: The chunks of data, in order.
+        rows: The number of rows to skip.
+
+    Yields:
+        The remaining chunks.
+    """
+    for chunk in chunks:
+        if rows >= len(chunk):
+            rows -= len(chunk)
+            continue
+        if rows:
+            chunk = chunk.iloc[rows:].copy()
+            rows = 0
+        yield chunk
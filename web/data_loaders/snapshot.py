@@ -0,0 +1,447 @@
+"""This module contains a loader for feeds which are delivered as complete
+snapshots, such as campaigns and ad groups, which replaces the whole table
+rather than upserting each row. Upserting a snapshot rewrites every row
+which has changed and leaves dead rows behind, and rows which are missing
+from the snapshot are never removed.
+
+The chunks are staged in an `UNLOGGED` table in the same way as a bulk load
+(see `bulk`). Once all of the data has been staged, a shadow table with the
+same columns is filled with the last row staged for each key, after which
+the table's indexes, constraints and foreign keys are built on the shadow
+table and it is analysed. None of this blocks the readers or writers of the
+table.
+
+The shadow table is then swapped in within a single transaction. The table
+and the tables which refer to it are first locked against writers, but not
+readers, while the snapshot is checked against them and compared with the
+table. Only then are they locked against readers as well, for as long as it
+takes to drop the old table, rename the shadow table in its place, give its
+indexes and constraints their original names and add back the foreign keys
+of the tables which refer to it. Readers wait for that lock and then read
+the new table, so they never see part of the snapshot. The foreign keys are
+added back without checking every row and are checked once the lock has
+been released, so no lock which blocks readers is held for a scan of the
+tables which refer to it.
+
+The swap never breaks a foreign key. Where a row of a table which refers to
+the table, such as a search term of an ad group, refers to a key which is
+missing from the snapshot, the swap is refused and the table is left as it
+was. Any change made to the table between building the shadow table and the
+swap is replaced by the snapshot. Privileges granted on the table are not
+copied to the shadow table.
+"""
+
+import time
+import typing as _t
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Model
+from data_cleaners.key_cache import valid_keys
+from . import manifest
+from .base import LoadResult
+from .bulk import MAINTENANCE_WORK_MEM, POSITION_COLUMN, BulkLoad
+
+# How long to wait for the locks needed to swap the shadow table in before
+# giving up, so that a long-running query on the table does not leave every
+# other query waiting behind the swap.
+SWAP_LOCK_TIMEOUT = "10s"
+
+
+class TableIndex(_t.NamedTuple):
+    """An index, constraint or foreign key of a table, which is rebuilt on
+    the shadow table under a temporary name.
+    """
+
+    name: str
+    # The statement which creates the index, or the definition of the
+    # constraint which the index belongs to.
+    definition: str
+    constraint: bool
+    # Whether this is a foreign key, which has no index of its own.
+    foreign_key: bool
+
+    def temporary_name(self, suffix: str) -> str:
+        """Get the name of the index on the shadow table, which is kept
+        within postgres' limit of 63 bytes. Index names are shared by every
+        table of the schema, so the name ends with the suffix of the load.
+        """
+        return f"{self.name[:44]}_snapshot_{suffix}"
+
+    def create_statement(self, table: str, suffix: str) -> str:
+        """Get the statement which builds the index on the shadow table."""
+        name = self.temporary_name(suffix)
+        if self.constraint:
+            return (
+                f'ALTER TABLE {table} ADD CONSTRAINT "{name}" '
+                f"{self.definition};"
+            )
+        # The definition starts with `CREATE [UNIQUE] INDEX name ON table`,
+        # which is replaced with the shadow table.
+        unique = (
+            "UNIQUE " if self.definition.startswith("CREATE UNIQUE") else ""
+        )
+        method = self.definition.split(" USING ", 1)[1]
+        return f'CREATE {unique}INDEX "{name}" ON {table} USING {method};'
+
+    def rename_statement(self, table: str, suffix: str) -> str:
+        """Get the statement which gives the index its original name once
+        the shadow table has been swapped in.
+        """
+        name = self.temporary_name(suffix)
+        if self.foreign_key:
+            return (
+                f"ALTER TABLE {table} RENAME CONSTRAINT "
+                f'"{name}" TO "{self.name}";'
+            )
+        # Renaming the index of a constraint also renames the constraint.
+        return f'ALTER INDEX "{name}" RENAME TO "{self.name}";'
+
+
+class ForeignKey(_t.NamedTuple):
+    """A foreign key of another table which refers to the table."""
+
+    table: str
+    name: str
+    definition: str
+    columns: _t.List[str]
+    referenced_columns: _t.List[str]
+
+
+def table_indexes(cursor, table: str) -> _t.List[TableIndex]:
+    """Find the indexes, constraints and foreign keys of a table. Check
+    constraints and `NOT NULL` constraints are not included, as they are
+    copied with the table's columns.
+
+    Args:
+        cursor: A database cursor.
+        table: The name of the table.
+
+    Returns:
+        The indexes, followed by the foreign keys.
+    """
+    cursor.execute(
+        """
+        SELECT
+            index_class.relname,
+            coalesce(
+                pg_get_constraintdef(owner.oid),
+                pg_get_indexdef(idx.indexrelid)
+            ),
+            owner.oid IS NOT NULL,
+            false
+        FROM pg_index AS idx
+        JOIN pg_class AS index_class ON index_class.oid = idx.indexrelid
+        LEFT JOIN pg_constraint AS owner
+            ON owner.conindid = idx.indexrelid
+            AND owner.conrelid = idx.indrelid
+            AND owner.contype IN ('p', 'u', 'x')
+        WHERE idx.indrelid = %s::regclass
+        UNION ALL
+        SELECT conname, pg_get_constraintdef(oid), true, true
+        FROM pg_constraint
+        WHERE conrelid = %s::regclass AND contype = 'f'
+        ORDER BY 4, 1;""",
+        [table, table],
+    )
+    return [TableIndex(*row) for row in cursor.fetchall()]
+
+
+def referring_foreign_keys(cursor, table: str) -> _t.List[ForeignKey]:
+    """Find the foreign keys of other tables which refer to a table.
+
+    Args:
+        cursor: A database cursor.
+        table: The name of the table.
+
+    Returns:
+        The foreign keys.
+    """
+    cursor.execute(
+        """
+        SELECT
+            conrelid::regclass::text,
+            conname,
+            pg_get_constraintdef(oid),
+            ARRAY(
+                SELECT attname
+                FROM unnest(conkey) WITH ORDINALITY AS k(num, i)
+                JOIN pg_attribute
+                    ON attrelid = conrelid AND attnum = k.num
+                ORDER BY k.i
+            ),
+            ARRAY(
+                SELECT attname
+                FROM unnest(confkey) WITH ORDINALITY AS k(num, i)
+                JOIN pg_attribute
+                    ON attrelid = confrelid AND attnum = k.num
+                ORDER BY k.i
+            )
+        FROM pg_constraint
+        WHERE confrelid = %s::regclass
+            AND conrelid <> confrelid
+            AND contype = 'f'
+        ORDER BY 1, 2;""",
+        [table],
+    )
+    return [ForeignKey(*row) for row in cursor.fetchall()]
+
+
+class SnapshotSwap(BulkLoad):
+    """Stages chunks of cleaned data which together make up a complete
+    snapshot of a model's table, then replaces the table with the snapshot.
+    See the module's docstring.
+
+    Chunks are added with `stage` and the table is replaced by `finish`.
+    The staging and shadow tables are dropped by `finish`, or by `discard`
+    where the load is abandoned.
+    """
+
+    def __init__(self, model: Model):
+        """Initialize the snapshot load.
+
+        Args:
+            model: The django model whose table is replaced.
+        """
+        super().__init__(model)
+        self.shadow_table = f"{self.db_table}_snapshot_{self.suffix}"
+        self.table_indexes: _t.List[TableIndex] = []
+        self.result = LoadResult()
+        # The number of rows of the table which were not in the snapshot.
+        self.removed = 0
+
+    def build_shadow(self) -> None:
+        """Fill the shadow table with the last row staged for each key,
+        then build the table's indexes, constraints and foreign keys on it
+        and analyse it.
+        """
+        columns = ", ".join(self.layout.columns)
+        keys = ", ".join(self.layout.conflict_columns)
+        with transaction.atomic(), connection.cursor() as cursor:
+            started = time.perf_counter()
+            # The indexes are built once the rows have been inserted.
+            cursor.execute(
+                f"""
+                CREATE TABLE {self.shadow_table} (
+                    LIKE {self.db_table}
+                    INCLUDING DEFAULTS INCLUDING CONSTRAINTS
+                    INCLUDING IDENTITY INCLUDING GENERATED INCLUDING STORAGE
+                );"""
+            )
+            cursor.execute(
+                f"""
+                INSERT INTO {self.shadow_table} ({columns})
+                SELECT DISTINCT ON ({keys}) {columns}
+                FROM {self.staging_table}
+                ORDER BY {keys}, {POSITION_COLUMN} DESC;"""
+            )
+            self.timings["merge"] = time.perf_counter() - started
+
+            started = time.perf_counter()
+            cursor.execute(
+                f"SET LOCAL maintenance_work_mem = '{MAINTENANCE_WORK_MEM}';"
+            )
+            self.table_indexes = table_indexes(cursor, self.db_table)
+            for index in self.table_indexes:
+                cursor.execute(
+                    index.create_statement(self.shadow_table, self.suffix)
+                )
+            self.timings["index"] = time.perf_counter() - started
+
+            started = time.perf_counter()
+            cursor.execute(f"ANALYZE {self.shadow_table};")
+            self.timings["analyze"] = time.perf_counter() - started
+            cursor.execute(f"DROP TABLE {self.staging_table};")
+
+    def compare(self, cursor) -> LoadResult:
+        """Compare the shadow table with the table, counting the rows of the
+        snapshot which are new, which have changed and which are the same,
+        and the rows of the table which are not in the snapshot.
+
+        Args:
+            cursor: A database cursor.
+
+        Returns:
+            The number of rows of the snapshot which are new, changed and
+            unchanged.
+        """
+        joined = " AND ".join(
+            f"old.{key} = new.{key}" for key in self.layout.conflict_columns
+        )
+        key = self.layout.conflict_columns[0]
+        update_columns = self.layout.update_columns
+        changed = (
+            f"({', '.join(f'old.{column}' for column in update_columns)}) "
+            "IS DISTINCT FROM "
+            f"({', '.join(f'new.{column}' for column in update_columns)})"
+            if update_columns
+            else "false"
+        )
+        cursor.execute(
+            f"""
+            SELECT
+                count(*) FILTER (WHERE old.{key} IS NULL),
+                count(*) FILTER (
+                    WHERE old.{key} IS NOT NULL
+                    AND new.{key} IS NOT NULL
+                    AND {changed}
+                ),
+                count(*) FILTER (WHERE new.{key} IS NOT NULL),
+                count(*) FILTER (WHERE new.{key} IS NULL)
+            FROM {self.db_table} AS old
+            FULL JOIN {self.shadow_table} AS new ON {joined};"""
+        )
+        inserted, updated, rows, self.removed = cursor.fetchone()
+        return LoadResult.from_counts(rows, inserted, updated)
+
+    @staticmethod
+    def dangling_rows_query(
+        foreign_key: ForeignKey, table: str, shadow_table: str
+    ) -> str:
+        """Build a query which counts the rows of a table which refers to
+        the table whose keys are missing from the shadow table.
+
+        Args:
+            foreign_key: The foreign key of the table which refers to it.
+            table: The name of the table.
+            shadow_table: The name of the shadow table.
+
+        Returns:
+            The query.
+        """
+        columns = ", ".join(
+            f"referring.{column}" for column in foreign_key.columns
+        )
+        referenced = ", ".join(foreign_key.referenced_columns)
+        return f"""
+            SELECT count(*) FROM {foreign_key.table} AS referring
+            WHERE ({columns}) IN (
+                SELECT {referenced} FROM {table}
+                EXCEPT
+                SELECT {referenced} FROM {shadow_table}
+            );"""
+
+    def swap(self) -> _t.List[ForeignKey]:
+        """Swap the shadow table in for the table. See the module's
+        docstring. The time spent checking the snapshot and the time the
+        table was locked against readers are kept in `timings` as `check`
+        and `swap`.
+
+        Returns:
+            The foreign keys which refer to the table, which must be
+            checked once the swap has been committed.
+        """
+        with transaction.atomic(), connection.cursor() as cursor:
+            started = time.perf_counter()
+            cursor.execute(f"SET LOCAL lock_timeout = '{SWAP_LOCK_TIMEOUT}';")
+            cursor.execute(
+                "SELECT column_name, pg_get_serial_sequence(%s, column_name) "
+                "FROM information_schema.columns "
+                "WHERE table_name = %s AND table_schema = current_schema();",
+                [self.db_table, self.db_table],
+            )
+            sequences = [row for row in cursor.fetchall() if row[1]]
+            foreign_keys = referring_foreign_keys(cursor, self.db_table)
+            tables = ", ".join(
+                [self.db_table]
+                + sorted({foreign_key.table for foreign_key in foreign_keys})
+            )
+            # Writers are blocked while the snapshot is checked, so that the
+            # check still holds when the table is swapped, but readers are
+            # not.
+            cursor.execute(f"LOCK TABLE {tables} IN SHARE ROW EXCLUSIVE MODE;")
+            for foreign_key in foreign_keys:
+                cursor.execute(
+                    self.dangling_rows_query(
+                        foreign_key, self.db_table, self.shadow_table
+                    )
+                )
+                (dangling,) = cursor.fetchone()
+                if dangling:
+                    raise IntegrityError(
+                        f"The snapshot of {self.db_table} is missing keys "
+                        f"which {dangling} row(s) of {foreign_key.table} "
+                        f"refer to through {foreign_key.name}. The table has "
+                        "not been replaced."
+                    )
+            result = self.compare(cursor)
+            self.timings["check"] = time.perf_counter() - started
+
+            locked = time.perf_counter()
+            cursor.execute(f"LOCK TABLE {tables} IN ACCESS EXCLUSIVE MODE;")
+            for foreign_key in foreign_keys:
+                cursor.execute(
+                    f"ALTER TABLE {foreign_key.table} "
+                    f'DROP CONSTRAINT "{foreign_key.name}";'
+                )
+            # The sequences which generate the table's ids would be dropped
+            # with the table, so they are moved to the shadow table.
+            for column, sequence in sequences:
+                cursor.execute(
+                    f"ALTER SEQUENCE {sequence} "
+                    f"OWNED BY {self.shadow_table}.{column};"
+                )
+            cursor.execute(f"DROP TABLE {self.db_table};")
+            cursor.execute(
+                f"ALTER TABLE {self.shadow_table} RENAME TO {self.db_table};"
+            )
+            for index in self.table_indexes:
+                cursor.execute(
+                    index.rename_statement(self.db_table, self.suffix)
+                )
+            # The foreign keys are checked once the locks are released.
+            for foreign_key in foreign_keys:
+                cursor.execute(
+                    f"ALTER TABLE {foreign_key.table} "
+                    f'ADD CONSTRAINT "{foreign_key.name}" '
+                    f"{foreign_key.definition} NOT VALID;"
+                )
+        self.timings["swap"] = time.perf_counter() - locked
+        self.result = result
+        return foreign_keys
+
+    def finish(self) -> LoadResult:
+        """Replace the table with the staged snapshot. Where the snapshot
+        adds rows, the manifest of the data loaded into the tables which
+        refer to the model is forgotten, as in `base.load_data`.
+
+        Returns:
+            The number of rows of the snapshot which are new, changed and
+            unchanged. The number of rows which were removed is kept in
+            `removed`.
+
+        Raises:
+            ValueError: Where nothing was staged, as the snapshot would
+                empty the table.
+            IntegrityError: Where rows of the tables which refer to the
+                table refer to keys which are missing from the snapshot.
+        """
+        if self.layout is None:
+            raise ValueError(
+                f"The snapshot of {self.db_table} is empty. The table has "
+                "not been replaced."
+            )
+
+        self.build_shadow()
+        foreign_keys = self.swap()
+        valid_keys.invalidate(self.model)
+        self.layout = None
+
+        started = time.perf_counter()
+        with connection.cursor() as cursor:
+            for foreign_key in foreign_keys:
+                cursor.execute(
+                    f"ALTER TABLE {foreign_key.table} "
+                    f'VALIDATE CONSTRAINT "{foreign_key.name}";'
+                )
+        self.timings["validate"] = time.perf_counter() - started
+
+        if self.result.inserted:
+            manifest.forget_dependents(self.model)
+        return self.result
+
+    def discard(self) -> None:
+        """Drop the staging and shadow tables, where the load is
+        abandoned.
+        """
+        super().discard()
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {self.shadow_table};")
@@ -0,0 +1,110 @@
+"""Unittests for the `async_writer` module."""
+
+import pandas as pd
+from django.test import TransactionTestCase
+from campaigns import models as campaign_models
+from .. import async_writer
+from ..base import LoadResult
+
+
+class TestAsyncWriter(TransactionTestCase):
+    """Unittests for the `AsyncCopyMerge` and `AsyncWriter` classes."""
+
+    def setUp(self):
+        campaign_models.Campaign.objects.create(
+            id=1, structure_value="a", status="ENABLED"
+        )
+        campaign_models.AdGroup.objects.create(
+            id=1, campaign_id=1, alias="old", status="old"
+        )
+
+    def ad_groups(self) -> list:
+        """Get the rows of the `AdGroup` table."""
+        return list(
+            campaign_models.AdGroup.objects.order_by("id").values_list(
+                "id", "alias", "status"
+            )
+        )
+
+    def test_async_copy_merge(self):
+        """Test that `AsyncCopyMerge` inserts and updates rows, keeping empty
+        strings distinct from missing values.
+        """
+        dataframe = pd.DataFrame(
+            {
+                "id": [1, 2],
+                "campaign_id": [1, 1],
+                "alias": ["new", ""],
+                "status": ["ENABLED", "DISABLED"],
+            }
+        )
+        strategy = async_writer.AsyncCopyMerge(
+            dataframe, campaign_models.AdGroup
+        )
+        self.assertEqual(strategy.load(), LoadResult(1, 1, 0))
+        self.assertEqual(
+            self.ad_groups(), [(1, "new", "ENABLED"), (2, "", "DISABLED")]
+        )
+
+    def test_writer(self):
+        """Test that chunks written over several streams give the same
+        result as loading them in order, where a later chunk overwrites the
+        rows of an earlier one.
+        """
+        chunks = [
+            pd.DataFrame(
+                {
+                    "id": range(start, start + 50),
+                    "campaign_id": 1,
+                    "alias": f"chunk {start}",
+                    "status": "ENABLED",
+                }
+            )
+            for start in (1, 26, 51)
+        ]
+        with async_writer.AsyncWriter(
+            campaign_models.AdGroup, streams=3
+        ) as writer:
+            futures = [writer.submit(chunk) for chunk in chunks]
+            results = [future.result() for future in futures]
+
+        self.assertEqual(
+            results,
+            [LoadResult(49, 1, 0), LoadResult(25, 25, 0), LoadResult(25, 25)],
+        )
+        self.assertEqual(writer.result, LoadResult(99, 51, 0))
+        self.assertEqual(
+            [alias for _, alias, _ in self.ad_groups()],
+            ["chunk 1"] * 25 + ["chunk 26"] * 25 + ["chunk 51"] * 50,
+        )
+
+    def test_split(self):
+        """Test that the rows with the same key always go to the same
+        stream.
+        """
+        writer = async_writer.AsyncWriter(campaign_models.AdGroup, streams=4)
+        dataframe = pd.DataFrame(
+            {"id": list(range(100)) * 2, "alias": "a", "status": "ENABLED"}
+        )
+        streams = {}
+        for stream, strategy in writer.split(dataframe):
+            for key in strategy.dataframe["id"]:
+                self.assertEqual(streams.setdefault(key, stream), stream)
+        self.assertEqual(len(streams), 100)
+        self.assertGreater(len(set(streams.values())), 1)
+
+    def test_error(self):
+        """Test that an error in one stream fails the chunk and stops any
+        more chunks being submitted.
+        """
+        dataframe = pd.DataFrame(
+            {"id": [2], "campaign_id": [99], "alias": "a", "status": "a"}
+        )
+        writer = async_writer.AsyncWriter(campaign_models.AdGroup, streams=2)
+        with writer:
+            future = writer.submit(dataframe)
+            with self.assertRaises(Exception):
+                future.result()
+            with self.assertRaises(Exception):
+                writer.submit(dataframe)
+        self.assertEqual(campaign_models.AdGroup.objects.count(), 1)
@@ -0,0 +1,76 @@
+"""Unittests for the `base` module."""
+
+from types import SimpleNamespace
+import pandas as pd
+from django.test import SimpleTestCase
+from campaigns import models as campaign_models
+from search import models as search_models
+from .. import base
+
+
+class CountStrategy(base.LoadingStrategy):
+    """A strategy that does not load anything, but counts the rows."""
+
+    def load(self) -> int:
+        """Returns the number of rows."""
+        return len(self.dataframe)
+
+
+class TestLoadingStrategy(SimpleTestCase):
+    """Unittests for the `LoadingStrategy` class."""
+
+    def test_primary_key(self):
+        """Test that the primary key identifies existing rows where it is
+        being loaded.
+        """
+        strategy = CountStrategy(
+            pd.DataFrame(
+                {"status": ["a"], "id": [1], "other": [1], "campaign_id": [1]}
+            ),
+            campaign_models.AdGroup,
+        )
+        self.assertEqual(strategy.columns, ["id", "campaign_id", "status"])
+        self.assertEqual(strategy.conflict_columns, ["id"])
+        self.assertEqual(strategy.update_columns, ["campaign_id", "status"])
+
+    def test_unique_together(self):
+        """Test that the unique fields identify existing rows where the
+        primary key is not being loaded.
+        """
+        strategy = CountStrategy(
+            pd.DataFrame(
+                columns=[
+                    "date",
+                    "ad_group_id",
+                    "search_term",
+                    "clicks",
+                    "roas",
+                ]
+            ),
+            search_models.SearchTerm,
+        )
+        self.assertEqual(
+            strategy.conflict_columns, ["date", "ad_group_id", "search_term"]
+        )
+        self.assertEqual(strategy.update_columns, ["clicks", "roas"])
+
+    def test_validate_model_fail(self):
+        """Test that the `validate_model` method raises an error when the
+        data does not identify existing rows.
+        """
+        strategy = CountStrategy(
+            pd.DataFrame(columns=["date", "clicks"]), search_models.SearchTerm
+        )
+        with self.assertRaises(NotImplementedError):
+            strategy.validate_model()
+
+
+class TestLoadData(SimpleTestCase):
+    """Unittests for the `load_data` function."""
+
+    def test_empty_dataframe(self):
+        """Test that no strategy is run where there is no data to load."""
+        self.assertEqual(
+            base.load_data(pd.DataFrame(), SimpleNamespace(), None),
+            base.LoadResult(),
+        )
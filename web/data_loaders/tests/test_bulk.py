@@ -0,0 +1,141 @@
+"""Unittests for the `bulk` module."""
+
+import pandas as pd
+from django.db import IntegrityError, connection
+from django.test import TransactionTestCase
+from campaigns import models as campaign_models
+from data_cleaners.key_cache import valid_keys
+from .. import bulk
+from ..base import LoadResult
+
+
+class TestBulkLoad(TransactionTestCase):
+    """Unittests for the `BulkLoad` class."""
+
+    model = campaign_models.AdGroup
+
+    def setUp(self):
+        campaign_models.Campaign.objects.create(
+            id=1, structure_value="a", status="ENABLED"
+        )
+
+    def indexes(self) -> list:
+        """Get the secondary indexes of the `AdGroup` table."""
+        with connection.cursor() as cursor:
+            return bulk.secondary_indexes(
+                cursor, self.model._meta.db_table, keep_unique=False
+            )
+
+    @staticmethod
+    def staging_table_exists(loader: bulk.BulkLoad) -> bool:
+        """Check whether the staging table of a load exists."""
+        with connection.cursor() as cursor:
+            return loader.staging_table in (
+                connection.introspection.table_names(cursor)
+            )
+
+    @staticmethod
+    def chunk(ids: list, alias: str) -> pd.DataFrame:
+        """Build a chunk of ad groups."""
+        return pd.DataFrame(
+            {"id": ids, "campaign_id": 1, "alias": alias, "status": "ENABLED"}
+        )
+
+    def test_initial_load(self):
+        """Test that the last row staged for each key is inserted into an
+        empty table, and that the indexes which were dropped are rebuilt.
+        """
+        indexes = self.indexes()
+        self.assertTrue(indexes)
+
+        loader = bulk.BulkLoad(self.model)
+        self.assertEqual(loader.stage(self.chunk([1, 2], "first")), 2)
+        self.assertEqual(loader.stage(self.chunk([2, 3], "second")), 2)
+        self.assertEqual(loader.finish(), LoadResult(3, 0, 0))
+
+        self.assertEqual(
+            list(self.model.objects.order_by("id").values_list("id", "alias")),
+            [(1, "first"), (2, "second"), (3, "second")],
+        )
+        self.assertEqual(loader.indexes, indexes)
+        self.assertEqual(self.indexes(), indexes)
+        self.assertEqual(set(loader.timings), {"merge", "index", "analyze"})
+        self.assertFalse(self.staging_table_exists(loader))
+
+    def test_existing_rows(self):
+        """Test that rows which already exist are updated where they have
+        changed and left unchanged otherwise.
+        """
+        self.model.objects.create(
+            id=1, campaign_id=1, alias="first", status="ENABLED"
+        )
+        self.model.objects.create(
+            id=2, campaign_id=1, alias="old", status="ENABLED"
+        )
+
+        loader = bulk.BulkLoad(self.model)
+        loader.stage(self.chunk([1, 2, 3], "first"))
+        loader.stage(self.chunk([2], "new"))
+        self.assertEqual(loader.finish(), LoadResult(1, 1, 1))
+        self.assertEqual(
+            list(self.model.objects.order_by("id").values_list("id", "alias")),
+            [(1, "first"), (2, "new"), (3, "first")],
+        )
+
+    def test_failed_merge(self):
+        """Test that where the merge fails, the table and its indexes are
+        left as they were and the staging table can be discarded.
+        """
+        indexes = self.indexes()
+        loader = bulk.BulkLoad(self.model)
+        loader.stage(
+            pd.DataFrame(
+                {"id": [1], "campaign_id": [99], "alias": "a", "status": "a"}
+            )
+        )
+        with self.assertRaises(IntegrityError):
+            loader.finish()
+        self.assertEqual(self.indexes(), indexes)
+        self.assertEqual(self.model.objects.count(), 0)
+
+        self.assertTrue(self.staging_table_exists(loader))
+        loader.discard()
+        self.assertFalse(self.staging_table_exists(loader))
+
+    def test_concurrent_loads(self):
+        """Test that loads of the same model which overlap each stage their
+        data in their own table, so that neither replaces the other's.
+        """
+        first = bulk.BulkLoad(self.model)
+        second = bulk.BulkLoad(self.model)
+        self.assertNotEqual(first.staging_table, second.staging_table)
+
+        first.stage(self.chunk([1, 2], "first"))
+        second.stage(self.chunk([3], "second"))
+        self.assertEqual(first.finish(), LoadResult(2, 0, 0))
+        self.assertTrue(self.staging_table_exists(second))
+        self.assertEqual(second.finish(), LoadResult(1, 0, 0))
+        self.assertEqual(
+            list(self.model.objects.order_by("id").values_list("id", "alias")),
+            [(1, "first"), (2, "first"), (3, "second")],
+        )
+
+    def test_keys_cached(self):
+        """Test that where the model's keys are cached, the keys which were
+        loaded are added to them rather than forgotten.
+        """
+        self.addCleanup(valid_keys.clear)
+        valid_keys.merge(self.model, "id", [99])
+        loader = bulk.BulkLoad(self.model)
+        loader.stage(self.chunk([1, 2], "a"))
+        loader.finish()
+        self.assertEqual(
+            valid_keys.keys[(self.model, "id")].tolist(), [1, 2, 99]
+        )
+
+    def test_nothing_staged(self):
+        """Test that finishing a load with no data does nothing."""
+        loader = bulk.BulkLoad(self.model)
+        self.assertEqual(loader.stage(self.chunk([], "a")), 0)
+        self.assertEqual(loader.finish(), LoadResult())
+        self.assertEqual(loader.timings, {})
@@ -0,0 +1,126 @@
+"""Unittests for the `dtypes` module."""
+
+import pandas as pd
+from django.test import SimpleTestCase
+from campaigns import models as campaign_models
+from search import models as search_models
+from .. import dtypes
+
+
+class TestModelDtypes(SimpleTestCase):
+    """Unittests for the `model_dtypes` function."""
+
+    def test_search_term(self):
+        """Test that the dtypes for the `SearchTerm` model are compact."""
+        self.assertEqual(
+            dtypes.model_dtypes(search_models.SearchTerm),
+            {
+                "id": "Int64",
+                "date": "category",
+                "ad_group_id": "Int64",
+                "clicks": "Int32",
+                "cost": "float64",
+                "conversion_value": "float64",
+                "conversions": "Int32",
+                "search_term": "string[pyarrow]",
+                "roas": "float64",
+            },
+        )
+
+    def test_column_map(self):
+        """Test that columns which are renamed when they are cleaned are
+        given the dtype of the column they are renamed to.
+        """
+        self.assertEqual(
+            dtypes.model_dtypes(
+                campaign_models.Campaign, {"campaign_id": "id"}
+            ),
+            {
+                "structure_value": "category",
+                "status": "category",
+                "campaign_id": "Int64",
+            },
+        )
+
+
+class TestConvertDtypes(SimpleTestCase):
+    """Unittests for the `read_dtypes` and `convert_dtypes` functions."""
+
+    def test_read_dtypes(self):
+        """Test that only the dtypes which any value fits are read as."""
+        self.assertEqual(
+            dtypes.read_dtypes(
+                {"a": "Int32", "b": "category", "c": "string[pyarrow]"}
+            ),
+            {"b": "category", "c": "string[pyarrow]"},
+        )
+
+    def test_convert_dtypes(self):
+        """Test that columns are converted where their values fit and left
+        as they are otherwise.
+        """
+        dataframe = pd.DataFrame(
+            {
+                "fits": [1.0, None],
+                "fraction": [1.0, 1.5],
+                "too_big": [1, 3000000000],
+                "text": ["1", "abc"],
+            }
+        )
+        dtypes.convert_dtypes(
+            dataframe,
+            {
+                "fits": "Int32",
+                "fraction": "Int32",
+                "too_big": "Int32",
+                "text": "Int32",
+                "missing": "Int32",
+            },
+        )
+        self.assertEqual(
+            dataframe.dtypes.astype(str).to_dict(),
+            {
+                "fits": "Int32",
+                "fraction": "float64",
+                "too_big": "int64",
+                "text": "object",
+            },
+        )
+
+
+class TestInferredMemoryUsage(SimpleTestCase):
+    """Unittests for the `inferred_memory_usage` function."""
+
+    def test_matches_inferred_types(self):
+        """Test that the estimate is close to the memory used when the types
+        are inferred.
+        """
+        inferred = pd.DataFrame(
+            {
+                "id": range(1000),
+                "status": ["ENABLED", "DISABLED"] * 500,
+                "term": [f"search term {i}" for i in range(1000)],
+            }
+        )
+        compact = inferred.astype(
+            {"id": "Int32", "status": "category", "term": "string[pyarrow]"}
+        )
+
+        expected_results = inferred.memory_usage(deep=True).sum()
+        results = dtypes.inferred_memory_usage(compact)
+        self.assertAlmostEqual(
+            results / expected_results, 1, delta=0.05, msg=results
+        )
+        self.assertLess(
+            compact.memory_usage(deep=True).sum(), expected_results
+        )
+
+
+class TestFormatBytes(SimpleTestCase):
+    """Unittests for the `format_bytes` function."""
+
+    def test_format_bytes(self):
+        """Test that sizes are formatted with the largest suitable unit."""
+        self.assertEqual(dtypes.format_bytes(512), "512.0 B")
+        self.assertEqual(dtypes.format_bytes(1536), "1.5 KB")
+        self.assertEqual(dtypes.format_bytes(3 * 1024 ** 4), "3072.0 GB")
@@ -0,0 +1,49 @@
+"""Unittests for the `engine` module."""
+
+import pandas as pd
+from django.test import TransactionTestCase
+from campaigns import models as campaign_models
+from .. import engine
+from ..base import LoadResult
+
+
+class TestLoadModelDataframe(TransactionTestCase):
+    """Unittests for the `load_model_dataframe` function."""
+
+    @staticmethod
+    def campaigns() -> pd.DataFrame:
+        """Build raw campaigns, with a duplicate."""
+        return pd.DataFrame(
+            {
+                "campaign_id": [1, 2, 2],
+                "structure_value": ["a", "b", "c"],
+                "status": "ENABLED",
+            }
+        )
+
+    def test_cleans_with_model_strategies(self):
+        """Test that the data is cleaned with the model's strategies before
+        it is loaded.
+        """
+        result = engine.load_model_dataframe(
+            campaign_models.Campaign, self.campaigns(), method="copy"
+        )
+        self.assertEqual(result, LoadResult(2, 0, 0))
+        self.assertEqual(
+            list(
+                campaign_models.Campaign.objects.order_by("id").values_list(
+                    "id", "structure_value"
+                )
+            ),
+            [(1, "a"), (2, "c")],
+        )
+
+    def test_mixin(self):
+        """Test that models with the mixin load through the function."""
+        self.assertTrue(
+            issubclass(campaign_models.AdGroup, engine.DataFrameLoaderMixin)
+        )
+        result = campaign_models.Campaign.load_from_dataframe(
+            self.campaigns(), batch_size=1
+        )
+        self.assertEqual(result.inserted, 2)
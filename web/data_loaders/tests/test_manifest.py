@@ -0,0 +1,128 @@
+"""Unittests for the `manifest` module."""
+
+import os
+import tempfile
+import pandas as pd
+from django.test import SimpleTestCase, TestCase
+from campaigns.models import AdGroup, Campaign
+from search.models import SearchTerm
+from .. import manifest
+from ..models import LoadedFile, LoadedPartition
+
+
+class TestChecksums(SimpleTestCase):
+    """Unittests for the checksums of files and partitions."""
+
+    def setUp(self):
+        self.dataframe = pd.DataFrame(
+            {
+                "date": ["2022-01-01", "2022-01-02", "2022-01-01"],
+                "clicks": [1, 2, 3],
+            }
+        )
+
+    def test_file_checksum(self):
+        """Test that the checksum of a file depends on its content."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filepaths = [os.path.join(tmp_dir, name) for name in "abc"]
+            for filepath, content in zip(filepaths, (b"1", b"1", b"2")):
+                with open(filepath, "wb") as _file:
+                    _file.write(content)
+            checksums = [manifest.file_checksum(path) for path in filepaths]
+        self.assertEqual(checksums[0], checksums[1])
+        self.assertNotEqual(checksums[0], checksums[2])
+
+    def test_partition_checksums(self):
+        """Test that the checksums of the partitions do not depend on how the
+        data is split into chunks, but do depend on the values and order of
+        the rows.
+        """
+        checksums = manifest.partition_checksums([self.dataframe], "date")
+        self.assertEqual(set(checksums), {"2022-01-01", "2022-01-02"})
+        self.assertEqual(
+            manifest.partition_checksums(
+                [self.dataframe.iloc[:1], self.dataframe.iloc[1:]], "date"
+            ),
+            checksums,
+        )
+
+        reordered = manifest.partition_checksums(
+            [self.dataframe.iloc[::-1]], "date"
+        )
+        self.assertNotEqual(reordered["2022-01-01"], checksums["2022-01-01"])
+        self.assertEqual(reordered["2022-01-02"], checksums["2022-01-02"])
+
+
+class TestManifest(TestCase):
+    """Unittests for recording the data which has been loaded."""
+
+    def test_file_loaded(self):
+        """Test that a file is only loaded for the model it was recorded
+        for.
+        """
+        manifest.record_file(Campaign, "campaigns.csv", "abc", 10)
+        self.assertTrue(manifest.is_file_loaded(Campaign, "abc"))
+        self.assertFalse(manifest.is_file_loaded(Campaign, "def"))
+        self.assertFalse(manifest.is_file_loaded(AdGroup, "abc"))
+
+    def test_changed_partitions(self):
+        """Test that partitions which have not been loaded, or have been
+        loaded with different content, have changed.
+        """
+        manifest.record_partitions(
+            SearchTerm,
+            "search_terms.csv",
+            "date",
+            {"2022-01-01": "a", "2022-01-02": "b"},
+        )
+        self.assertEqual(
+            manifest.changed_partitions(
+                SearchTerm,
+                "search_terms.csv",
+                "date",
+                {"2022-01-01": "a", "2022-01-02": "c", "2022-01-03": "d"},
+            ),
+            {"2022-01-02": "c", "2022-01-03": "d"},
+        )
+
+    def test_partitions_of_each_file(self):
+        """Test that where a value is spread across several files, the
+        partition of each file is recorded separately.
+        """
+        manifest.record_partitions(
+            SearchTerm, "first.csv", "date", {"2022-01-01": "a"}
+        )
+        manifest.record_partitions(
+            SearchTerm, "second.csv", "date", {"2022-01-01": "b"}
+        )
+        for filepath, checksum in (("first.csv", "a"), ("second.csv", "b")):
+            self.assertEqual(
+                manifest.changed_partitions(
+                    SearchTerm, filepath, "date", {"2022-01-01": checksum}
+                ),
+                {},
+            )
+        self.assertEqual(
+            manifest.changed_partitions(
+                SearchTerm, "second.csv", "date", {"2022-01-01": "a"}
+            ),
+            {"2022-01-01": "a"},
+        )
+
+    def test_forget_dependents(self):
+        """Test that the data loaded into the tables which refer to a model
+        is forgotten, whilst other data is kept.
+        """
+        manifest.record_file(SearchTerm, "search_terms.csv", "abc", 10)
+        manifest.record_partitions(
+            SearchTerm, "search_terms.csv", "date", {"2022-01-01": "a"}
+        )
+        manifest.record_file(Campaign, "campaigns.csv", "abc", 10)
+
+        manifest.forget_dependents(AdGroup)
+
+        self.assertEqual(
+            list(LoadedFile.objects.values_list("model", flat=True)),
+            ["campaigns.Campaign"],
+        )
+        self.assertFalse(LoadedPartition.objects.exists())
@@ -0,0 +1,148 @@
+"""Unittests for the `methods` module."""
+
+from unittest import mock
+import pandas as pd
+from django.db import connection
+from django.test import SimpleTestCase, TransactionTestCase
+from campaigns import models as campaign_models
+from .. import methods
+from ..base import LoadResult
+from ..models import QuarantinedRow
+
+
+class TestLoadingMethods(TransactionTestCase):
+    """Unittests for the `InsertValues` and `CopyMerge` classes."""
+
+    def setUp(self):
+        campaign_models.Campaign.objects.create(
+            id=1, structure_value="a", status="ENABLED"
+        )
+        campaign_models.AdGroup.objects.create(
+            id=1, campaign_id=1, alias="old", status="old"
+        )
+        self.dataframe = pd.DataFrame(
+            {
+                "id": [1, 2],
+                "campaign_id": [1, 1],
+                "alias": ["new", ""],
+                "status": ["ENABLED", "DISABLED"],
+            }
+        )
+
+    def assert_loaded(self):
+        """Check that the dataframe was loaded into the `AdGroup` table."""
+        self.assertEqual(
+            list(
+                campaign_models.AdGroup.objects.order_by("id").values_list(
+                    "id", "campaign_id", "alias", "status"
+                )
+            ),
+            [(1, 1, "new", "ENABLED"), (2, 1, "", "DISABLED")],
+        )
+
+    def test_insert_values(self):
+        """Test that `InsertValues` inserts and updates rows."""
+        strategy = methods.InsertValues(
+            self.dataframe, campaign_models.AdGroup, batch_size=1
+        )
+        self.assertEqual(strategy.load(), LoadResult(1, 1, 0))
+        self.assert_loaded()
+
+    def test_copy_merge(self):
+        """Test that `CopyMerge` inserts and updates rows, keeping empty
+        strings distinct from missing values.
+        """
+        strategy = methods.CopyMerge(self.dataframe, campaign_models.AdGroup)
+        self.assertEqual(strategy.load(), LoadResult(1, 1, 0))
+        self.assert_loaded()
+
+    def test_unchanged_rows_not_updated(self):
+        """Test that rows which have not changed are counted as unchanged
+        and are not rewritten, whilst rows which have changed are updated.
+        """
+        for strategy in (methods.InsertValues, methods.CopyMerge):
+            with self.subTest(strategy=strategy.__name__):
+                strategy(self.dataframe, campaign_models.AdGroup).load()
+                versions = self.row_versions()
+
+                dataframe = self.dataframe.assign(status=["ENABLED", "NEW"])
+                self.assertEqual(
+                    strategy(dataframe, campaign_models.AdGroup).load(),
+                    LoadResult(0, 1, 1),
+                )
+                new_versions = self.row_versions()
+                self.assertEqual(new_versions[1], versions[1])
+                self.assertNotEqual(new_versions[2], versions[2])
+
+    def test_quarantine(self):
+        """Test that rows which the database rejects are quarantined whilst
+        every other row is loaded.
+        """
+        dataframe = self.dataframe.assign(alias=["new", "a" * 256])
+        for strategy in (methods.InsertValues, methods.CopyMerge):
+            with self.subTest(strategy=strategy.__name__):
+                QuarantinedRow.objects.all().delete()
+                campaign_models.AdGroup.objects.filter(id=1).update(
+                    alias="old"
+                )
+                self.assertEqual(
+                    strategy(
+                        dataframe, campaign_models.AdGroup, quarantine=True
+                    ).load(),
+                    LoadResult(0, 1, 0, 1),
+                )
+                self.assertEqual(
+                    campaign_models.AdGroup.objects.get(id=1).alias, "new"
+                )
+                self.assertFalse(
+                    campaign_models.AdGroup.objects.filter(id=2).exists()
+                )
+                quarantined = QuarantinedRow.objects.get()
+                self.assertEqual(quarantined.model, "campaigns.AdGroup")
+                self.assertEqual(quarantined.data["id"], 2)
+                self.assertIn("too long", quarantined.error)
+
+    def row_versions(self):
+        """Get the transaction which last wrote each row of the `AdGroup`
+        table, by id.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT id, xmin::text FROM campaigns_adgroup ORDER BY id"
+            )
+            return dict(cursor.fetchall())
+
+
+class TestAutoSelect(SimpleTestCase):
+    """Unittests for the `AutoSelect` class."""
+
+    def test_selects_strategy_by_size(self):
+        """Test that `CopyMerge` is used only where the data does not fit in
+        a single batch.
+        """
+        dataframe = pd.DataFrame({"id": [1, 2, 3]})
+        for batch_size, expected in (
+            (2, "CopyMerge"),
+            (3, "InsertValues"),
+        ):
+            with mock.patch.object(
+                methods.CopyMerge, "load"
+            ) as copy_load, mock.patch.object(
+                methods.InsertValues, "load"
+            ) as insert_load:
+                methods.AutoSelect(dataframe, None, batch_size).load()
+            self.assertEqual(copy_load.called, expected == "CopyMerge")
+            self.assertEqual(insert_load.called, expected == "InsertValues")
+
+
+class TestGetStrategy(SimpleTestCase):
+    """Unittests for the `get_strategy` function."""
+
+    def test_get_strategy(self):
+        """Test that the strategy for a method name is returned."""
+        self.assertIs(methods.get_strategy("copy"), methods.CopyMerge)
+
+    def test_unknown_method(self):
+        """Test that a `ValueError` is raised for an unknown method."""
+        with self.assertRaises(ValueError):
+            methods.get_strategy("unknown")
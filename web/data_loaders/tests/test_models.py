@@ -0,0 +1,40 @@
+"""Unittests for the `models` module."""
+
+import os
+import tempfile
+from django.test import TestCase
+from search.models import SearchTerm
+from ..models import LoadCheckpoint
+
+
+class TestLoadCheckpoint(TestCase):
+    """Unittests for the `LoadCheckpoint` model."""
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.filepath = os.path.join(tmp_dir.name, "data.csv")
+        with open(self.filepath, "w") as _file:
+            _file.write("a\n1\n2\n")
+
+    def test_resume_unchanged_file(self):
+        """Test that a checkpoint is only resumed when asked to and when the
+        file has not changed since it was last updated.
+        """
+        checkpoint = LoadCheckpoint.start(SearchTerm, self.filepath)
+        checkpoint.advance(1)
+
+        self.assertEqual(
+            LoadCheckpoint.start(SearchTerm, self.filepath, True).rows, 1
+        )
+        self.assertEqual(
+            LoadCheckpoint.start(SearchTerm, self.filepath, False).rows, 0
+        )
+
+        LoadCheckpoint.start(SearchTerm, self.filepath).advance(1)
+        with open(self.filepath, "a") as _file:
+            _file.write("3\n")
+        self.assertEqual(
+            LoadCheckpoint.start(SearchTerm, self.filepath, True).rows, 0
+        )
+        self.assertEqual(LoadCheckpoint.objects.count(), 1)
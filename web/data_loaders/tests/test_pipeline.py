@@ -0,0 +1,101 @@
+"""Unittests for the `pipeline` module."""
+
+import threading
+from django.test import SimpleTestCase
+from .. import pipeline
+
+
+class TestPipeline(SimpleTestCase):
+    """Unittests for the `Pipeline` class."""
+
+    def test_items_in_order(self):
+        """Test that every item passes through each stage in order and that
+        the time each stage spent working is measured.
+        """
+        results = []
+        loader = pipeline.Pipeline(
+            range(20),
+            [
+                ("double", lambda item: item * 2),
+                ("add", lambda item: item + 1),
+            ],
+            ("collect", results.append),
+        )
+        loader.run()
+        self.assertEqual(results, [item * 2 + 1 for item in range(20)])
+        self.assertEqual(
+            set(loader.utilisation()), {"read", "double", "add", "collect"}
+        )
+        self.assertTrue(
+            all(0 <= value <= 1 for value in loader.utilisation().values())
+        )
+
+    def test_backpressure(self):
+        """Test that the source is not read far ahead of the sink."""
+        produced = []
+        ahead = []
+
+        def source():
+            for item in range(50):
+                produced.append(item)
+                yield item
+
+        def sink(item):
+            ahead.append(len(produced) - item)
+
+        pipeline.Pipeline(
+            source(),
+            [("copy", lambda item: item)],
+            ("sink", sink),
+            queue_size=1,
+        ).run()
+        # At most one item can wait in each queue and one in each stage.
+        self.assertLessEqual(max(ahead), 5)
+
+    def test_errors_raised(self):
+        """Test that an error in any stage is raised on the calling thread
+        and that the other stages are stopped.
+        """
+
+        def source():
+            for item in range(1000):
+                yield item
+
+        def fail_on_third(item):
+            if item == 3:
+                raise ValueError(item)
+            return item
+
+        threads = threading.active_count()
+        for stages, sink in (
+            ([("fail", fail_on_third)], lambda item: None),
+            ([("copy", lambda item: item)], fail_on_third),
+        ):
+            with self.subTest(sink=sink):
+                with self.assertRaises(ValueError):
+                    pipeline.Pipeline(source(), stages, ("sink", sink)).run()
+                self.assertEqual(threading.active_count(), threads)
+
+    def test_items(self):
+        """Test that the results of the last stage are yielded on the calling
+        thread and that the stages are stopped when the iterator is closed
+        before it is exhausted.
+        """
+        threads = threading.active_count()
+        loader = pipeline.Pipeline(
+            range(1000), [("double", lambda item: item * 2)]
+        )
+        items = loader.items()
+        self.assertEqual([next(items) for _ in range(3)], [0, 2, 4])
+        items.close()
+        self.assertEqual(threading.active_count(), threads)
+        self.assertEqual(set(loader.utilisation()), {"read", "double"})
+
+        caller = threading.get_ident()
+        self.assertEqual(
+            {
+                threading.get_ident()
+                for _ in pipeline.Pipeline(range(5), []).items()
+            },
+            {caller},
+        )
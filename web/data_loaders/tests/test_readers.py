@@ -0,0 +1,259 @@
+"""Unittests for the `readers` module."""
+
+import os
+import tempfile
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+from django.test import SimpleTestCase
+from .. import readers
+
+
+class TestIterCsvParallel(SimpleTestCase):
+    """Unittests for the `iter_csv_parallel` function."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def write_csv(self, content: str) -> str:
+        """Write the content to a CSV file in the temporary directory.
+
+        Args:
+            content: The content of the file.
+
+        Returns:
+            The path to the file.
+        """
+        filepath = os.path.join(self.tmp_dir.name, "test.csv")
+        with open(filepath, "w") as _file:
+            _file.write(content)
+        return filepath
+
+    def assert_frames_equal(self, results, expected_results):
+        """Check that two dataframes are identical, including their dtypes."""
+        self.assertTrue(
+            results.equals(expected_results)
+            and (results.dtypes == expected_results.dtypes).all(),
+            f"\nActual:\n{results}\nExpected:\n{expected_results}",
+        )
+
+    def test_byte_ranges_aligned_to_lines(self):
+        """Test that each byte range starts at the beginning of a line."""
+        filepath = self.write_csv("a,b\n1,2\n3,4\n5,6\n7,8\n")
+        ranges = readers.csv_byte_ranges(filepath, 4, 5)
+        self.assertEqual(ranges, [(4, 12), (12, 20)])
+
+    def test_identical_to_single_thread(self):
+        """Test that parsing the whole file on multiple threads gives the same
+        dataframe as parsing it on a single thread, including where integer
+        columns have missing values in only some parts of the file.
+        """
+        filepath = self.write_csv(
+            "a,b,c\n"
+            + "".join(f"{i},{i / 2},x{i}\n" for i in range(50))
+            + ",,\n51,0.5,y\n"
+        )
+        results = next(readers.iter_csv_parallel(filepath, 4))
+        self.assert_frames_equal(results, pd.read_csv(filepath))
+
+    def test_categorical_columns(self):
+        """Test that categorical columns stay categorical where each part of
+        the file has different categories.
+        """
+        filepath = self.write_csv(
+            "a,b\n" + "".join(f"{i},x{i // 10}\n" for i in range(50))
+        )
+        results = next(
+            readers.iter_csv_parallel(filepath, 4, dtype={"b": "category"})
+        )
+        self.assert_frames_equal(
+            results, pd.read_csv(filepath, dtype={"b": "category"})
+        )
+
+    def test_mixed_types(self):
+        """Test that a column which is numeric in some parts of the file and
+        text in others is parsed the same as on a single thread.
+        """
+        filepath = self.write_csv(
+            "a,b\n"
+            + "".join(f"{i},{i / 2}\n" for i in range(50))
+            + "50,text\n"
+        )
+        results = next(readers.iter_csv_parallel(filepath, 4))
+        self.assert_frames_equal(results, pd.read_csv(filepath))
+
+    def test_chunks(self):
+        """Test that the chunks contain all of the rows in order."""
+        filepath = self.write_csv(
+            "a,b\n" + "".join(f"{i},{i}\n" for i in range(100))
+        )
+        chunks = list(readers.iter_csv_parallel(filepath, 2, chunk_size=10))
+        self.assertGreater(len(chunks), 1)
+        self.assert_frames_equal(
+            pd.concat(chunks, ignore_index=True), pd.read_csv(filepath)
+        )
+
+    def test_quoted_line_breaks(self):
+        """Test that a file is parsed correctly where a quoted field which
+        contains a line break would be split between two ranges.
+        """
+        filepath = self.write_csv(
+            "a,b\n"
+            + "".join(f'{i},"line\n{i}"\n' for i in range(20))
+            + '20,"""quoted"""\n'
+        )
+        results = next(readers.iter_csv_parallel(filepath, 4))
+        self.assert_frames_equal(results, pd.read_csv(filepath))
+
+
+class TestArrowReaders(SimpleTestCase):
+    """Unittests for the functions which read Parquet and Arrow files."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.dataframe = pd.DataFrame(
+            {"a": range(10), "b": [f"x{i}" for i in range(10)]}
+        )
+        self.table = pa.Table.from_pandas(self.dataframe)
+
+    def get_filepath(self, filename: str) -> str:
+        """Get the path to a file in the temporary directory."""
+        return os.path.join(self.tmp_dir.name, filename)
+
+    def write_parquet(self) -> str:
+        """Write the test data to a Parquet file with multiple row groups."""
+        filepath = self.get_filepath("test.parquet")
+        pq.write_table(self.table, filepath, row_group_size=4)
+        return filepath
+
+    def write_feather(self) -> str:
+        """Write the test data to an uncompressed Feather file."""
+        filepath = self.get_filepath("test.feather")
+        feather.write_feather(self.table, filepath, compression="uncompressed")
+        return filepath
+
+    def write_feather_v1(self) -> str:
+        """Write the test data to a legacy Feather (version 1) file."""
+        filepath = self.get_filepath("test_v1.feather")
+        feather.write_feather(self.dataframe, filepath, version=1)
+        return filepath
+
+    def write_arrow_stream(self) -> str:
+        """Write the test data to an Arrow IPC stream of two batches."""
+        filepath = self.get_filepath("test.arrows")
+        with pa.OSFile(filepath, "wb") as sink:
+            with pa.ipc.new_stream(sink, self.table.schema) as writer:
+                for batch in self.table.to_batches(max_chunksize=5):
+                    writer.write_batch(batch)
+        return filepath
+
+    def test_detect_format(self):
+        """Test that the format of each file is detected from its contents
+        rather than its extension.
+        """
+        csv_filepath = self.get_filepath("test.parquet.csv")
+        self.dataframe.to_csv(csv_filepath, index=False)
+
+        self.assertEqual(
+            readers.detect_format(self.write_parquet()), "parquet"
+        )
+        self.assertEqual(
+            readers.detect_format(self.write_feather()), "feather"
+        )
+        self.assertEqual(
+            readers.detect_format(self.write_feather_v1()), "feather_v1"
+        )
+        self.assertEqual(
+            readers.detect_format(self.write_arrow_stream()), "arrow_stream"
+        )
+        self.assertEqual(readers.detect_format(csv_filepath), "csv")
+
+    def test_read_whole_file(self):
+        """Test that each format is read into a single dataframe which is the
+        same as the data written to it.
+        """
+        for filepath in (
+            self.write_parquet(),
+            self.write_feather(),
+            self.write_feather_v1(),
+            self.write_arrow_stream(),
+        ):
+            file_format = readers.detect_format(filepath)
+            with self.subTest(file_format=file_format):
+                results = list(readers.ARROW_READERS[file_format](filepath))
+                self.assertEqual(len(results), 1)
+                pd.testing.assert_frame_equal(results[0], self.dataframe)
+
+    def test_read_chunks_and_columns(self):
+        """Test that each format is read in chunks of at most the chunk size
+        and that only the requested columns are read.
+        """
+        for filepath in (
+            self.write_parquet(),
+            self.write_feather(),
+            self.write_feather_v1(),
+            self.write_arrow_stream(),
+        ):
+            file_format = readers.detect_format(filepath)
+            with self.subTest(file_format=file_format):
+                results = list(
+                    readers.ARROW_READERS[file_format](filepath, 3, ["b"])
+                )
+                self.assertTrue(all(len(chunk) <= 3 for chunk in results))
+                self.assertEqual(
+                    pd.concat(results, ignore_index=True)["b"].tolist(),
+                    self.dataframe["b"].tolist(),
+                )
+                self.assertTrue(
+                    all(chunk.columns.tolist() == ["b"] for chunk in results)
+                )
+
+    def test_read_compressed_feather_in_batches(self):
+        """Test that a compressed Feather file is decompressed one record
+        batch at a time rather than in full, and that only the requested
+        columns are decoded.
+        """
+        filepath = self.get_filepath("compressed.feather")
+        dataframe = pd.DataFrame(
+            {"a": range(100_000), "b": [f"x{i}" for i in range(100_000)]}
+        )
+        feather.write_feather(
+            dataframe, filepath, compression="zstd", chunksize=10_000
+        )
+
+        allocated = []
+        results = []
+        for chunk in readers.iter_feather(filepath, 5_000, ["b"]):
+            allocated.append(pa.total_allocated_bytes())
+            results.append(chunk)
+
+        self.assertEqual(len(results), 20)
+        self.assertTrue(
+            all(chunk.columns.tolist() == ["b"] for chunk in results)
+        )
+        self.assertEqual(
+            pd.concat(results, ignore_index=True)["b"].tolist(),
+            dataframe["b"].tolist(),
+        )
+        # No more than a couple of batches of the column are held at once.
+        self.assertLess(max(allocated), pa.array(dataframe["b"]).nbytes / 2)
+
+
+class TestSkipRows(SimpleTestCase):
+    """Tests for the `skip_rows` function."""
+
+    def test_skip_rows(self):
+        """Test that the given number of rows are skipped across chunks and
+        that the remaining rows are kept in order.
+        """
+        dataframe = pd.DataFrame({"a": range(10)})
+        chunks = [dataframe.iloc[i : i + 3] for i in range(0, 10, 3)]  # noqa
+        for rows in (0, 2, 3, 7, 10, 12):
+            with self.subTest(rows=rows):
+                results = list(readers.skip_rows(iter(chunks), rows))
+                self.assertTrue(all(len(chunk) for chunk in results))
+                remaining = pd.concat(results)["a"].tolist() if results else []
+                self.assertEqual(remaining, list(range(rows, 10)))
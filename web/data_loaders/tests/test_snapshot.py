@@ -0,0 +1,229 @@
+"""Unittests for the `snapshot` module."""
+
+import datetime
+from unittest import mock
+import pandas as pd
+import psycopg2
+from django.db import IntegrityError, connection
+from django.test import TransactionTestCase
+from campaigns import models as campaign_models
+from search import models as search_models
+from .. import snapshot
+from ..base import LoadResult
+
+
+class TestSnapshotSwap(TransactionTestCase):
+    """Unittests for the `SnapshotSwap` class."""
+
+    def setUp(self):
+        for campaign_id in (1, 2, 3):
+            campaign_models.Campaign.objects.create(
+                id=campaign_id, structure_value="a", status="ENABLED"
+            )
+        for ad_group_id in (1, 2):
+            campaign_models.AdGroup.objects.create(
+                id=ad_group_id, campaign_id=ad_group_id, alias="a", status="a"
+            )
+
+    @staticmethod
+    def table_indexes(table: str) -> list:
+        """Get the indexes, constraints and foreign keys of a table."""
+        with connection.cursor() as cursor:
+            return snapshot.table_indexes(cursor, table)
+
+    @staticmethod
+    def referring_foreign_keys(table: str) -> list:
+        """Get the foreign keys which refer to a table."""
+        with connection.cursor() as cursor:
+            return snapshot.referring_foreign_keys(cursor, table)
+
+    @staticmethod
+    def constraint_names(table: str) -> set:
+        """Get the names of the constraints and indexes of a table."""
+        with connection.cursor() as cursor:
+            return set(connection.introspection.get_constraints(cursor, table))
+
+    @staticmethod
+    def table_names() -> list:
+        """Get the names of the tables in the database."""
+        with connection.cursor() as cursor:
+            return connection.introspection.table_names(cursor)
+
+    @staticmethod
+    def campaigns(ids: list, status: str) -> pd.DataFrame:
+        """Build a chunk of campaigns."""
+        return pd.DataFrame(
+            {"id": ids, "structure_value": "a", "status": status}
+        )
+
+    def test_swap(self):
+        """Test that the table is replaced with the last row staged for each
+        key, keeping its indexes, constraints, sequence and the foreign keys
+        which refer to it.
+        """
+        table = campaign_models.Campaign._meta.db_table
+        indexes = self.table_indexes(table)
+        foreign_keys = self.referring_foreign_keys(table)
+        constraints = self.constraint_names(table)
+        self.assertTrue(foreign_keys)
+
+        loader = snapshot.SnapshotSwap(campaign_models.Campaign)
+        loader.stage(self.campaigns([1, 2], "PAUSED"))
+        loader.stage(self.campaigns([2, 4], "ENABLED"))
+        self.assertEqual(loader.finish(), LoadResult(1, 1, 1))
+        self.assertEqual(loader.removed, 1)
+
+        self.assertEqual(
+            list(
+                campaign_models.Campaign.objects.order_by("id").values_list(
+                    "id", "status"
+                )
+            ),
+            [(1, "PAUSED"), (2, "ENABLED"), (4, "ENABLED")],
+        )
+        self.assertEqual(self.table_indexes(table), indexes)
+        self.assertEqual(self.referring_foreign_keys(table), foreign_keys)
+        self.assertEqual(self.constraint_names(table), constraints)
+        self.assertEqual(
+            set(loader.timings),
+            {"merge", "index", "analyze", "check", "swap", "validate"},
+        )
+        self.assertNotIn(loader.staging_table, self.table_names())
+        self.assertNotIn(loader.shadow_table, self.table_names())
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT bool_and(convalidated) FROM pg_constraint "
+                "WHERE confrelid = %s::regclass",
+                [table],
+            )
+            self.assertTrue(cursor.fetchone()[0])
+            cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [table])
+            self.assertIsNotNone(cursor.fetchone()[0])
+
+        # The foreign keys which refer to the table are still enforced.
+        with self.assertRaises(IntegrityError):
+            campaign_models.AdGroup.objects.create(
+                id=3, campaign_id=3, alias="a", status="a"
+            )
+
+    def test_concurrent_shadow_tables(self):
+        """Test that snapshots of the same model which overlap each build
+        their own shadow table, with their own index names.
+        """
+        first = snapshot.SnapshotSwap(campaign_models.Campaign)
+        second = snapshot.SnapshotSwap(campaign_models.Campaign)
+        self.assertNotEqual(first.shadow_table, second.shadow_table)
+        first.stage(self.campaigns([1, 2, 3], "PAUSED"))
+        second.stage(self.campaigns([1, 2, 3], "ENABLED"))
+        second.build_shadow()
+        self.assertEqual(first.finish(), LoadResult(0, 3, 0))
+        self.assertIn(second.shadow_table, self.table_names())
+        second.discard()
+        self.assertNotIn(second.shadow_table, self.table_names())
+        self.assertEqual(
+            set(campaign_models.Campaign.objects.values_list("status")),
+            {("PAUSED",)},
+        )
+
+    def test_check_does_not_block_readers(self):
+        """Test that the snapshot is checked with writes to the table
+        blocked, but not reads.
+        """
+        table = campaign_models.Campaign._meta.db_table
+        settings = connection.settings_dict
+        other = psycopg2.connect(
+            dbname=settings["NAME"],
+            user=settings["USER"],
+            password=settings["PASSWORD"],
+            host=settings["HOST"],
+            port=settings["PORT"],
+        )
+        other.autocommit = True
+        seen = {}
+
+        def compare(loader, cursor):
+            with other.cursor() as other_cursor:
+                other_cursor.execute("SET lock_timeout = '100ms';")
+                other_cursor.execute(f"SELECT count(*) FROM {table};")
+                seen["rows"] = other_cursor.fetchone()[0]
+                with self.assertRaises(psycopg2.errors.LockNotAvailable):
+                    other_cursor.execute(
+                        f"UPDATE {table} SET status = 'PAUSED';"
+                    )
+            return original(loader, cursor)
+
+        original = snapshot.SnapshotSwap.compare
+        loader = snapshot.SnapshotSwap(campaign_models.Campaign)
+        loader.stage(self.campaigns([1, 2, 3], "PAUSED"))
+        try:
+            with mock.patch.object(snapshot.SnapshotSwap, "compare", compare):
+                loader.finish()
+        finally:
+            other.close()
+        self.assertEqual(seen["rows"], 3)
+
+    def test_swap_keeps_foreign_keys(self):
+        """Test that the table's own foreign keys are kept and the rows of
+        the tables which refer to it still refer to it.
+        """
+        search_models.SearchTerm.objects.create(
+            date=datetime.date(2022, 1, 1),
+            ad_group_id=1,
+            clicks=1,
+            cost=1,
+            conversion_value=1,
+            conversions=1,
+            search_term="a",
+            roas=1,
+        )
+        table = campaign_models.AdGroup._meta.db_table
+        indexes = self.table_indexes(table)
+        self.assertTrue(any(index.foreign_key for index in indexes))
+
+        loader = snapshot.SnapshotSwap(campaign_models.AdGroup)
+        loader.stage(
+            pd.DataFrame(
+                {"id": [1], "campaign_id": [3], "alias": "b", "status": "a"}
+            )
+        )
+        self.assertEqual(loader.finish(), LoadResult(0, 1, 0))
+        self.assertEqual(self.table_indexes(table), indexes)
+        self.assertEqual(
+            search_models.SearchTerm.objects.get().ad_group.campaign_id, 3
+        )
+        with self.assertRaises(IntegrityError):
+            campaign_models.AdGroup.objects.create(
+                id=4, campaign_id=99, alias="a", status="a"
+            )
+
+    def test_swap_refused(self):
+        """Test that a snapshot which is missing keys that other tables refer
+        to is refused and leaves the table as it was.
+        """
+        table = campaign_models.Campaign._meta.db_table
+        indexes = self.table_indexes(table)
+
+        loader = snapshot.SnapshotSwap(campaign_models.Campaign)
+        loader.stage(self.campaigns([1, 3], "PAUSED"))
+        with self.assertRaisesRegex(IntegrityError, "campaigns_adgroup"):
+            loader.finish()
+        loader.discard()
+
+        self.assertEqual(
+            list(
+                campaign_models.Campaign.objects.order_by("id").values_list(
+                    "id", "status"
+                )
+            ),
+            [(1, "ENABLED"), (2, "ENABLED"), (3, "ENABLED")],
+        )
+        self.assertEqual(self.table_indexes(table), indexes)
+        self.assertNotIn(loader.shadow_table, self.table_names())
+
+    def test_empty_snapshot(self):
+        """Test that an empty snapshot does not replace the table."""
+        loader = snapshot.SnapshotSwap(campaign_models.Campaign)
+        with self.assertRaises(ValueError):
+            loader.finish()
+        self.assertEqual(campaign_models.Campaign.objects.count(), 3)
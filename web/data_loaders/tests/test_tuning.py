@@ -0,0 +1,73 @@
+"""Unittests for the `tuning` module."""
+
+from unittest import mock
+from django.test import SimpleTestCase
+from campaigns.models import Campaign
+from .. import tuning
+
+
+def simulated_seconds(rows: int) -> float:
+    """The time taken to load a batch of rows against a simulated database,
+    where each batch has a fixed round-trip cost and very large batches slow
+    down, giving a peak throughput at 20,000 rows.
+    """
+    return 0.02 + rows * 1e-6 + (rows / 20_000) ** 2 * 0.02
+
+
+class TestBatchSizer(SimpleTestCase):
+    """Unittests for the `BatchSizer` class."""
+
+    def test_converges_to_peak(self):
+        """Test that the batch size settles close to the size with the
+        highest throughput, whether it starts below or above it.
+        """
+        for initial in (500, 500_000):
+            with self.subTest(initial=initial):
+                sizer = tuning.BatchSizer(initial)
+                sizes = []
+                for _ in range(60):
+                    size = sizer.next_size()
+                    sizer.record(size, simulated_seconds(size))
+                    sizes.append(size)
+                for size in sizes[-10:]:
+                    self.assertGreater(size, 14_000)
+                    self.assertLess(size, 28_000)
+
+    def test_memory_budget(self):
+        """Test that a batch is never larger than the memory budget allows."""
+        sizer = tuning.BatchSizer(10_000, memory_budget=1_000_000)
+        for _ in range(10):
+            size = sizer.next_size(row_bytes=500)
+            self.assertLessEqual(size, 2_000)
+            sizer.record(size, size / 1e6)
+
+    def test_slow_batches_shrink(self):
+        """Test that a batch which takes longer than the maximum latency is
+        followed by a smaller batch, even if its throughput was higher.
+        """
+        sizer = tuning.BatchSizer(10_000, max_latency=1.0)
+        sizer.record(10_000, 0.5)
+        self.assertEqual(sizer.next_size(), 20_000)
+        sizer.record(20_000, 1.5)
+        self.assertLess(sizer.next_size(), 20_000)
+
+    def test_range(self):
+        """Test that the batch size is kept within its range."""
+        sizer = tuning.BatchSizer(150, minimum=100, maximum=200)
+        sizer.record(150, 0.1)
+        self.assertEqual(sizer.next_size(), 200)
+
+        sizer = tuning.BatchSizer(150, minimum=100, max_latency=1.0)
+        sizer.record(150, 5.0)
+        self.assertEqual(sizer.next_size(), 100)
+
+
+class TestBatchSizerRegistry(SimpleTestCase):
+    """Unittests for the `batch_sizer` function."""
+
+    def test_sizer_kept_per_model(self):
+        """Test that the same sizer is returned for a model each time."""
+        with mock.patch.dict(tuning.batch_sizers, clear=True):
+            sizer = tuning.batch_sizer(Campaign, 1_000)
+            self.assertEqual(sizer.size, 1_000)
+            self.assertIs(tuning.batch_sizer(Campaign, 5_000), sizer)
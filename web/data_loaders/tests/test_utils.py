@@ -0,0 +1,199 @@
+"""Unittests for the `utils` module."""
+
+from unittest import mock
+import numpy as np
+import pandas as pd
+from django.db import connection, DataError
+from django.test import SimpleTestCase, TransactionTestCase
+from campaigns import models as campaign_models
+from search import models as search_models
+from .. import tuning, utils
+
+
+class TestColumnValues(SimpleTestCase):
+    """Unittests for the `column_values` function."""
+
+    def test_numpy_types_converted(self):
+        """Test that numpy values are converted to python values."""
+        results = utils.column_values(pd.Series(np.array([1, 2], "int64")))
+        self.assertEqual(results, [1, 2])
+        self.assertIsInstance(results[0], int)
+
+    def test_missing_values_converted(self):
+        """Test that missing values are converted to `None`."""
+        self.assertEqual(
+            utils.column_values(pd.Series([1.5, np.nan])), [1.5, None]
+        )
+        self.assertEqual(
+            utils.column_values(pd.Series(["a", np.nan, None])),
+            ["a", None, None],
+        )
+
+    def test_extension_types_converted(self):
+        """Test that the values of nullable and categorical columns are
+        converted to python values.
+        """
+        results = utils.column_values(pd.Series([1, None], dtype="Int32"))
+        self.assertEqual(results, [1, None])
+        self.assertIsInstance(results[0], int)
+        self.assertEqual(
+            utils.column_values(pd.Series(["a", None], dtype="category")),
+            ["a", None],
+        )
+
+
+class TestArrayTypes(SimpleTestCase):
+    """Unittests for the `array_types` function."""
+
+    def test_search_term(self):
+        """Test that the array types for the `SearchTerm` model are correct
+        and do not contain type modifiers.
+        """
+        self.assertEqual(
+            utils.array_types(
+                search_models.SearchTerm,
+                ["date", "ad_group_id", "clicks", "cost", "search_term"],
+            ),
+            ["date[]", "bigint[]", "integer[]", "numeric[]", "varchar[]"],
+        )
+
+
+class TestUpsertDataframe(TransactionTestCase):
+    """Unittests for the `upsert_dataframe` function."""
+
+    def test_upsert_in_batches(self):
+        """Test that rows are inserted and updated where the rows are split
+        across multiple batches.
+        """
+        campaign_models.Campaign.objects.create(
+            id=1, structure_value="old", status="old"
+        )
+        dataframe = pd.DataFrame(
+            {
+                "id": [1, 2, 3],
+                "structure_value": ["a", "b", "c"],
+                "status": ["ENABLED", "ENABLED", "DISABLED"],
+            }
+        )
+
+        with connection.cursor() as cursor:
+            counts = utils.upsert_dataframe(
+                cursor,
+                campaign_models.Campaign,
+                dataframe,
+                columns=["id", "structure_value", "status"],
+                conflict_columns=["id"],
+                update_columns=["structure_value", "status"],
+                batch_size=2,
+            )
+
+        self.assertEqual(counts, (2, 1))
+
+        self.assertEqual(
+            list(
+                campaign_models.Campaign.objects.order_by("id").values_list(
+                    "id", "structure_value", "status"
+                )
+            ),
+            [(1, "a", "ENABLED"), (2, "b", "ENABLED"), (3, "c", "DISABLED")],
+        )
+
+    def test_upsert_tuned_batches(self):
+        """Test that every row is loaded where the batch size is tuned and
+        that the sizer records the batches.
+        """
+        dataframe = pd.DataFrame(
+            {
+                "id": range(1, 101),
+                "structure_value": ["a"] * 100,
+                "status": ["ENABLED"] * 100,
+            }
+        )
+        sizer = tuning.BatchSizer(10, minimum=5)
+        with mock.patch.dict(
+            tuning.batch_sizers, {campaign_models.Campaign: sizer}
+        ), connection.cursor() as cursor:
+            counts = utils.upsert_dataframe(
+                cursor,
+                campaign_models.Campaign,
+                dataframe,
+                columns=["id", "structure_value", "status"],
+                conflict_columns=["id"],
+                update_columns=["structure_value", "status"],
+                batch_size=tuning.AUTO_BATCH_SIZE,
+            )
+
+        self.assertEqual(counts, (100, 0))
+        self.assertEqual(campaign_models.Campaign.objects.count(), 100)
+        self.assertIsNotNone(sizer.throughput)
+
+    def test_long_values_not_truncated(self):
+        """Test that a value which is too long for its column is rejected
+        rather than being truncated.
+        """
+        dataframe = pd.DataFrame(
+            {"id": [1], "structure_value": ["a" * 51], "status": ["ENABLED"]}
+        )
+
+        with self.assertRaises(DataError), connection.cursor() as cursor:
+            utils.upsert_dataframe(
+                cursor,
+                campaign_models.Campaign,
+                dataframe,
+                columns=["id", "structure_value", "status"],
+                conflict_columns=["id"],
+                update_columns=["structure_value", "status"],
+            )
+
+    def test_bad_rows_isolated(self):
+        """Test that the rows which the database rejects are found and passed
+        to `on_error`, whilst every other row is loaded.
+        """
+        dataframe = pd.DataFrame(
+            {
+                "id": range(1, 9),
+                "structure_value": ["a", "b", "c" * 51, "d"]
+                + ["e", "f" * 51, "g", "h"],
+                "status": ["ENABLED"] * 8,
+            }
+        )
+        rejected = []
+
+        with connection.cursor() as cursor:
+            counts = utils.upsert_dataframe(
+                cursor,
+                campaign_models.Campaign,
+                dataframe,
+                columns=["id", "structure_value", "status"],
+                conflict_columns=["id"],
+                update_columns=["structure_value", "status"],
+                on_error=lambda rows, error: rejected.append(
+                    (rows["id"].tolist(), type(error))
+                ),
+            )
+
+        self.assertEqual(counts, (6, 0))
+        self.assertEqual(rejected, [([3], DataError), ([6], DataError)])
+        self.assertEqual(
+            list(
+                campaign_models.Campaign.objects.order_by("id").values_list(
+                    "id", flat=True
+                )
+            ),
+            [1, 2, 4, 5, 7, 8],
+        )
+
+    def test_invalid_batch_size(self):
+        """Test that a `ValueError` is raised when the batch size is not
+        positive.
+        """
+        with self.assertRaises(ValueError):
+            utils.upsert_dataframe(
+                None,
+                campaign_models.Campaign,
+                pd.DataFrame(),
+                columns=[],
+                conflict_columns=[],
+                update_columns=[],
+                batch_size=0,
+            )
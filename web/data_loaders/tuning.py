@@ -0,0 +1,172 @@
+"""This module contains a batch sizer which tunes the number of rows sent to
+the database in each query while data is being loaded, as the best size
+depends on the width of the table's rows and on the database. Small batches
+spend most of their time on round trips to the server, whilst large batches
+use more memory and hold locks for longer without loading rows any faster.
+
+The sizer measures the rows loaded per second and the round-trip latency of
+each batch and climbs towards the size with the highest throughput. Each
+batch is made larger or smaller by a factor and, whenever a step makes the
+throughput worse, the direction is reversed and the factor is reduced, so
+the size settles around the peak whilst still following changes in it. The
+size is kept within a range of rows, within a budget for the memory used by
+the parameters of a batch and within a maximum latency per batch. The
+number of parameters of a query does not limit the size, as each column is
+sent as a single array whatever the number of rows.
+
+A sizer is kept for each model for the lifetime of the process, so later
+chunks and loads start from the size which was found for the model.
+"""
+
+import logging
+import typing as _t
+from django.db.models import Model
+
+logger = logging.getLogger(__name__)
+
+# The value of a batch size which turns on tuning.
+AUTO_BATCH_SIZE = "auto"
+
+# The range of the number of rows in a batch.
+MIN_BATCH_SIZE = 100
+MAX_BATCH_SIZE = 1_000_000
+
+# The estimated number of bytes the rows of a batch may take up in memory.
+BATCH_MEMORY_BUDGET = 64 * 1024 * 1024
+
+# The number of seconds a batch may take before it is made smaller.
+MAX_BATCH_LATENCY = 2.0
+
+# The factor a batch is first grown or shrunk by, and the smallest factor it
+# is reduced to, so that the size keeps following changes in the peak.
+INITIAL_FACTOR = 2.0
+MIN_FACTOR = 1.1
+
+
+class BatchSizer:
+    """Tunes the number of rows in each batch towards the size which loads
+    the most rows per second.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        minimum: int = MIN_BATCH_SIZE,
+        maximum: int = MAX_BATCH_SIZE,
+        memory_budget: int = BATCH_MEMORY_BUDGET,
+        max_latency: float = MAX_BATCH_LATENCY,
+    ):
+        """Initialize the batch sizer.
+
+        Args:
+            initial: The number of rows in the first batch.
+            minimum: The smallest number of rows in a batch.
+            maximum: The largest number of rows in a batch.
+            memory_budget: The number of bytes the rows of a batch may take
+                up in memory.
+            max_latency: The number of seconds a batch may take before it is
+                made smaller.
+        """
+        self.minimum = minimum
+        self.maximum = maximum
+        self.memory_budget = memory_budget
+        self.max_latency = max_latency
+        self.size = self.clamp(initial)
+        self.factor = INITIAL_FACTOR
+        self.direction = 1
+        self.throughput: _t.Optional[float] = None
+        self.latency: _t.Optional[float] = None
+
+    def clamp(self, size: float) -> int:
+        """Keep a number of rows within the range of batch sizes.
+
+        Args:
+            size: The number of rows.
+
+        Returns:
+            The number of rows within the range.
+        """
+        return max(self.minimum, min(self.maximum, int(round(size))))
+
+    def next_size(self, row_bytes: float = 0.0) -> int:
+        """Get the number of rows to put in the next batch.
+
+        Args:
+            row_bytes: The estimated number of bytes each row takes up in
+                memory.
+
+        Returns:
+            The number of rows.
+        """
+        if row_bytes > 0:
+            return max(
+                self.minimum,
+                min(self.size, int(self.memory_budget // row_bytes)),
+            )
+        return self.size
+
+    def record(self, rows: int, seconds: float) -> None:
+        """Record how long a full batch took to load and choose the size of
+        the next batch.
+
+        Args:
+            rows: The number of rows in the batch.
+            seconds: The number of seconds between sending the batch and
+                receiving the result.
+        """
+        seconds = max(seconds, 1e-6)
+        throughput = rows / seconds
+        if seconds > self.max_latency:
+            self.direction = -1
+        elif self.throughput is not None and throughput < self.throughput:
+            # The last step made the throughput worse, so turn around and
+            # take smaller steps.
+            self.direction = -self.direction
+            self.factor = max(self.factor ** 0.5, MIN_FACTOR)
+        self.throughput, self.latency = throughput, seconds
+        self.size = self.clamp(rows * self.factor ** self.direction)
+        logger.debug(
+            "Loaded %s rows in %.3fs (%.0f rows/s). Next batch size: %s.",
+            rows,
+            seconds,
+            throughput,
+            self.size,
+        )
+
+
+# The sizer of each model, kept for the lifetime of the process.
+batch_sizers: _t.Dict[Model, BatchSizer] = {}
+
+
+def batch_sizer(model: Model, initial: int) -> BatchSizer:
+    """Get the batch sizer of a model, creating it if it does not exist.
+
+    Args:
+        model: The model the data is loaded into.
+        initial: The number of rows in the first batch of a new sizer.
+
+    Returns:
+        The batch sizer.
+    """
+    if model not in batch_sizers:
+        batch_sizers[model] = BatchSizer(initial)
+    return batch_sizers[model]
+
+
+def log_batch_size(model: Model) -> None:
+    """Log the batch size which has been chosen for a model, so that it can
+    be passed as a fixed batch size to later loads.
+
+    Args:
+        model: The model the data is loaded into.
+    """
+    sizer = batch_sizers.get(model)
+    if sizer is not None and sizer.throughput is not None:
+        logger.info(
+            "Tuned the batch size of %s to %s rows (%.0f rows/s, %.3fs per "
+            "batch).",
+            model._meta.label,
+            sizer.size,
+            sizer.throughput,
+            sizer.latency,
+        )
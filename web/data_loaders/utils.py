@@ -0,0 +1,335 @@
+"""This module contains utilities for loading data from a pandas dataframe
+into a database table in bulk.
+"""
+
+import io
+import re
+import time
+import typing as _t
+import pandas as pd
+from django.db import DataError, IntegrityError, connection, transaction
+from django.db.models import Model
+from . import tuning
+
+# The default number of rows sent to the database in a single query.
+DEFAULT_BATCH_SIZE = 10_000
+
+# The errors caused by the values of a row, rather than by the database or
+# the connection to it, which a row can be quarantined for.
+ROW_ERRORS = (DataError, IntegrityError)
+
+
+def column_values(series: pd.Series) -> list:
+    """Convert a column into a list of python objects which the database
+    driver is able to send to the database. Missing values are converted to
+    `None` so that they are loaded as `NULL`.
+
+    Args:
+        series: The column to convert.
+
+    Returns:
+        The values of the column.
+    """
+    if pd.api.types.is_extension_array_dtype(series.dtype):
+        # The nullable and categorical types give numpy scalars from
+        # `tolist`, whereas converting them to objects gives python values.
+        return series.to_numpy(dtype=object, na_value=None).tolist()
+    if series.isna().any():
+        values = series.to_numpy(dtype=object, copy=True)
+        values[pd.isna(values)] = None
+        return values.tolist()
+    return series.tolist()
+
+
+def array_types(model: Model, columns: _t.List[str]) -> _t.List[str]:
+    """Get the database types of the arrays used to send each column to the
+    database. Type modifiers, such as the maximum length of a `varchar`, are
+    removed so that any value which does not fit in the column is rejected
+    when it is inserted rather than being silently truncated by the cast.
+
+    Args:
+        model: The model the data is being loaded into.
+        columns: The names of the columns being loaded.
+
+    Returns:
+        The array type for each column.
+    """
+    fields = {field.column: field for field in model._meta.concrete_fields}
+    return [
+        re.sub(r"\(.*\)", "", fields[column].cast_db_type(connection)) + "[]"
+        for column in columns
+    ]
+
+
+def conflict_clause(
+    table: str, conflict_columns: _t.List[str], update_columns: _t.List[str]
+) -> str:
+    """Build the `ON CONFLICT` clause of an insert query which updates the
+    rows that already exist. Only rows where at least one of the columns has
+    changed are updated, so that loading the same data again does not
+    rewrite every row. Where there are no columns to update, the rows which
+    already exist are left as they are.
+
+    Args:
+        table: The name of the table the rows are inserted into.
+        conflict_columns: The columns which identify an existing row.
+        update_columns: The columns to update where a row already exists.
+
+    Returns:
+        The `ON CONFLICT` clause.
+    """
+    if not update_columns:
+        return f"ON CONFLICT ({', '.join(conflict_columns)}) DO NOTHING"
+
+    updates = ", ".join(
+        f"{column} = EXCLUDED.{column}" for column in update_columns
+    )
+    current = ", ".join(f"{table}.{column}" for column in update_columns)
+    excluded = ", ".join(f"EXCLUDED.{column}" for column in update_columns)
+    return (
+        f"ON CONFLICT ({', '.join(conflict_columns)}) DO UPDATE SET {updates} "
+        f"WHERE ({current}) IS DISTINCT FROM ({excluded})"
+    )
+
+
+def count_upserts(query: str) -> str:
+    """Wrap an insert query with an `ON CONFLICT` clause so that it returns
+    the number of rows which were inserted and the number which were
+    updated. A row which was inserted has no `xmax`, whereas a row which was
+    updated has the `xmax` of the transaction which locked it. Rows which
+    were left unchanged are not returned at all.
+
+    Args:
+        query: The insert query, without a trailing semicolon.
+
+    Returns:
+        The query.
+    """
+    return f"""
+        WITH upserted AS ({query}
+        RETURNING xmax = 0 AS inserted)
+        SELECT
+            count(*) FILTER (WHERE inserted),
+            count(*) FILTER (WHERE NOT inserted)
+        FROM upserted;"""
+
+
+def merge_query(
+    table: str,
+    staging_table: str,
+    columns: _t.List[str],
+    conflict_columns: _t.List[str],
+    update_columns: _t.List[str],
+) -> str:
+    """Build a query which merges the rows of a staging table into a table,
+    updating the rows which already exist and have changed. The query
+    returns the number of rows which were inserted and the number which
+    were updated. See `count_upserts`.
+
+    Args:
+        table: The name of the table the rows are merged into.
+        staging_table: The name of the table holding the rows.
+        columns: The names of the columns being loaded.
+        conflict_columns: The columns which identify an existing row.
+        update_columns: The columns to update where a row already exists.
+
+    Returns:
+        The query.
+    """
+    column_list = ", ".join(columns)
+    return count_upserts(
+        f"""
+        INSERT INTO {table} ({column_list})
+        SELECT {column_list} FROM {staging_table}
+        {conflict_clause(table, conflict_columns, update_columns)}"""
+    )
+
+
+def csv_buffer(dataframe: pd.DataFrame, columns: _t.List[str]) -> io.StringIO:
+    """Write the columns of a dataframe to an in-memory CSV file to be
+    copied into a table with `COPY ... WITH (FORMAT csv, NULL '\\N')`.
+    Missing values are written as `\\N` so that they can be told apart from
+    empty strings.
+
+    Args:
+        dataframe: The cleaned data to load.
+        columns: The names of the columns being loaded.
+
+    Returns:
+        The CSV file, without a header, positioned at its start.
+    """
+    buffer = io.StringIO()
+    dataframe.to_csv(
+        buffer, columns=columns, index=False, header=False, na_rep="\\N"
+    )
+    buffer.seek(0)
+    return buffer
+
+
+def upsert_query(
+    model: Model,
+    columns: _t.List[str],
+    conflict_columns: _t.List[str],
+    update_columns: _t.List[str],
+) -> str:
+    """Build a query which inserts rows into the model's table, updating the
+    rows which already exist and have changed. Each column is passed to the
+    query as a single array parameter so that the size of the query does not
+    depend on the number of rows. The query returns the number of rows which
+    were inserted and the number which were updated. See `count_upserts`.
+
+    Args:
+        model: The model the data is being loaded into.
+        columns: The names of the columns being loaded.
+        conflict_columns: The columns which identify an existing row.
+        update_columns: The columns to update where a row already exists.
+
+    Returns:
+        The query.
+    """
+    table = model._meta.db_table
+    arrays = ", ".join(
+        f"%s::{array_type}" for array_type in array_types(model, columns)
+    )
+    return count_upserts(
+        f"""
+        INSERT INTO {table} ({", ".join(columns)})
+        SELECT * FROM unnest({arrays})
+        {conflict_clause(table, conflict_columns, update_columns)}"""
+    )
+
+
+def upsert_dataframe(
+    cursor,
+    model: Model,
+    dataframe: pd.DataFrame,
+    columns: _t.List[str],
+    conflict_columns: _t.List[str],
+    update_columns: _t.List[str],
+    batch_size: _t.Union[int, str] = DEFAULT_BATCH_SIZE,
+    on_error: _t.Optional[_t.Callable[[pd.DataFrame, Exception], None]] = None,
+) -> _t.Tuple[int, int]:
+    """Insert or update the rows of a dataframe in batches. The parameters for
+    each batch are built column by column rather than row by row.
+
+    Args:
+        cursor: The database cursor to execute the queries with.
+        model: The model the data is being loaded into.
+        dataframe: The cleaned data to load.
+        columns: The names of the columns being loaded.
+        conflict_columns: The columns which identify an existing row.
+        update_columns: The columns to update where a row already exists.
+        batch_size: The maximum number of rows to send in a single query, or
+            `auto` to tune the number of rows in each batch towards the
+            highest throughput. See `tuning.BatchSizer`.
+        on_error: A function which is called with each row that the database
+            rejects and the error it caused. Where this is given, each batch
+            is loaded under its own savepoint and a batch which fails is
+            split until the rows which cause the error are found, so that
+            the other rows are still loaded. See `upsert_isolated`.
+            Otherwise, the first error is raised.
+
+    Returns:
+        The number of rows which were inserted and the number which were
+        updated.
+    """
+    sizer = row_bytes = None
+    if batch_size == tuning.AUTO_BATCH_SIZE:
+        sizer = tuning.batch_sizer(model, DEFAULT_BATCH_SIZE)
+        row_bytes = estimate_row_bytes(dataframe[columns])
+    elif batch_size < 1:
+        raise ValueError(f"Batch size ({batch_size}) must be positive.")
+
+    query = upsert_query(model, columns, conflict_columns, update_columns)
+    inserted = updated = start = 0
+    while start < len(dataframe):
+        size = batch_size if sizer is None else sizer.next_size(row_bytes)
+        batch = dataframe.iloc[start : start + size]  # noqa: E203
+        started = time.perf_counter()
+        if on_error is None:
+            cursor.execute(
+                query, [column_values(batch[column]) for column in columns]
+            )
+            batch_inserted, batch_updated = cursor.fetchone()
+        else:
+            batch_inserted, batch_updated = upsert_isolated(
+                cursor, query, batch, columns, on_error
+            )
+        # Only full batches are measured, as the last batch is smaller.
+        if sizer is not None and len(batch) == size:
+            sizer.record(len(batch), time.perf_counter() - started)
+        inserted += batch_inserted
+        updated += batch_updated
+        start += len(batch)
+
+    if sizer is not None:
+        tuning.log_batch_size(model)
+    return inserted, updated
+
+
+def estimate_row_bytes(
+    dataframe: pd.DataFrame, sample_size: int = 1000
+) -> float:
+    """Estimate the number of bytes each row of a dataframe takes up in
+    memory from a sample of its rows, as measuring the strings of every row
+    is slow.
+
+    Args:
+        dataframe: A pandas dataframe.
+        sample_size: The number of rows to measure.
+
+    Returns:
+        The estimated number of bytes per row.
+    """
+    sample = dataframe.iloc[:sample_size]
+    if not len(sample):
+        return 0.0
+    return float(sample.memory_usage(deep=True, index=False).sum()) / len(
+        sample
+    )
+
+
+def upsert_isolated(
+    cursor,
+    query: str,
+    batch: pd.DataFrame,
+    columns: _t.List[str],
+    on_error: _t.Callable[[pd.DataFrame, Exception], None],
+) -> _t.Tuple[int, int]:
+    """Insert or update a batch of rows under a savepoint. Where the database
+    rejects the batch because of the values of its rows, the savepoint is
+    rolled back and each half of the batch is loaded in the same way, until
+    the rows which cause the error are found on their own. A batch of n rows
+    with k bad rows takes at most around 2k * log2(n) extra queries, so a
+    file with a few bad rows costs little more to load than a clean one.
+
+    Args:
+        cursor: The database cursor to execute the queries with.
+        query: The upsert query. See `upsert_query`.
+        batch: The rows to load.
+        columns: The names of the columns being loaded.
+        on_error: A function which is called with each row that the database
+            rejects and the error it caused.
+
+    Returns:
+        The number of rows which were inserted and the number which were
+        updated.
+    """
+    try:
+        with transaction.atomic():
+            cursor.execute(
+                query, [column_values(batch[column]) for column in columns]
+            )
+            return cursor.fetchone()
+    except ROW_ERRORS as error:
+        if len(batch) == 1:
+            on_error(batch, error)
+            return 0, 0
+        middle = len(batch) // 2
+        first_inserted, first_updated = upsert_isolated(
+            cursor, query, batch.iloc[:middle], columns, on_error
+        )
+        last_inserted, last_updated = upsert_isolated(
+            cursor, query, batch.iloc[middle:], columns, on_error
+        )
+        return first_inserted + last_inserted, first_updated + last_updated
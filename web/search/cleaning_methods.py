@@ -0,0 +1,46 @@
+"""This module contains cleaning strategies specific to search terms."""
+
+import typing as _t
+import pandas as pd
+from django.db.models import Model
+from data_cleaners.base import CleaningStrategy
+
+
+class CalculateRoas(CleaningStrategy):
+    """Calculates the Return On Ad Spend (RoAS) for each row. Where there is
+    no cost, the RoAS is the conversion value.
+    """
+
+    row_wise = True
+    plannable = True
+    cost = 0.5
+
+    @classmethod
+    def reads(cls, model: Model) -> _t.Set[str]:
+        """The cost and conversion value of each row."""
+        return {"cost", "conversion_value"}
+
+    @classmethod
+    def writes(cls, model: Model) -> _t.Set[str]:
+        """The RoAS of each row."""
+        return {"roas"}
+
+    @classmethod
+    def output_columns(cls, model: Model, columns: _t.Set[str]) -> _t.Set[str]:
+        """The RoAS column is added."""
+        return set(columns) | {"roas"}
+
+    @classmethod
+    def required_columns(
+        cls, model: Model, columns: _t.Set[str]
+    ) -> _t.Set[str]:
+        """The RoAS is calculated from the cost and conversion value."""
+        return (set(columns) - {"roas"}) | {"cost", "conversion_value"}
+
+    def clean(self) -> pd.DataFrame:
+        """Executes the cleaning task."""
+        self.validate_model()
+        cost = self.dataframe["cost"]
+        self.dataframe["roas"] = self.dataframe[
+            "conversion_value"
+        ] / cost.where(cost != 0, 1)
@@ -0,0 +1,249 @@
+"""Management utility to benchmark the methods of loading search terms."""
+
+import time
+import typing as _t
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from campaigns.models import AdGroup, Campaign
+from data_cleaners.base import clean_data
+from data_loaders.bulk import BulkLoad
+from data_loaders.methods import LOAD_METHODS
+from search.models import SearchTerm
+
+# The name of the benchmark of `--bulk-initial` loads, which stage the data
+# and merge it with the table's secondary indexes dropped.
+BULK_METHOD = "bulk"
+
+
+class Command(BaseCommand):
+
+    help = (
+        "Benchmarks the methods of loading search terms using synthetic "
+        "data. All changes made by the benchmark are rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-r",
+            "--rows",
+            type=int,
+            default=100_000,
+            help="The number of search terms to load.",
+        )
+        parser.add_argument(
+            "-a",
+            "--ad-groups",
+            type=int,
+            default=100,
+            help="The number of ad groups the search terms belong to.",
+        )
+        parser.add_argument(
+            "-n",
+            "--repeat",
+            type=int,
+            default=3,
+            help="The number of times to repeat each measurement.",
+        )
+        parser.add_argument(
+            "-m",
+            "--methods",
+            nargs="+",
+            choices=[*LOAD_METHODS, BULK_METHOD],
+            default=["insert", "copy"],
+            help=(
+                "The load methods to benchmark. `bulk` is the method used "
+                "by --bulk-initial."
+            ),
+        )
+
+    @staticmethod
+    def create_ad_groups(count: int) -> _t.Tuple[int, _t.List[int]]:
+        """Create a campaign and a number of ad groups for the synthetic
+        search terms to belong to.
+
+        Args:
+            count: The number of ad groups to create.
+
+        Returns:
+            The id of the campaign and the ids of the ad groups.
+        """
+        campaign_id = (
+            Campaign.objects.aggregate(Max("id"))["id__max"] or 0
+        ) + 1
+        campaign = Campaign.objects.create(
+            id=campaign_id, structure_value="benchmark", status="ENABLED"
+        )
+
+        start = (AdGroup.objects.aggregate(Max("id"))["id__max"] or 0) + 1
+        ad_group_ids = list(range(start, start + count))
+        AdGroup.objects.bulk_create(
+            AdGroup(
+                id=ad_group_id,
+                campaign=campaign,
+                alias="benchmark",
+                status="ENABLED",
+            )
+            for ad_group_id in ad_group_ids
+        )
+        return campaign_id, ad_group_ids
+
+    @staticmethod
+    def make_dataframe(
+        rows: int, ad_group_ids: _t.List[int], campaign_id: int
+    ) -> pd.DataFrame:
+        """Generate a dataframe of unique search terms in the same format as
+        the search terms CSV file.
+
+        Args:
+            rows: The number of rows to generate.
+            ad_group_ids: The ids of the ad groups to assign search terms to.
+            campaign_id: The id of the campaign the ad groups belong to.
+
+        Returns:
+            The synthetic search terms.
+        """
+        rng = np.random.default_rng(0)
+        dates = pd.date_range("2022-01-01", periods=30).strftime("%Y-%m-%d")
+        # Unique search terms ensure that no rows are deduplicated.
+        search_terms = "search term " + pd.Series(range(rows)).map(str)
+        return pd.DataFrame(
+            {
+                "date": rng.choice(dates, rows),
+                "ad_group_id": rng.choice(ad_group_ids, rows),
+                "campaign_id": campaign_id,
+                "clicks": rng.integers(0, 100, rows),
+                "cost": rng.integers(0, 10_000, rows) / 100,
+                "conversion_value": rng.integers(0, 10_000, rows) / 100,
+                "conversions": rng.integers(0, 10, rows),
+                "search_term": search_terms,
+            }
+        )
+
+    @staticmethod
+    def load(dataframe: pd.DataFrame, method: str) -> None:
+        """Clean and load the data with one of the methods.
+
+        Args:
+            dataframe: The data to load.
+            method: The load method.
+        """
+        if method != BULK_METHOD:
+            SearchTerm.load_from_dataframe(dataframe, method=method)
+            return
+
+        loader = BulkLoad(SearchTerm)
+        loader.stage(
+            clean_data(
+                dataframe,
+                SearchTerm,
+                SearchTerm.cleaning_strategies,
+                fuse=True,
+                plan=True,
+            )
+        )
+        try:
+            loader.finish()
+        finally:
+            loader.discard()
+
+    @classmethod
+    def time_method(
+        cls, method: str, dataframe: pd.DataFrame, repeat: int
+    ) -> _t.Tuple[float, float]:
+        """Time how long a load method takes to insert the data into an empty
+        table and then to update all of the same rows with new values. Each
+        run is rolled back so that every run starts from the same state.
+
+        Args:
+            method: The load method to benchmark.
+            dataframe: The data to load.
+            repeat: The number of times to repeat the measurement.
+
+        Returns:
+            The best times in seconds for inserting and updating the data.
+        """
+        # Rows which have not changed are not updated, so every row is
+        # changed for the update.
+        changed = dataframe.assign(clicks=dataframe["clicks"] + 1)
+        insert_times, update_times = [], []
+        for _ in range(repeat):
+            savepoint = transaction.savepoint()
+
+            start = time.perf_counter()
+            cls.load(dataframe, method)
+            insert_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            cls.load(changed, method)
+            update_times.append(time.perf_counter() - start)
+
+            transaction.savepoint_rollback(savepoint)
+
+        return min(insert_times), min(update_times)
+
+    def handle(self, *args, **options):
+        """Main handler for running the command from the command line."""
+        rows, repeat = options["rows"], options["repeat"]
+        if rows < 1 or repeat < 1 or options["ad_groups"] < 1:
+            raise CommandError(
+                "The number of rows, ad groups and repeats must be positive."
+            )
+
+        results = {}
+        with transaction.atomic():
+            campaign_id, ad_group_ids = self.create_ad_groups(
+                options["ad_groups"]
+            )
+            dataframe = self.make_dataframe(rows, ad_group_ids, campaign_id)
+
+            for method in options["methods"]:
+                results[method] = self.time_method(method, dataframe, repeat)
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"Loaded {rows:,} search terms (best of {repeat}):")
+        self.stdout.write(
+            f"{'method':<10}{'insert (s)':>12}{'rows/s':>12}"
+            f"{'update (s)':>12}{'rows/s':>12}"
+        )
+        for method, (insert_time, update_time) in results.items():
+            self.stdout.write(
+                f"{method:<10}{insert_time:>12.3f}{rows / insert_time:>12,.0f}"
+                f"{update_time:>12.3f}{rows / update_time:>12,.0f}"
+            )
+
+        if "insert" in results:
+            baseline = results["insert"]
+            for method, times in results.items():
+                if method == "insert":
+                    continue
+                self.write_speed_up(method, times, "insert", baseline)
+        # Bulk loads are also compared with the fastest regular upsert.
+        if BULK_METHOD in results and "copy" in results:
+            self.write_speed_up(
+                BULK_METHOD, results[BULK_METHOD], "copy", results["copy"]
+            )
+
+    def write_speed_up(
+        self,
+        method: str,
+        times: _t.Tuple[float, float],
+        baseline_method: str,
+        baseline: _t.Tuple[float, float],
+    ) -> None:
+        """Report how many times faster a method is than another.
+
+        Args:
+            method: The load method.
+            times: The times of the method for inserting and updating.
+            baseline_method: The load method it is compared with.
+            baseline: The times of the method it is compared with.
+        """
+        self.stdout.write(
+            f"{method} is {baseline[0] / times[0]:.1f}x faster to "
+            f"insert and {baseline[1] / times[1]:.1f}x faster to "
+            f"update than {baseline_method}."
+        )
@@ -1,4 +1,4 @@
-"""Management utility to load search terms from a CSV file."""
+"""Management utility to load search terms from a data file."""
 
 from bidnamic.load_data import LoadDataCommand
 from search.models import SearchTerm
@@ -6,5 +6,7 @@ from search.models import SearchTerm
 
 class Command(LoadDataCommand):
 
-    help = "Loads search terms from a CSV file."
+    help = "Loads search terms from a CSV, Parquet or Arrow file."
     model = SearchTerm
+    # Each daily export is loaded incrementally by date.
+    partition_column = "date"
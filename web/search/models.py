@@ -1,11 +1,11 @@
-from django.db import models, connection
-import pandas as pd
+from django.db import models
 from campaigns import models as campaign_models
 from data_cleaners import methods as cleaning_methods
-from data_cleaners.base import clean_data
+from data_loaders.engine import DataFrameLoaderMixin
+from . import cleaning_methods as search_cleaning_methods
 
 
-class SearchTerm(models.Model):
+class SearchTerm(DataFrameLoaderMixin, models.Model):
     date = models.DateField()
     ad_group = models.ForeignKey(
         campaign_models.AdGroup,
@@ -25,10 +25,11 @@ class SearchTerm(models.Model):
     class DataCleaner:
         from campaigns.models import AdGroup
 
+        # The ad group determines the campaign, so these are the fields of
+        # the unique constraint which rows are loaded by.
         remove_duplicates_subset_fields = [
             "date",
             "ad_group_id",
-            "campaign_id",
             "search_term",
         ]
         remove_columns = ["campaign_id"]
@@ -39,6 +40,15 @@ class SearchTerm(models.Model):
             }
         }
 
+    # The strategies used to clean data before it is loaded, in order.
+    cleaning_strategies = [
+        cleaning_methods.RemoveDuplicates,
+        cleaning_methods.FilterValidForeignKeys,
+        cleaning_methods.RemoveColumns,
+        search_cleaning_methods.CalculateRoas,
+        cleaning_methods.FilterInvalidValues,
+    ]
+
     def __str__(self):
         return f"({self.date}) {self.ad_group}"
 
@@ -48,57 +58,6 @@ class SearchTerm(models.Model):
             self.roas = self.calc_roas()
         super().save(*args, **kwargs)
 
-    @classmethod
-    def load_from_dataframe(cls, dataframe: pd.DataFrame):
-        """Updates or inserts records in bulk from a pandas dataframe.
-
-        Args:
-            dataframe - Pandas dataframe containing the data to be uploaded.
-        """
-
-        df = clean_data(
-            dataframe,
-            cls,
-            [
-                cleaning_methods.RemoveDuplicates,
-                cleaning_methods.FilterValidForeignKeys,
-                cleaning_methods.RemoveColumns,
-            ],
-        )
-        db_table = cls._meta.db_table
-        query = f"""
-            INSERT INTO {db_table} (
-                date,
-                ad_group_id,
-                clicks,
-                cost,
-                conversion_value,
-                conversions,
-                search_term,
-                roas
-            ) VALUES """
-
-        params = []
-        df_cols = df.columns.tolist()
-        for row in df.itertuples():
-            for col in df_cols:
-                params.append(getattr(row, col))
-            params.extend([row.conversion_value, row.cost or 1])
-            query += """
-                (%s, %s, %s, %s, %s, %s, %s, %s / %s),"""
-
-        query = query.strip().rstrip(",")
-        query += """
-            ON CONFLICT (date, ad_group_id, search_term) DO UPDATE
-            SET clicks = EXCLUDED.clicks,
-                cost = EXCLUDED.cost,
-                conversion_value = EXCLUDED.conversion_value,
-                conversions = EXCLUDED.conversions;
-            COMMIT;"""
-
-        with connection.cursor() as cursor:
-            cursor.execute(query, params)
-
     @classmethod
     def for_alias(cls, alias: str) -> models.QuerySet["SearchTerm"]:
         """Returns a queryset of SearchTerms for a given alias.
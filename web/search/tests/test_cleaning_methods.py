@@ -0,0 +1,24 @@
+"""Unittests for the `cleaning_methods` module."""
+
+import pandas as pd
+from django.test import SimpleTestCase
+from .. import cleaning_methods, models as search_models
+
+
+class TestCalculateRoas(SimpleTestCase):
+    """Unittests for the `CalculateRoas` class."""
+
+    def test_clean(self):
+        """Test that the RoAS is calculated and that a cost of zero does not
+        cause a division by zero.
+        """
+        dataframe = pd.DataFrame(
+            {"cost": [0.5, 0.0, 2.0], "conversion_value": [2.0, 3.0, 1.0]}
+        )
+        calculate_roas = cleaning_methods.CalculateRoas(
+            dataframe, search_models.SearchTerm
+        )
+        calculate_roas.clean()
+        self.assertEqual(
+            calculate_roas.dataframe["roas"].tolist(), [4.0, 3.0, 0.5]
+        )
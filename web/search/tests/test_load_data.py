@@ -1,11 +1,24 @@
 """Integration for commands to load data into the database."""
 
 import os
+import tempfile
+import typing as _t
+from io import StringIO
+from unittest import mock
+import pandas as pd
 from django.test import TransactionTestCase
 from django.conf import settings
 from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, transaction
+from campaigns import models as campaign_models
 from search import models as search_models
+from search.management.commands import load_search_terms
 from campaigns.tests.utils import get_ad_group
+from data_cleaners import external
+from data_cleaners.key_cache import valid_keys
+from data_loaders import tuning
+from data_loaders.models import LoadCheckpoint, QuarantinedRow
 
 
 class TestLoadData(TransactionTestCase):
@@ -29,5 +42,893 @@ class TestLoadData(TransactionTestCase):
             os.path.join(
                 self.testcases_dir, "load_data_search_terms_testcases.csv"
             ),
+            stdout=StringIO(),
         )
         self.assertEqual(search_models.SearchTerm.objects.count(), 2)
+
+    def test_search_terms_memory_report(self):
+        """Test that the `search_terms` command reports the memory saved by
+        reading the data using compact types.
+        """
+
+        get_ad_group(10)
+        get_ad_group(20)
+
+        stdout = StringIO()
+        call_command(
+            "load_search_terms",
+            "-f",
+            os.path.join(
+                self.testcases_dir, "load_data_search_terms_testcases.csv"
+            ),
+            stdout=stdout,
+        )
+        self.assertIn("compared to inferred types", stdout.getvalue())
+
+    def test_search_terms_unused_columns_not_read(self):
+        """Test that columns which are not needed to clean or load the data,
+        such as `campaign_id`, are not read from the file.
+        """
+        command = load_search_terms.Command()
+        chunk = next(
+            command.read_chunks(
+                os.path.join(
+                    self.testcases_dir, "load_data_search_terms_testcases.csv"
+                )
+            )
+        )
+        self.assertNotIn("campaign_id", chunk.columns)
+        self.assertIn("search_term", chunk.columns)
+
+    def test_search_terms_explain(self):
+        """Test that the `--explain` option shows the cleaning plan without
+        loading any data.
+        """
+
+        get_ad_group(10)
+        get_ad_group(20)
+
+        stdout = StringIO()
+        call_command(
+            "load_search_terms",
+            "-f",
+            os.path.join(
+                self.testcases_dir, "load_data_search_terms_testcases.csv"
+            ),
+            "--explain",
+            stdout=stdout,
+        )
+        self.assertIn("Cleaning plan for SearchTerm", stdout.getvalue())
+        self.assertEqual(search_models.SearchTerm.objects.count(), 0)
+
+    def test_search_terms_copy(self):
+        """Test the `search_terms` command using the `copy` method."""
+
+        get_ad_group(10)
+        get_ad_group(20)
+
+        call_command(
+            "load_search_terms",
+            "-f",
+            os.path.join(
+                self.testcases_dir, "load_data_search_terms_testcases.csv"
+            ),
+            "--method",
+            "copy",
+            stdout=StringIO(),
+        )
+        self.assertEqual(search_models.SearchTerm.objects.count(), 2)
+
+    def test_search_terms_parquet(self):
+        """Test that the `search_terms` command loads a Parquet file in the
+        same way as the CSV file it was created from, whether or not it is
+        read in chunks.
+        """
+
+        get_ad_group(10)
+        get_ad_group(20)
+
+        fields = ("date", "ad_group_id", "search_term", "clicks", "roas")
+        csv_filepath = os.path.join(
+            self.testcases_dir, "load_data_search_terms_chunked_testcases.csv"
+        )
+        call_command(
+            "load_search_terms", "-f", csv_filepath, stdout=StringIO()
+        )
+        expected_results = list(
+            search_models.SearchTerm.objects.order_by(*fields[:3]).values_list(
+                *fields
+            )
+        )
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # The extension is left off to check that the format is detected
+            # from the contents of the file.
+            filepath = os.path.join(tmp_dir, "search_terms")
+            pd.read_csv(csv_filepath).to_parquet(filepath)
+
+            for chunk_size in (None, 2):
+                search_models.SearchTerm.objects.all().delete()
+                args = ["-f", filepath]
+                if chunk_size:
+                    args += ["--chunk-size", str(chunk_size)]
+                call_command("load_search_terms", *args, stdout=StringIO())
+
+                results = list(
+                    search_models.SearchTerm.objects.order_by(
+                        *fields[:3]
+                    ).values_list(*fields)
+                )
+                self.assertEqual(results, expected_results)
+
+    def test_benchmark_search_terms(self):
+        """Test that the `benchmark_search_terms` command reports on each
+        method and rolls back the data it loaded.
+        """
+        stdout = StringIO()
+        call_command(
+            "benchmark_search_terms",
+            "--rows",
+            "50",
+            "--ad-groups",
+            "2",
+            "--repeat",
+            "1",
+            stdout=stdout,
+        )
+        self.assertIn("copy", stdout.getvalue())
+        self.assertEqual(search_models.SearchTerm.objects.count(), 0)
+        self.assertEqual(campaign_models.AdGroup.objects.count(), 0)
+
+    def test_benchmark_search_terms_bulk(self):
+        """Test that the `benchmark_search_terms` command reports the
+        speed-up of bulk loads against the regular upsert and rolls back the
+        data it loaded.
+        """
+        stdout = StringIO()
+        call_command(
+            "benchmark_search_terms",
+            "--rows",
+            "50",
+            "--ad-groups",
+            "2",
+            "--repeat",
+            "1",
+            "--methods",
+            "copy",
+            "bulk",
+            stdout=stdout,
+        )
+        self.assertIn("bulk is", stdout.getvalue())
+        self.assertIn("faster to update than copy.", stdout.getvalue())
+        self.assertEqual(search_models.SearchTerm.objects.count(), 0)
+
+    def test_search_terms_chunked(self):
+        """Test that loading the `search_terms` in chunks, which are read in
+        a pipeline, gives the same result as loading the whole file in one
+        go, including where duplicates span multiple chunks.
+        """
+
+        get_ad_group(10)
+        get_ad_group(20)
+
+        filepath = os.path.join(
+            self.testcases_dir, "load_data_search_terms_chunked_testcases.csv"
+        )
+        fields = (
+            "date",
+            "ad_group_id",
+            "search_term",
+            "clicks",
+            "cost",
+            "conversion_value",
+            "conversions",
+            "roas",
+        )
+
+        stdout = StringIO()
+        call_command("load_search_terms", "-f", filepath, stdout=stdout)
+        self.assertNotIn("counted for each", stdout.getvalue())
+        expected_results = list(
+            search_models.SearchTerm.objects.order_by(*fields[:3]).values_list(
+                *fields
+            )
+        )
+        search_models.SearchTerm.objects.all().delete()
+
+        stdout = StringIO()
+        call_command(
+            "load_search_terms",
+            "-f",
+            filepath,
+            "--chunk-size",
+            "2",
+            "--pipeline",
+            stdout=stdout,
+        )
+        results = list(
+            search_models.SearchTerm.objects.order_by(*fields[:3]).values_list(
+                *fields
+            )
+        )
+
+        self.assertEqual(len(results), 4)
+        self.assertEqual(results, expected_results)
+        self.assertIn("Pipeline utilisation: read", stdout.getvalue())
+        # The rows of the four chunks are counted as they were written.
+        self.assertIn(
+            "Inserted 4, updated 2 and left 0 unchanged. These are counted "
+            "for each of the 4 writes",
+            stdout.getvalue(),
+        )
+
+    def test_search_terms_pipelined_in_transaction(self):
+        """Test that where the chunks are read in a pipeline, they are still
+        cleaned on the caller's connection, so that the foreign keys written
+        by the caller's open transaction are found, and that pipelining is
+        only used when asked for.
+        """
+        filepath = os.path.join(
+            self.testcases_dir, "load_data_search_terms_chunked_testcases.csv"
+        )
+        valid_keys.clear()
+        with transaction.atomic():
+            get_ad_group(10)
+            get_ad_group(20)
+            stdout = StringIO()
+            call_command(
+                "load_search_terms",
+                "-f",
+                filepath,
+                "--chunk-size",
+                "2",
+                "--pipeline",
+                stdout=stdout,
+            )
+            # Only the row of the ad group which does not exist is removed.
+            self.assertEqual(search_models.SearchTerm.objects.count(), 4)
+            self.assertFalse(
+                search_models.SearchTerm.objects.filter(
+                    search_term="orphan term"
+                ).exists()
+            )
+            self.assertIn("Pipeline utilisation: read", stdout.getvalue())
+
+        stdout = StringIO()
+        call_command(
+            "load_search_terms",
+            "-f",
+            filepath,
+            "--chunk-size",
+            "2",
+            stdout=stdout,
+        )
+        self.assertNotIn("Pipeline utilisation", stdout.getvalue())
+        with self.assertRaises(CommandError):
+            call_command(
+                "load_search_terms",
+                "-f",
+                filepath,
+                "--pipeline",
+                stdout=StringIO(),
+            )
+
+    def test_search_terms_cleaned_together(self):
+        """Test that chunks which are cleaned together have their duplicates
+        removed across the chunks before they are written, rather than by
+        the upsert.
+        """
+
+        get_ad_group(10)
+        get_ad_group(20)
+
+        filepath = os.path.join(
+            self.testcases_dir, "load_data_search_terms_chunked_testcases.csv"
+        )
+        command = load_search_terms.Command()
+        load_options = command.get_load_options({})
+        for clean_options, updated in ((None, 2), ({}, 0)):
+            with self.subTest(clean_options=clean_options):
+                search_models.SearchTerm.objects.all().delete()
+                stats = command.load_chunks(
+                    command.read_chunks(filepath, chunk_size=2),
+                    load_options,
+                    pipelined=True,
+                    clean_options=clean_options,
+                )
+                self.assertEqual(stats["inserted"], 4)
+                self.assertEqual(stats["updated"], updated)
+                self.assertGreater(stats["memory"], 0)
+        self.assertEqual(
+            search_models.SearchTerm.objects.get(
+                search_term="venum spats", ad_group_id=10
+            ).clicks,
+            5,
+        )
+
+    def test_search_terms_dedup_memory_budget(self):
+        """Test that with a memory budget for removing duplicates, the
+        duplicates across every chunk are removed out of core before any row
+        is written, giving the same result as loading the whole file in one
+        go.
+        """
+
+        get_ad_group(10)
+        get_ad_group(20)
+
+        filepath = os.path.join(
+            self.testcases_dir, "load_data_search_terms_chunked_testcases.csv"
+        )
+        fields = ("date", "ad_group_id", "search_term", "clicks", "roas")
+        call_command("load_search_terms", "-f", filepath, stdout=StringIO())
+        expected_results = list(
+            search_models.SearchTerm.objects.order_by(*fields[:3]).values_list(
+                *fields
+            )
+        )
+        search_models.SearchTerm.objects.all().delete()
+
+        stdout = StringIO()
+        with mock.patch.object(
+            external, "keep_last", wraps=external.keep_last
+        ) as keep_last:
+            call_command(
+                "load_search_terms",
+                "-f",
+                filepath,
+                "--chunk-size",
+                "2",
+                "--dedup-memory-budget",
+                "0",
+                "--pipeline",
+                stdout=stdout,
+            )
+        self.assertEqual(keep_last.call_args.args[2], 0)
+        self.assertEqual(
+            list(
+                search_models.SearchTerm.objects.order_by(
+                    *fields[:3]
+                ).values_list(*fields)
+            ),
+            expected_results,
+        )
+        self.assertIn("Inserted 4, updated 0", stdout.getvalue())
+        self.assertIn("Pipeline utilisation: read", stdout.getvalue())
+
+        with self.assertRaises(CommandError):
+            call_command(
+                "load_search_terms",
+                "-f",
+                filepath,
+                "--dedup-memory-budget",
+                "lots",
+                stdout=StringIO(),
+            )
+
+    def test_search_terms_async_streams(self):
+        """Test that writing the `search_terms` with several async streams
+        gives the same result as loading the whole file in one go, including
+        where duplicates span multiple chunks, and records the progress
+        through the file.
+        """
+
+        get_ad_group(10)
+        get_ad_group(20)
+
+        filepath = os.path.join(
+            self.testcases_dir, "load_data_search_terms_chunked_testcases.csv"
+        )
+        fields = ("date", "ad_group_id", "search_term", "clicks", "cost")
+
+        call_command("load_search_terms", "-f", filepath, stdout=StringIO())
+        expected_results = list(
+            search_models.SearchTerm.objects.order_by(*fields[:3]).values_list(
+                *fields
+            )
+        )
+        search_models.SearchTerm.objects.all().delete()
+
+        stdout = StringIO()
+        call_command(
+            "load_search_terms",
+            "-f",
+            filepath,
+            "--chunk-size",
+            "2",
+            "--async-streams",
+            "2",
+            stdout=stdout,
+        )
+        results = list(
+            search_models.SearchTerm.objects.order_by(*fields[:3]).values_list(
+                *fields
+            )
+        )
+
+        self.assertEqual(results, expected_results)
+        self.assertIn("Inserted 4, updated 2", stdout.getvalue())
+        checkpoint = LoadCheckpoint.objects.get(path=os.path.abspath(filepath))
+        self.assertEqual((checkpoint.rows, checkpoint.completed), (7, True))
+
+        with self.assertRaises(CommandError):
+            call_command(
+                "load_search_terms",
+                "-f",
+                filepath,
+                "--async-streams",
+                "2",
+                "--quarantine",
+                stdout=StringIO(),
+            )
+
+    def test_search_terms_bulk_initial(self):
+        """Test that a bulk load of the `search_terms` gives the same result
+        as loading the file in chunks, including where duplicates span
+        multiple chunks, and that the table's unique constraint is rebuilt.
+        """
+
+        get_ad_group(10)
+        get_ad_group(20)
+
+        filepath = os.path.join(
+            self.testcases_dir, "load_data_search_terms_chunked_testcases.csv"
+        )
+        fields = ("date", "ad_group_id", "search_term", "clicks", "cost")
+
+        call_command("load_search_terms", "-f", filepath, stdout=StringIO())
+        expected_results = list(
+            search_models.SearchTerm.objects.order_by(*fields[:3]).values_list(
+                *fields
+            )
+        )
+        search_models.SearchTerm.objects.all().delete()
+
+        stdout = StringIO()
+        call_command(
+            "load_search_terms",
+            "-f",
+            filepath,
+            "--chunk-size",
+            "2",
+            "--bulk-initial",
+            stdout=stdout,
+        )
+        results = list(
+            search_models.SearchTerm.objects.order_by(*fields[:3]).values_list(
+                *fields
+            )
+        )
+
+        self.assertEqual(results, expected_results)
+        self.assertIn("Inserted 4, updated 0", stdout.getvalue())
+        self.assertIn("Staged 6 rows", stdout.getvalue())
+        self.assertIn("rebuilt 2 index(es)", stdout.getvalue())
+        with self.assertRaises(IntegrityError):
+            search_models.SearchTerm.objects.create(
+                **dict(zip(fields, results[0])),
+                conversion_value=0,
+                conversions=0,
+                roas=0,
+            )
+
+        with self.assertRaises(CommandError):
+            call_command(
+                "load_search_terms",
+                "-f",
+                filepath,
+                "--bulk-initial",
+                "--resume",
+                stdout=StringIO(),
+            )
+
+    def test_search_terms_parse_workers(self):
+        """Test that loading the `search_terms` when parsing the file on
+        multiple threads gives the same result as parsing on a single thread.
+        """
+
+        get_ad_group(10)
+        get_ad_group(20)
+
+        filepath = os.path.join(
+            self.testcases_dir, "load_data_search_terms_chunked_testcases.csv"
+        )
+        fields = ("date", "ad_group_id", "search_term", "clicks", "roas")
+
+        call_command("load_search_terms", "-f", filepath, stdout=StringIO())
+        expected_results = list(
+            search_models.SearchTerm.objects.order_by(*fields[:3]).values_list(
+                *fields
+            )
+        )
+        search_models.SearchTerm.objects.all().delete()
+
+        call_command(
+            "load_search_terms",
+            "-f",
+            filepath,
+            "--parse-workers",
+            "3",
+            stdout=StringIO(),
+        )
+        results = list(
+            search_models.SearchTerm.objects.order_by(*fields[:3]).values_list(
+                *fields
+            )
+        )
+        self.assertEqual(results, expected_results)
+
+    def test_search_terms_directory_in_parallel(self):
+        """Test that every file in a directory is loaded when the files are
+        spread across multiple worker processes.
+        """
+
+        get_ad_group(10)
+        get_ad_group(20)
+
+        stdout = StringIO()
+        call_command(
+            "load_search_terms",
+            "-f",
+            os.path.join(
+                self.testcases_dir, "load_data_search_terms_partitioned"
+            ),
+            "--workers",
+            "2",
+            stdout=stdout,
+        )
+        self.assertEqual(search_models.SearchTerm.objects.count(), 4)
+        self.assertIn("from 2 file(s)", stdout.getvalue())
+
+    def test_search_terms_glob(self):
+        """Test that only the files matching a glob pattern are loaded."""
+
+        get_ad_group(10)
+        get_ad_group(20)
+
+        call_command(
+            "load_search_terms",
+            "-f",
+            os.path.join(
+                self.testcases_dir,
+                "load_data_search_terms_partitioned",
+                "*-1.csv",
+            ),
+            stdout=StringIO(),
+        )
+        self.assertEqual(search_models.SearchTerm.objects.count(), 2)
+
+    def test_search_terms_incremental(self):
+        """Test that loading incrementally skips a file which has already
+        been loaded and only loads the dates which have changed.
+        """
+
+        get_ad_group(10)
+        get_ad_group(20)
+
+        dataframe = pd.read_csv(
+            os.path.join(
+                self.testcases_dir,
+                "load_data_search_terms_chunked_testcases.csv",
+            )
+        )
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filepath = os.path.join(tmp_dir, "search_terms.csv")
+            dataframe.to_csv(filepath, index=False)
+            call_command(
+                "load_search_terms", "-f", filepath, "-i", stdout=StringIO()
+            )
+            self.assertEqual(search_models.SearchTerm.objects.count(), 4)
+
+            stdout = StringIO()
+            call_command(
+                "load_search_terms", "-f", filepath, "-i", stdout=stdout
+            )
+            self.assertIn("Loaded 0 rows", stdout.getvalue())
+            self.assertIn("Skipped 1 unchanged file(s)", stdout.getvalue())
+
+            # Only the rows of the date which has changed are loaded.
+            dataframe.loc[dataframe["date"] == "2019-05-24", "clicks"] = 9
+            dataframe.to_csv(filepath, index=False)
+            stdout = StringIO()
+            call_command(
+                "load_search_terms",
+                "-f",
+                filepath,
+                "-i",
+                "--chunk-size",
+                "2",
+                stdout=stdout,
+            )
+            self.assertIn("Loaded 1 rows", stdout.getvalue())
+            self.assertIn("2 unchanged partition(s)", stdout.getvalue())
+            self.assertEqual(
+                search_models.SearchTerm.objects.get(
+                    search_term="shin guards"
+                ).clicks,
+                9,
+            )
+
+    def test_search_terms_incremental_shared_dates(self):
+        """Test that where a date is spread across several files, the rows
+        of each file are recorded separately, so loading one file does not
+        make the date look changed in the other.
+        """
+
+        get_ad_group(10)
+        get_ad_group(20)
+
+        dataframe = pd.read_csv(
+            os.path.join(
+                self.testcases_dir,
+                "load_data_search_terms_chunked_testcases.csv",
+            )
+        )
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            first = os.path.join(tmp_dir, "first.csv")
+            second = os.path.join(tmp_dir, "second.csv")
+            # Both files have rows for 2019-05-23.
+            dataframe[:4].to_csv(first, index=False)
+            dataframe[4:].to_csv(second, index=False)
+            for filepath in (first, second):
+                call_command(
+                    "load_search_terms",
+                    "-f",
+                    filepath,
+                    "-i",
+                    stdout=StringIO(),
+                )
+
+            dataframe.loc[3, "clicks"] = 9
+            dataframe[:4].to_csv(first, index=False)
+            stdout = StringIO()
+            call_command("load_search_terms", "-f", first, "-i", stdout=stdout)
+            self.assertIn("1 unchanged partition(s)", stdout.getvalue())
+            self.assertEqual(
+                search_models.SearchTerm.objects.get(
+                    search_term="venum spats", ad_group_id=10
+                ).clicks,
+                9,
+            )
+
+    def test_search_terms_resume(self):
+        """Test that a load which fails part of the way through a file can be
+        resumed from the last chunk which was committed, giving the same
+        result as loading the file in one go.
+        """
+
+        get_ad_group(10)
+        get_ad_group(20)
+
+        filepath = os.path.join(
+            self.testcases_dir, "load_data_search_terms_chunked_testcases.csv"
+        )
+        load_from_dataframe = search_models.SearchTerm.load_from_dataframe
+        calls = []
+
+        def fail_on_second_chunk(dataframe, **kwargs):
+            calls.append(len(dataframe))
+            if len(calls) == 2:
+                raise RuntimeError("Connection lost.")
+            return load_from_dataframe(dataframe, **kwargs)
+
+        with mock.patch.object(
+            search_models.SearchTerm,
+            "load_from_dataframe",
+            side_effect=fail_on_second_chunk,
+        ):
+            with self.assertRaises(RuntimeError):
+                call_command(
+                    "load_search_terms",
+                    "-f",
+                    filepath,
+                    "--chunk-size",
+                    "2",
+                    stdout=StringIO(),
+                )
+        self.assertEqual(search_models.SearchTerm.objects.count(), 1)
+
+        stdout = StringIO()
+        call_command(
+            "load_search_terms",
+            "-f",
+            filepath,
+            "--chunk-size",
+            "3",
+            "--resume",
+            stdout=stdout,
+        )
+        self.assertIn("Resumed after 2 rows", stdout.getvalue())
+        resumed = set(
+            search_models.SearchTerm.objects.values_list(
+                "search_term", "ad_group_id", "date", "clicks"
+            )
+        )
+
+        # Resuming a file which was fully loaded does not load it again.
+        stdout = StringIO()
+        call_command(
+            "load_search_terms", "-f", filepath, "--resume", stdout=stdout
+        )
+        self.assertIn("Loaded 0 rows", stdout.getvalue())
+
+        search_models.SearchTerm.objects.all().delete()
+        call_command("load_search_terms", "-f", filepath, stdout=StringIO())
+        self.assertEqual(
+            resumed,
+            set(
+                search_models.SearchTerm.objects.values_list(
+                    "search_term", "ad_group_id", "date", "clicks"
+                )
+            ),
+        )
+
+    def test_search_terms_invalid_values(self):
+        """Test that rows with values which the database would reject are
+        removed before the data is loaded.
+        """
+
+        get_ad_group(10)
+        get_ad_group(20)
+
+        filepath = self.write_invalid_search_terms()
+        with self.assertLogs("data_cleaners.methods", "WARNING") as logs:
+            call_command(
+                "load_search_terms", "-f", filepath, stdout=StringIO()
+            )
+        self.assertIn("`clicks`", logs.output[0])
+        self.assertEqual(search_models.SearchTerm.objects.count(), 3)
+        self.assertFalse(
+            search_models.SearchTerm.objects.filter(
+                search_term="shin guards"
+            ).exists()
+        )
+
+    def test_search_terms_bad_integer_values(self):
+        """Test that a value which does not fit an integer column's dtype is
+        removed with its row rather than failing the read of the file, with
+        and without chunks.
+        """
+
+        get_ad_group(10)
+        get_ad_group(20)
+
+        for value in ("1.5", "3000000000", "abc"):
+            filepath = self.write_invalid_search_terms(value)
+            for options in ([], ["--chunk-size", "2"]):
+                with self.subTest(value=value, options=options):
+                    search_models.SearchTerm.objects.all().delete()
+                    with self.assertLogs("data_cleaners.methods", "WARNING"):
+                        call_command(
+                            "load_search_terms",
+                            "-f",
+                            filepath,
+                            *options,
+                            stdout=StringIO(),
+                        )
+                    self.assertEqual(
+                        sorted(
+                            search_models.SearchTerm.objects.values_list(
+                                "clicks", flat=True
+                            )
+                        ),
+                        [3, 4, 5],
+                    )
+
+    def test_search_terms_quarantine(self):
+        """Test that rows which the database rejects are quarantined and that
+        every other row is still loaded.
+        """
+
+        get_ad_group(10)
+        get_ad_group(20)
+
+        filepath = self.write_invalid_search_terms()
+        # The invalid values are left for the database to reject.
+        with mock.patch.object(
+            search_models.SearchTerm,
+            "cleaning_strategies",
+            search_models.SearchTerm.cleaning_strategies[:-1],
+        ):
+            with self.assertRaises(IntegrityError):
+                call_command(
+                    "load_search_terms", "-f", filepath, stdout=StringIO()
+                )
+            self.assertEqual(search_models.SearchTerm.objects.count(), 0)
+
+            stdout = StringIO()
+            call_command(
+                "load_search_terms",
+                "-f",
+                filepath,
+                "--quarantine",
+                stdout=stdout,
+            )
+        self.assertIn("Quarantined 1 rows", stdout.getvalue())
+        self.assertEqual(search_models.SearchTerm.objects.count(), 3)
+        quarantined = QuarantinedRow.objects.get()
+        self.assertEqual(quarantined.model, "search.SearchTerm")
+        self.assertEqual(quarantined.data["search_term"], "shin guards")
+
+    def write_invalid_search_terms(self, clicks: _t.Any = -1) -> str:
+        """Write a file of search terms where one row has an invalid number
+        of clicks.
+
+        Args:
+            clicks: The invalid number of clicks. By default, a negative
+                number.
+
+        Returns:
+            The path to the file.
+        """
+        dataframe = pd.read_csv(
+            os.path.join(
+                self.testcases_dir,
+                "load_data_search_terms_chunked_testcases.csv",
+            )
+        )
+        dataframe["clicks"] = dataframe["clicks"].astype(object)
+        dataframe.loc[
+            dataframe["search_term"] == "shin guards", "clicks"
+        ] = clicks
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        filepath = os.path.join(tmp_dir.name, "search_terms.csv")
+        dataframe.to_csv(filepath, index=False)
+        return filepath
+
+    def test_search_terms_tuned_batch_size(self):
+        """Test that the batch size can be tuned while loading and that the
+        size which was chosen is reported.
+        """
+
+        get_ad_group(10)
+        get_ad_group(20)
+
+        stdout = StringIO()
+        with mock.patch.dict(
+            tuning.batch_sizers,
+            {search_models.SearchTerm: tuning.BatchSizer(1, minimum=1)},
+        ):
+            call_command(
+                "load_search_terms",
+                "-f",
+                os.path.join(
+                    self.testcases_dir,
+                    "load_data_search_terms_chunked_testcases.csv",
+                ),
+                "--method",
+                "insert",
+                "--batch-size",
+                "auto",
+                stdout=stdout,
+            )
+        self.assertEqual(search_models.SearchTerm.objects.count(), 4)
+        self.assertIn("Tuned the batch size to", stdout.getvalue())
+
+    def test_search_terms_no_matching_files(self):
+        """Test that a `CommandError` is raised when a glob pattern does not
+        match any files.
+        """
+        with self.assertRaises(CommandError):
+            call_command(
+                "load_search_terms",
+                "-f",
+                os.path.join(self.testcases_dir, "*.missing"),
+                stdout=StringIO(),
+            )
+
+    def test_search_terms_invalid_chunk_size(self):
+        """Test that a `CommandError` is raised when the chunk size is not a
+        positive number.
+        """
+        with self.assertRaises(CommandError):
+            call_command(
+                "load_search_terms",
+                "-f",
+                os.path.join(
+                    self.testcases_dir, "load_data_search_terms_testcases.csv"
+                ),
+                "--chunk-size",
+                "0",
+                stdout=StringIO(),
+            )
@@ -3,6 +3,7 @@ from django.test import TransactionTestCase
 import pandas as pd
 from campaigns import models as campaign_models
 from campaigns.tests.utils import get_campaign, get_ad_group
+from data_loaders.base import LoadResult
 from .. import models as search_models
 from .utils import get_search_term
 
@@ -46,6 +47,28 @@ class TestSearchTerm(TransactionTestCase):
 
     def test_load_from_dataframe(self):
         """Test that the method loads the data from a dataframe correctly."""
+        self.assert_loads_dataframe("insert")
+
+    def test_load_from_dataframe_copy(self):
+        """Test that the method loads the data from a dataframe correctly when
+        using the `copy` method.
+        """
+        self.assert_loads_dataframe("copy")
+
+    def test_load_from_dataframe_invalid_method(self):
+        """Test that a `ValueError` is raised for an unknown load method."""
+        with self.assertRaises(ValueError):
+            search_models.SearchTerm.load_from_dataframe(
+                pd.DataFrame(), method="unknown"
+            )
+
+    def assert_loads_dataframe(self, method: str):
+        """Load a dataframe using the given method and check that the data was
+        loaded correctly.
+
+        Args:
+            method: The load method to use.
+        """
 
         # Need to firstly load other tables to ensure that the foreign keys are
         # valid.
@@ -79,7 +102,7 @@ class TestSearchTerm(TransactionTestCase):
         )
 
         # Run the method.
-        search_models.SearchTerm.load_from_dataframe(dataframe)
+        search_models.SearchTerm.load_from_dataframe(dataframe, method=method)
 
         # Check that the data was loaded correctly.
         self.assertEqual(search_models.SearchTerm.objects.count(), 2)
@@ -102,6 +125,14 @@ class TestSearchTerm(TransactionTestCase):
         self.assertEqual(search_ad_group_100.conversions, 2)
         self.assertEqual(search_ad_group_100.search_term, "b")
 
+        # Loading the same data again leaves every row unchanged.
+        self.assertEqual(
+            search_models.SearchTerm.load_from_dataframe(
+                dataframe, method=method
+            ),
+            LoadResult(inserted=0, updated=0, unchanged=2),
+        )
+
     def test_for_alias(self):
         """Test that the `for_alias` returns the correct queryset."""
 